@@ -0,0 +1,158 @@
+"""
+Selenium WebDriver 池：复用已启动的浏览器会话，归还时重置状态；事件驱动等待代替固定 sleep
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+def chrome(headless: bool = True, executable_path: str | None = None) -> WebDriver:
+    """默认工厂：Chrome，executable_path 为 None 时由 Selenium Manager 查找 chromedriver"""
+    from selenium.webdriver.chrome.service import Service
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    return webdriver.Chrome(options=options, service=Service(executable_path=executable_path))
+
+
+class DriverPool:
+    """
+    浏览器会话池
+
+    1. 按需启动，最多 size 个会话；借出时阻塞等待空闲会话
+    2. 归还时重置：关闭多余窗口、清除 cookie 与 storage、回到 about:blank；重置失败或使用满 max_uses 次则退出重建
+    3. close 退出池创建的全部会话，包括借出中的；之后归还的会话直接丢弃
+
+    Examples
+    --------
+    >>> with DriverPool(size=2) as pool, pool.driver() as driver:
+    ...     driver.get('https://www.python.org')
+    """
+
+    def __init__(self, size: int = 2, factory: Callable[[], WebDriver] = chrome, max_uses: int = 100):
+        self.size = size
+        self.factory = factory
+        self.max_uses = max_uses
+        self._idle: queue.LifoQueue[tuple[WebDriver, int]] = queue.LifoQueue()
+        # 池创建且尚未退出的全部会话（空闲与借出中）
+        self._drivers: set[WebDriver] = set()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _checkout(self, timeout: float | None) -> tuple[WebDriver, int]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    driver = self.factory()
+                except BaseException:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                with self._lock:
+                    self._drivers.add(driver)
+                return driver, 0
+            # 定期醒来：其他会话被丢弃后可新建
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+            if wait <= 0:
+                raise TimeoutError('没有空闲的浏览器会话')
+            try:
+                return self._idle.get(timeout=wait)
+            except queue.Empty:
+                pass
+
+    def _discard(self, driver: WebDriver) -> None:
+        with self._lock:
+            if driver not in self._drivers:
+                # 已由 close 退出
+                return
+            self._drivers.discard(driver)
+            self._created -= 1
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    @staticmethod
+    def reset(driver: WebDriver) -> None:
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.delete_all_cookies()
+        # about:blank 无法访问 storage，需在当前页面清除
+        driver.execute_script('try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}')
+        driver.get('about:blank')
+
+    @contextmanager
+    def driver(self, timeout: float | None = None) -> Iterator[WebDriver]:
+        """借出一个会话，退出 with 时归还"""
+        driver, uses = self._checkout(timeout)
+        try:
+            yield driver
+        finally:
+            self._release(driver, uses)
+
+    def _release(self, driver: WebDriver, uses: int) -> None:
+        with self._lock:
+            if driver not in self._drivers:
+                return
+        uses += 1
+        if uses >= self.max_uses:
+            self._discard(driver)
+            return
+        try:
+            self.reset(driver)
+        except WebDriverException:
+            self._discard(driver)
+            return
+        self._idle.put((driver, uses))
+
+    def close(self) -> None:
+        """退出全部会话，包括借出中的"""
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        with self._lock:
+            drivers = list(self._drivers)
+        for driver in drivers:
+            self._discard(driver)
+
+    def __enter__(self) -> 'DriverPool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def wait_for(driver: WebDriver, condition: Callable[[WebDriver], object], timeout: float = 10) -> object:
+    """等待条件成立，返回条件的结果"""
+    return WebDriverWait(driver, timeout).until(condition)
+
+
+def page_loaded(driver: WebDriver) -> bool:
+    return driver.execute_script('return document.readyState') == 'complete'
+
+
+def scrolled_to_bottom(driver: WebDriver) -> bool:
+    return driver.execute_script(
+        'return window.scrollY + window.innerHeight >= document.documentElement.scrollHeight - 1')
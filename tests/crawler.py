@@ -0,0 +1,289 @@
+"""
+爬虫引擎：frontier 队列（按主机礼貌限速）+ 去重 + 有界并发 + 背压 + 可插拔 fetch/parse 流水线
+
+抓取在 concurrent.futures.Executor 中执行，可对比 TestConcurrentExecution 演示的五种执行模型：
+
+1. ThreadPerTaskExecutor：每个任务一个 threading.Thread
+2. ProcessPerTaskExecutor：每个任务一个 multiprocessing.Process
+3. ThreadPoolExecutor
+4. ProcessPoolExecutor
+5. TimerExecutor：每个任务一个 threading.Timer
+
+gevent 可传入 gevent.threadpool.ThreadPoolExecutor
+"""
+import asyncio
+import multiprocessing
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+import requests
+
+_HREF = re.compile(rb'href=["\']([^"\'#]+)')
+_local = threading.local()
+
+
+def fetch(url: str) -> tuple[int, bytes]:
+    """默认 fetch：每个线程/进程复用一个 requests 会话"""
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    r = _local.session.get(url, timeout=10)
+    return r.status_code, r.content
+
+
+def parse(url: str, status: int, body: bytes) -> tuple[Any, list[str]]:
+    """默认 parse：提取 href 链接，结果为响应体长度"""
+    if status != 200:
+        return None, []
+    return len(body), [urljoin(url, link.decode(errors='ignore')) for link in _HREF.findall(body)]
+
+
+def _pipeline(fetch_: Callable, parse_: Callable, url: str) -> tuple[int, Any, list[str]]:
+    status, body = fetch_(url)
+    item, links = parse_(url, status, body)
+    return status, item, links
+
+
+@dataclass
+class Page:
+    url: str
+    status: int
+    item: Any
+    links: list[str] = field(default_factory=list)
+    error: BaseException | None = None
+
+
+class Frontier:
+    """
+    待抓取队列：按主机分队列，同一主机同时最多 per_host 个请求、相邻请求间隔不少于 delay 秒
+
+    URL 去除 fragment 后去重；队列总长超过 max_size 时丢弃新 URL（dropped 计数）；close 后不再分发与接收 URL
+    """
+
+    def __init__(self, per_host: int = 2, delay: float = 0.0, max_size: int = 100_000):
+        self.per_host = per_host
+        self.delay = delay
+        self.max_size = max_size
+        self.seen: set[str] = set()
+        self.dropped = 0
+        self._queues: dict[str, deque[str]] = {}
+        self._in_flight: dict[str, int] = {}
+        self._next_time: dict[str, float] = {}
+        self._size = 0
+        self._closed = False
+        self._condition = asyncio.Condition()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlsplit(url).netloc
+
+    async def add(self, url: str) -> bool:
+        url = urldefrag(url)[0]
+        if self._closed or url in self.seen or not url.startswith(('http://', 'https://')):
+            return False
+        if self._size >= self.max_size:
+            self.dropped += 1
+            return False
+        self.seen.add(url)
+        async with self._condition:
+            self._queues.setdefault(self.host(url), deque()).append(url)
+            self._size += 1
+            self._condition.notify()
+        return True
+
+    async def get(self) -> str | None:
+        """取出一个可抓取的 URL；队列为空且没有进行中的请求时返回 None"""
+        async with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                wait = None
+                for host, queue in self._queues.items():
+                    if not queue or self._in_flight.get(host, 0) >= self.per_host:
+                        continue
+                    ready = self._next_time.get(host, 0)
+                    if ready <= now:
+                        self._in_flight[host] = self._in_flight.get(host, 0) + 1
+                        self._next_time[host] = now + self.delay
+                        self._size -= 1
+                        return queue.popleft()
+                    wait = ready - now if wait is None else min(wait, ready - now)
+                if not self._size and not any(self._in_flight.values()):
+                    self._condition.notify_all()
+                    return None
+                try:
+                    await asyncio.wait_for(self._condition.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            return None
+
+    async def done(self, url: str) -> None:
+        async with self._condition:
+            self._in_flight[self.host(url)] -= 1
+            self._condition.notify_all()
+
+    async def close(self) -> None:
+        """停止分发：丢弃队列中的 URL，等待中的 get 返回 None"""
+        async with self._condition:
+            self._closed = True
+            self._queues.clear()
+            self._size = 0
+            self._condition.notify_all()
+
+
+class Crawler:
+    """
+    Examples
+    --------
+    >>> with ThreadPoolExecutor(8) as executor:
+    ...     pages = Crawler(executor, max_in_flight=8, max_pages=100).run(['https://python.org'])
+    """
+
+    def __init__(self, executor: Executor | None = None, fetch: Callable[[str], tuple[int, bytes]] = fetch,
+                 parse: Callable[[str, int, bytes], tuple[Any, list[str]]] = parse, max_in_flight: int = 10,
+                 per_host: int = 10, delay: float = 0.0, max_pages: int | None = None, buffer: int = 100,
+                 allow: Callable[[str], bool] | None = None):
+        """
+        Parameters
+        ----------
+        executor: 执行 fetch/parse 的 Executor，None 为 asyncio 默认线程池；使用进程模型时 fetch/parse 须可 pickle
+        fetch: url → (状态码, 响应体)
+        parse: (url, 状态码, 响应体) → (结果, 链接列表)
+        max_in_flight: 同时进行的请求数上限
+        per_host: 同一主机同时进行的请求数上限
+        delay: 同一主机相邻请求的最小间隔(秒)
+        max_pages: 最多抓取页数
+        buffer: 结果缓冲区大小，消费者跟不上时暂停抓取（背压）
+        allow: URL 过滤器，返回 False 的链接不入队
+        """
+        self.executor = executor
+        self.fetch = fetch
+        self.parse = parse
+        self.max_in_flight = max_in_flight
+        self.max_pages = max_pages
+        self.buffer = buffer
+        self.allow = allow or (lambda url: True)
+        self.per_host = per_host
+        self.delay = delay
+        self.frontier = Frontier(per_host, delay)
+
+    async def crawl(self, seeds: list[str]) -> AsyncIterator[Page]:
+        """异步迭代抓取结果"""
+        loop = asyncio.get_running_loop()
+        self.frontier = Frontier(self.per_host, self.delay)
+        results: asyncio.Queue[Page | None] = asyncio.Queue(self.buffer)
+        scheduled = 0
+        for url in seeds:
+            await self.frontier.add(url)
+
+        async def worker() -> None:
+            nonlocal scheduled
+            while (url := await self.frontier.get()) is not None:
+                if self.max_pages is not None and scheduled >= self.max_pages:
+                    await self.frontier.done(url)
+                    await self.frontier.close()
+                    break
+                scheduled += 1
+                # 达到页数上限：关闭队列，其余 worker 不再逐个取出（并等待限速）剩余的 URL
+                if self.max_pages is not None and scheduled >= self.max_pages:
+                    await self.frontier.close()
+                try:
+                    status, item, links = await loop.run_in_executor(self.executor, _pipeline,
+                                                                     self.fetch, self.parse, url)
+                    page = Page(url, status, item, links)
+                    for link in links:
+                        if self.allow(link):
+                            await self.frontier.add(link)
+                except Exception as e:
+                    page = Page(url, 0, None, error=e)
+                await self.frontier.done(url)
+                await results.put(page)
+
+        async def supervise() -> None:
+            try:
+                await asyncio.gather(*(worker() for _ in range(self.max_in_flight)))
+            finally:
+                await results.put(None)
+
+        task = asyncio.create_task(supervise())
+        try:
+            while (page := await results.get()) is not None:
+                yield page
+        finally:
+            task.cancel()
+
+    def run(self, seeds: list[str]) -> list[Page]:
+        """同步抓取，返回全部结果"""
+
+        async def collect() -> list[Page]:
+            return [page async for page in self.crawl(seeds)]
+
+        return asyncio.run(collect())
+
+
+class _PerTaskExecutor(Executor, ABC):
+    """每个任务启动一个执行单元，结果回填 Future"""
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self._start(future, fn, args, kwargs)
+        return future
+
+    @staticmethod
+    def _run(future: Future, fn: Callable, args: tuple, kwargs: dict) -> None:
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    @abstractmethod
+    def _start(self, future: Future, fn: Callable, args: tuple, kwargs: dict) -> None:
+        """启动执行单元，在其中调用 _run"""
+
+
+class ThreadPerTaskExecutor(_PerTaskExecutor):
+    def _start(self, future, fn, args, kwargs):
+        threading.Thread(target=self._run, args=(future, fn, args, kwargs), daemon=True).start()
+
+
+class TimerExecutor(_PerTaskExecutor):
+    def __init__(self, interval: float = 0.0):
+        self.interval = interval
+
+    def _start(self, future, fn, args, kwargs):
+        threading.Timer(self.interval, self._run, args=(future, fn, args, kwargs)).start()
+
+
+def _child(conn, fn: Callable, args: tuple, kwargs: dict) -> None:
+    try:
+        conn.send((True, fn(*args, **kwargs)))
+    except BaseException as e:
+        conn.send((False, e))
+    finally:
+        conn.close()
+
+
+class ProcessPerTaskExecutor(_PerTaskExecutor):
+    def _start(self, future, fn, args, kwargs):
+        def wait() -> None:
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_child, args=(sender, fn, args, kwargs))
+            process.start()
+            sender.close()
+            try:
+                ok, value = receiver.recv()
+            except EOFError:
+                ok, value = False, ChildProcessError(f'exit code {process.exitcode}')
+            process.join()
+            future.set_result(value) if ok else future.set_exception(value)
+
+        threading.Thread(target=wait, daemon=True).start()
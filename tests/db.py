@@ -0,0 +1,423 @@
+"""
+MySQL 辅助：pymysql 连接池（健康检查、空闲上限）、批量写入、服务端流式游标，以及本地 MySQL 协议替身服务器
+"""
+import functools
+import hashlib
+import itertools
+import os
+import re
+import socketserver
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+import pymysql
+from pymysql import cursors
+from pymysql.connections import Connection
+
+
+class ConnectionPool:
+    """
+    pymysql 连接池
+
+    1. 最多 size 个连接，借出时阻塞等待空闲连接
+    2. 空闲超过 check_after 秒的连接借出前 ping 检查（在锁外进行，不阻塞其他借出者），失败则丢弃重建；
+       空闲超过 max_idle_time 秒的直接丢弃
+    3. 归还时回滚未提交的事务，空闲连接超过 max_idle 个时关闭多余的
+    4. close 关闭空闲与借出中的全部连接
+
+    Examples
+    --------
+    >>> with ConnectionPool(host='127.0.0.1', user='root', password='', database='demo') as pool:
+    ...     with pool.transaction() as connection:
+    ...         insert_many(connection, 'demo', ('id', 'name'), rows)
+    """
+
+    def __init__(self, size: int = 10, max_idle: int = 5, max_idle_time: float = 300, check_after: float = 30,
+                 factory: Callable[[], Connection] | None = None, **connect_kwargs):
+        """
+        Parameters
+        ----------
+        size: 连接数上限
+        max_idle: 空闲连接数上限
+        max_idle_time: 空闲连接的最长保留时间(秒)
+        check_after: 空闲超过该时间(秒)的连接借出前做健康检查
+        factory: 创建连接的函数，默认 pymysql.connect(**connect_kwargs)
+        """
+        self.size = size
+        self.max_idle = max_idle
+        self.max_idle_time = max_idle_time
+        self.check_after = check_after
+        self.factory = factory or functools.partial(pymysql.connect, **connect_kwargs)
+        # (连接, 归还时间)，后进先出：优先复用刚归还的连接，久置的连接自然老化
+        self._idle: deque[tuple[Connection, float]] = deque()
+        # 借出中的连接，close 时一并关闭
+        self._borrowed: set[Connection] = set()
+        self._created = 0
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _close(connection: Connection) -> None:
+        try:
+            connection.close()
+        except pymysql.Error:
+            pass
+
+    def _healthy(self, connection: Connection, idle: float) -> bool:
+        if idle >= self.max_idle_time:
+            return False
+        if idle < self.check_after:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except pymysql.Error:
+            return False
+
+    def _checkout(self, timeout: float | None) -> Connection:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                while True:
+                    if self._idle:
+                        connection, released = self._idle.pop()
+                        break
+                    if self._created < self.size:
+                        self._created += 1
+                        connection = None
+                        break
+                    wait = None if deadline is None else deadline - time.monotonic()
+                    if wait is not None and wait <= 0:
+                        raise TimeoutError('没有空闲的数据库连接')
+                    self._condition.wait(wait)
+            if connection is None:
+                break
+            # 健康检查可能有一次网络往返，在锁外进行
+            if self._healthy(connection, time.monotonic() - released):
+                with self._condition:
+                    self._borrowed.add(connection)
+                return connection
+            self._close(connection)
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+        try:
+            connection = self.factory()
+        except BaseException:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._borrowed.add(connection)
+        return connection
+
+    def _release(self, connection: Connection) -> None:
+        try:
+            connection.rollback()
+            keep = True
+        except pymysql.Error:
+            keep = False
+        with self._condition:
+            if connection not in self._borrowed:
+                # 借出期间连接池已关闭，连接已关闭并计数
+                return
+            self._borrowed.discard(connection)
+            if keep and len(self._idle) < self.max_idle:
+                self._idle.append((connection, time.monotonic()))
+            else:
+                self._created -= 1
+                self._close(connection)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator[Connection]:
+        """借出一个连接，退出 with 时归还；未提交的修改会被回滚"""
+        connection = self._checkout(timeout)
+        try:
+            yield connection
+        finally:
+            self._release(connection)
+
+    @contextmanager
+    def transaction(self, timeout: float | None = None) -> Iterator[Connection]:
+        """借出一个连接，正常退出 with 时提交"""
+        with self.connection(timeout) as connection:
+            yield connection
+            connection.commit()
+
+    def close(self) -> None:
+        """关闭全部连接，借出中的连接也被关闭，之后归还时直接丢弃"""
+        with self._condition:
+            while self._idle:
+                self._created -= 1
+                self._close(self._idle.pop()[0])
+            for connection in self._borrowed:
+                self._created -= 1
+                self._close(connection)
+            self._borrowed.clear()
+            self._condition.notify_all()
+
+    def __enter__(self) -> 'ConnectionPool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def insert_many(connection: Connection, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]],
+                batch_size: int = 1000) -> int:
+    """
+    批量插入：pymysql 的 executemany 把 INSERT ... VALUES 改写为多行 VALUES，一个批次一次往返
+
+    Parameters
+    ----------
+    connection: 连接，调用方负责提交
+    table: 表名
+    columns: 列名
+    rows: 行，可为迭代器，按 batch_size 分批读取
+    batch_size: 每批行数
+
+    Returns
+    -------
+    插入的行数
+    """
+    names = ', '.join(f'`{column}`' for column in columns)
+    sql = f"INSERT INTO `{table}` ({names}) VALUES ({', '.join(['%s'] * len(columns))})"
+    count = 0
+    with connection.cursor() as cursor:
+        for batch in itertools.batched(rows, batch_size):
+            count += cursor.executemany(sql, batch)
+    return count
+
+
+def stream(connection: Connection, sql: str, args: Any = None, size: int = 1000) -> Iterator[dict[str, Any]]:
+    """
+    SSDictCursor 流式读取：结果集不整体缓存在客户端，按 size 行分批读取
+
+    迭代结束（或生成器关闭）前，该连接不能执行其他查询
+    """
+    with connection.cursor(cursors.SSDictCursor) as cursor:
+        cursor.execute(sql, args)
+        while rows := cursor.fetchmany(size):
+            yield from rows
+
+
+# region MySQL 协议替身
+
+# 能力标志：LONG_PASSWORD | CONNECT_WITH_DB | PROTOCOL_41 | TRANSACTIONS | SECURE_CONNECTION | MULTI_RESULTS | PLUGIN_AUTH
+_CAPABILITIES = 0x1 | 0x8 | 0x200 | 0x2000 | 0x8000 | 0x20000 | 0x80000
+_UTF8MB4, _BINARY = 45, 63
+_LONGLONG, _DOUBLE, _BLOB, _VAR_STRING = 8, 5, 252, 253
+# 状态标志 NO_BACKSLASH_ESCAPES：客户端只用 '' 转义单引号，bytes 用 X'..'，SQL 字面量与 SQLite 一致
+_NO_BACKSLASH_ESCAPES, _AUTOCOMMIT, _IN_TRANS = 0x200, 0x2, 0x1
+
+
+def _lenenc_int(value: int) -> bytes:
+    if value < 251:
+        return bytes([value])
+    if value < 1 << 16:
+        return b'\xfc' + struct.pack('<H', value)
+    if value < 1 << 24:
+        return b'\xfd' + struct.pack('<I', value)[:3]
+    return b'\xfe' + struct.pack('<Q', value)
+
+
+def _lenenc_str(value: bytes) -> bytes:
+    return _lenenc_int(len(value)) + value
+
+
+def _column_type(value: Any) -> tuple[int, int]:
+    """由首行的值推断列类型与字符集"""
+    if isinstance(value, int):
+        return _LONGLONG, _BINARY
+    if isinstance(value, float):
+        return _DOUBLE, _BINARY
+    if isinstance(value, bytes):
+        return _BLOB, _BINARY
+    return _VAR_STRING, _UTF8MB4
+
+
+def _text(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return (repr(value) if isinstance(value, float) else str(value)).encode()
+
+
+def _scramble(password: str, salt: bytes) -> bytes:
+    """mysql_native_password：SHA1(password) XOR SHA1(salt + SHA1(SHA1(password)))"""
+    if not password:
+        return b''
+    stage1 = hashlib.sha1(password.encode()).digest()
+    stage2 = hashlib.sha1(salt + hashlib.sha1(stage1).digest()).digest()
+    return bytes(a ^ b for a, b in zip(stage1, stage2))
+
+
+class LocalMySQL:
+    """
+    本地 MySQL 协议替身服务器：实现握手（mysql_native_password）、COM_QUERY/COM_PING/COM_INIT_DB/COM_QUIT 与文本结果集，
+    SQL 交给 SQLite 执行，用于离线测试连接池、批量写入与流式读取
+
+    1. 所有连接共享一个临时 SQLite 数据库，每个连接有独立的事务
+    2. SQL 须为 SQLite 能执行的方言（如建表用 INTEGER PRIMARY KEY）；声明 NO_BACKSLASH_ESCAPES，pymysql 转义后的字面量 SQLite 可直接执行
+    3. 结果集边查询边发送，配合 SSCursor 可验证流式读取
+    4. connections 统计握手次数，queries 统计查询往返次数
+
+    Examples
+    --------
+    >>> with LocalMySQL() as server:
+    ...     connection = pymysql.connect(**server.connect_kwargs)
+    """
+
+    def __init__(self, user: str = 'root', password: str = '', host: str = '127.0.0.1', port: int = 0):
+        self.user = user
+        self.password = password
+        self.connections = 0
+        self.queries = 0
+        self._directory = tempfile.TemporaryDirectory()
+        self.database = Path(self._directory.name) / 'standin.db'
+        with sqlite3.connect(self.database) as db:
+            db.execute('PRAGMA journal_mode=WAL')
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            disable_nagle_algorithm = True
+
+            def handle(self):
+                server._serve(self.rfile, self.wfile)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def connect_kwargs(self) -> dict[str, Any]:
+        host, port = self._server.server_address[:2]
+        return dict(host=host, port=port, user=self.user, password=self.password, charset='utf8mb4')
+
+    def _serve(self, rfile, wfile) -> None:
+        sequence = 0
+
+        def read() -> bytes | None:
+            nonlocal sequence
+            header = rfile.read(4)
+            if len(header) < 4:
+                return None
+            sequence = header[3] + 1
+            return rfile.read(int.from_bytes(header[:3], 'little'))
+
+        def write(payload: bytes) -> None:
+            nonlocal sequence
+            wfile.write(len(payload).to_bytes(3, 'little') + bytes([sequence & 0xff]) + payload)
+            sequence += 1
+
+        def status() -> int:
+            return (_NO_BACKSLASH_ESCAPES | (_AUTOCOMMIT if db.isolation_level is None else 0)
+                    | (_IN_TRANS if db.in_transaction else 0))
+
+        def ok(affected: int = 0, last_id: int = 0) -> None:
+            write(b'\x00' + _lenenc_int(affected) + _lenenc_int(last_id) + struct.pack('<HH', status(), 0))
+
+        def error(code: int, state: str, message: str) -> None:
+            write(b'\xff' + struct.pack('<H', code) + b'#' + state.encode() + message.encode())
+
+        def eof() -> None:
+            write(b'\xfe' + struct.pack('<HH', 0, status()))
+
+        salt = bytes(b % 94 + 33 for b in os.urandom(20))
+        write(b'\x0a' + b'8.0.0-standin\x00' + struct.pack('<I', threading.get_ident() & 0xffffffff)
+              + salt[:8] + b'\x00' + struct.pack('<HBHHB', _CAPABILITIES & 0xffff, _UTF8MB4,
+                                                 _NO_BACKSLASH_ESCAPES | _AUTOCOMMIT,
+                                                 _CAPABILITIES >> 16, 21)
+              + b'\x00' * 10 + salt[8:] + b'\x00' + b'mysql_native_password\x00')
+        wfile.flush()
+        response = read()
+        if response is None:
+            return
+        user, _, rest = response[32:].partition(b'\x00')
+        auth = rest[1:1 + rest[0]]
+        if user.decode() != self.user or auth != _scramble(self.password, salt):
+            error(1045, '28000', f"Access denied for user '{user.decode()}'")
+            wfile.flush()
+            return
+        self.connections += 1
+        db = sqlite3.connect(self.database, timeout=10, isolation_level=None)
+        try:
+            ok()
+            wfile.flush()
+            while (packet := read()) is not None:
+                command, body = packet[:1], packet[1:]
+                if command == b'\x01':
+                    break
+                if command in (b'\x02', b'\x0e'):
+                    ok()
+                elif command == b'\x03':
+                    self.queries += 1
+                    self._query(db, body.decode(), ok, error, eof, write)
+                else:
+                    error(1047, '08S01', 'Unknown command')
+                wfile.flush()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _query(db: sqlite3.Connection, sql: str, ok: Callable, error: Callable, eof: Callable,
+               write: Callable[[bytes], None]) -> None:
+        statement = sql.strip().rstrip(';')
+        keyword = statement.split(None, 1)[0].upper() if statement else ''
+        if keyword == 'SET':
+            mode = re.fullmatch(r'SET\s+AUTOCOMMIT\s*=\s*([01])', statement, re.I)
+            if mode:
+                if mode[1] == '1' and db.in_transaction:
+                    db.commit()
+                db.isolation_level = None if mode[1] == '1' else 'DEFERRED'
+            return ok()
+        try:
+            if keyword == 'COMMIT':
+                db.commit()
+                return ok()
+            if keyword == 'ROLLBACK':
+                db.rollback()
+                return ok()
+            cursor = db.execute(statement)
+        except sqlite3.IntegrityError as e:
+            return error(1062, '23000', str(e))
+        except sqlite3.Error as e:
+            return error(1064, '42000', str(e))
+        if cursor.description is None:
+            return ok(max(cursor.rowcount, 0), cursor.lastrowid or 0)
+        first = cursor.fetchone()
+        write(_lenenc_int(len(cursor.description)))
+        for i, column in enumerate(cursor.description):
+            kind, charset = _column_type(first[i] if first else None)
+            name = column[0].encode()
+            write(b''.join(_lenenc_str(part) for part in (b'def', b'', b'', b'', name, name))
+                  + b'\x0c' + struct.pack('<HIBHBH', charset, 1 << 24, kind, 0, 31 if kind == _DOUBLE else 0, 0))
+        eof()
+        rest = itertools.chain.from_iterable(iter(lambda: cursor.fetchmany(1000), []))
+        for row in itertools.chain([first], rest) if first else ():
+            write(b''.join(b'\xfb' if value is None else _lenenc_str(_text(value)) for value in row))
+        eof()
+
+    def start(self) -> 'LocalMySQL':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._directory.cleanup()
+
+    def __enter__(self) -> 'LocalMySQL':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+# endregion
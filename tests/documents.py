@@ -0,0 +1,347 @@
+"""
+文档文字提取服务：docx / pptx / pdf / xlsx 统一的流式迭代接口，按文件头识别格式，多进程（单文件超时）批量提取，按内容哈希缓存，分格式统计吞吐量
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import zipfile
+from contextlib import closing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from lxml import etree
+from multiprocessing.connection import Connection, wait
+
+Segment = tuple[str, str]
+
+
+# region 格式识别与单文件提取
+
+def detect(source: str | os.PathLike) -> str | None:
+    """
+    按文件头识别格式：%PDF- 为 pdf；ZIP（PK\\x03\\x04）按包内的主部件区分 docx / pptx / xlsx；其他返回 None
+
+    只读取文件头与 ZIP 中央目录，不解压
+    """
+    with open(source, 'rb') as f:
+        head = f.read(8)
+    if head.startswith(b'%PDF-'):
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(source) as archive:
+                names = set(archive.namelist())
+        except zipfile.BadZipFile:
+            return None
+        for name, kind in (('word/document.xml', 'docx'), ('ppt/presentation.xml', 'pptx'),
+                           ('xl/workbook.xml', 'xlsx')):
+            if name in names:
+                return kind
+    return None
+
+
+def _docx(path: str, password: str | None) -> Iterator[Segment]:
+    """逐段落（含表格内）产出 (段落序号, 文字)，处理完即清除并删除之前的兄弟元素，内存占用不随文档增长"""
+    from word import W, _paragraph_text, _part_names
+    with zipfile.ZipFile(path) as archive, archive.open(_part_names(archive)[0]) as f:
+        for i, (_, element) in enumerate(etree.iterparse(f, tag=f'{W}p')):
+            yield str(i), _paragraph_text(element)
+            element.clear(keep_tail=True)
+            parent = element.getparent()
+            while parent is not None and element.getprevious() is not None:
+                del parent[0]
+
+
+def _pptx(path: str, password: str | None) -> Iterator[Segment]:
+    """逐段落产出 (幻灯片下标/形状名称, 文字)"""
+    from slides import iter_text
+    for index, shape, text in iter_text(path):
+        yield f'{index}/{shape}', text
+
+
+def _pdf(path: str, password: str | None) -> Iterator[Segment]:
+    """逐页产出 (页码, 文字)，pypdfium2 文本后端"""
+    from pdfs import extract
+    for page in extract(path, password=password, backend='pdfium', tables=False, workers=0):
+        yield str(page.index), page.text
+
+
+def _xlsx(path: str, password: str | None) -> Iterator[Segment]:
+    """只读模式逐行产出 (工作表!行号, 以制表符连接的单元格值)"""
+    from openpyxl import load_workbook
+    with closing(load_workbook(path, read_only=True, data_only=True)) as workbook:
+        for worksheet in workbook.worksheets:
+            for row, values in enumerate(worksheet.iter_rows(values_only=True), 1):
+                yield f'{worksheet.title}!{row}', '\t'.join('' if value is None else str(value) for value in values)
+
+
+EXTRACTORS: dict[str, Callable[[str, str | None], Iterator[Segment]]] = {
+    'docx': _docx,
+    'pptx': _pptx,
+    'pdf': _pdf,
+    'xlsx': _xlsx,
+}
+
+
+def iter_text(source: str | os.PathLike, kind: str | None = None, password: str | None = None) -> Iterator[Segment]:
+    """
+    流式提取文字，产出 (位置, 文字)，跳过空白片段
+
+    Parameters
+    ----------
+    source: 文件路径
+    kind: 格式，None 为按文件头识别
+    password: 密码（pdf）
+
+    Examples
+    --------
+    >>> for location, text in iter_text('a.docx'):
+    ...     index.add(location, text)
+    """
+    kind = kind or detect(source)
+    if kind not in EXTRACTORS:
+        raise ValueError(f'不支持的格式：{source}')
+    for location, text in EXTRACTORS[kind](str(source), password):
+        if text.strip():
+            yield location, text
+
+# endregion
+
+
+# region 批量服务
+
+@dataclass
+class Extracted:
+    path: str
+    kind: str | None
+    digest: str
+    segments: list[Segment] = field(default_factory=list)
+    size: int = 0
+    error: BaseException | None = None
+    # 提取耗时（秒），命中缓存为 0，超时为 timeout
+    seconds: float = 0.0
+    cached: bool = False
+
+
+@dataclass
+class FormatMetrics:
+    files: int = 0
+    bytes: int = 0
+    chars: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    cache_hits: int = 0
+    # 工作进程中的提取耗时之和，不含超时的文件
+    seconds: float = 0.0
+    # 超时文件的字节数与等待时间，单独记录，不计入吞吐量
+    timeout_bytes: int = 0
+    timeout_seconds: float = 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        """单个工作进程的吞吐量（不含超时的文件），乘以进程数约为总吞吐量"""
+        return (self.files - self.timeouts) / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return (self.bytes - self.timeout_bytes) / 1024 / 1024 / self.seconds if self.seconds else 0.0
+
+
+def _digest(path: str | os.PathLike) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def _extract_file(path: str, kind: str, password: str | None) -> tuple[list[Segment], float]:
+    start = time.perf_counter()
+    segments = list(iter_text(path, kind, password))
+    return segments, time.perf_counter() - start
+
+
+def _serve(conn: Connection) -> None:
+    """工作进程主循环：逐个接收 (路径, 格式, 密码)，返回 ((segments, 耗时), 异常)，收到 None 退出"""
+    while (task := conn.recv()) is not None:
+        try:
+            conn.send((_extract_file(*task), None))
+        except Exception as e:
+            try:
+                conn.send((None, e))
+            except Exception:
+                # 异常无法 pickle
+                conn.send((None, RuntimeError(repr(e))))
+
+
+class _Worker:
+    """自有的工作进程，同一时间只处理一个文件；超时时单独终止"""
+
+    def __init__(self):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        # 只保留子进程持有的一端，子进程退出时 recv 得到 EOFError
+        child.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ExtractionService:
+    """
+    批量提取文字：主进程识别格式、计算哈希、查缓存，未命中的文件交给自有的工作进程
+
+    1. 逐个取用路径，每个工作进程同一时间只处理一个文件，提交即开始，超时从提交时算起；超时的文件记为 TimeoutError，
+       只终止处理它的工作进程并按需补充新进程，其余在途文件不受影响；工作进程意外退出时该文件记为 EOFError
+    2. 缓存为 cache/<sha256>.json（临时文件写入后原子替换），内容相同的文件（无论路径）只提取一次；缓存项无法读取时视为未命中
+    3. metrics 按格式累计文件数、字节数、字符数、错误、超时、缓存命中与提取耗时；超时文件的字节数与等待时间单独记录
+
+    Examples
+    --------
+    >>> service = ExtractionService(cache='.text-cache', timeout=60)
+    >>> for result in service.run(paths):
+    ...     if result.error is None:
+    ...         index.add(result.path, result.segments)
+    >>> service.metrics['pdf'].files_per_second
+    """
+
+    def __init__(self, cache: str | os.PathLike | None = None, workers: int | None = None, timeout: float = 60,
+                 password: str | None = None):
+        """
+        Parameters
+        ----------
+        cache: 缓存目录，None 为不缓存
+        workers: 进程数，None 为 CPU 数，0 为在当前进程提取（不限时）
+        timeout: 单个文件的超时时间（秒）
+        password: 加密 PDF 的密码
+        """
+        self.cache = cache and Path(cache)
+        self.workers = os.cpu_count() if workers is None else workers
+        self.timeout = timeout
+        self.password = password
+        self.metrics: dict[str, FormatMetrics] = {}
+
+    def _cache_path(self, digest: str) -> Path:
+        return self.cache / f'{digest}.json'
+
+    def _record(self, result: Extracted) -> Extracted:
+        metrics = self.metrics.setdefault(result.kind or 'unknown', FormatMetrics())
+        metrics.files += 1
+        metrics.bytes += result.size
+        metrics.cache_hits += result.cached
+        metrics.chars += sum(len(text) for _, text in result.segments)
+        metrics.errors += result.error is not None
+        if isinstance(result.error, TimeoutError):
+            metrics.timeouts += 1
+            metrics.timeout_bytes += result.size
+            metrics.timeout_seconds += result.seconds
+        else:
+            metrics.seconds += result.seconds
+        if self.cache and result.error is None and not result.cached:
+            self.cache.mkdir(parents=True, exist_ok=True)
+            path = self._cache_path(result.digest)
+            tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+            tmp.write_text(json.dumps({'kind': result.kind, 'segments': result.segments}, ensure_ascii=False),
+                           encoding='utf-8')
+            os.replace(tmp, path)
+        return result
+
+    def _prepare(self, path: str) -> Extracted:
+        """识别格式、计算哈希、查缓存；需要提取时 segments 为空且 error 为 None"""
+        try:
+            kind, digest, size = detect(path), _digest(path), os.path.getsize(path)
+        except OSError as e:
+            return Extracted(path, None, '', error=e)
+        if kind is None:
+            return Extracted(path, None, digest, size=size, error=ValueError(f'不支持的格式：{path}'))
+        if self.cache and (cache := self._cache_path(digest)).exists():
+            try:
+                segments = [tuple(segment) for segment in json.loads(cache.read_text(encoding='utf-8'))['segments']]
+            except (OSError, ValueError, KeyError, TypeError):
+                # 缓存项损坏或不完整，重新提取后覆盖
+                pass
+            else:
+                return Extracted(path, kind, digest, segments, size=size, cached=True)
+        return Extracted(path, kind, digest, size=size)
+
+    def run(self, paths: Iterable[str | os.PathLike]) -> Iterator[Extracted]:
+        """按完成顺序产出每个文件的结果；paths 逐个取用，可为生成器"""
+        prepared = map(self._prepare, map(str, paths))
+        if self.workers == 0:
+            for result in prepared:
+                if not result.cached and result.error is None:
+                    try:
+                        result.segments, result.seconds = _extract_file(result.path, result.kind, self.password)
+                    except Exception as e:
+                        result.error = e
+                yield self._record(result)
+            return
+        yield from self._run_pool(prepared)
+
+    def _run_pool(self, prepared: Iterator[Extracted]) -> Iterator[Extracted]:
+        idle: list[_Worker] = []
+        running: dict[Connection, tuple[_Worker, Extracted, float]] = {}
+        exhausted = False
+        try:
+            while True:
+                while len(running) < self.workers and not exhausted:
+                    result = next(prepared, None)
+                    if result is None:
+                        exhausted = True
+                    elif result.cached or result.error is not None:
+                        yield self._record(result)
+                    else:
+                        worker = idle.pop() if idle else _Worker()
+                        worker.conn.send((result.path, result.kind, self.password))
+                        running[worker.conn] = worker, result, time.monotonic() + self.timeout
+                if not running:
+                    break
+                deadline = min(deadline for _, _, deadline in running.values())
+                for conn in wait(list(running), max(deadline - time.monotonic(), 0)):
+                    worker, result, _ = running.pop(conn)
+                    try:
+                        value, error = conn.recv()
+                    except (EOFError, OSError) as e:
+                        # 工作进程意外退出（如崩溃）
+                        worker.kill()
+                        result.error = e
+                    else:
+                        idle.append(worker)
+                        if error is None and value[1] > self.timeout:
+                            # 结果可能在期限后才被取回（如主进程正忙于启动其他工作进程），按工作进程实测的耗时判定超时
+                            result.error, result.seconds = TimeoutError(f'提取超时：{result.path}'), self.timeout
+                        elif error is None:
+                            result.segments, result.seconds = value
+                        else:
+                            result.error = error
+                    yield self._record(result)
+                now = time.monotonic()
+                for conn, (worker, result, deadline) in list(running.items()):
+                    if deadline > now:
+                        continue
+                    # 正在执行的文件无法取消：只终止这一个工作进程
+                    del running[conn]
+                    worker.kill()
+                    result.error, result.seconds = TimeoutError(f'提取超时：{result.path}'), self.timeout
+                    yield self._record(result)
+        finally:
+            for worker, _, _ in running.values():
+                worker.kill()
+            for worker in idle:
+                worker.close()
+
+# endregion
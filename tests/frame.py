@@ -0,0 +1,227 @@
+"""
+pandas 数据导入：工作簿只打开一次、多投影复用解析结果，分块读取（声明 dtype 与分类），列式缓存（.npy 目录 / Feather / Parquet）
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Iterator, Sequence
+
+import numpy as np
+import pandas
+
+import sheet as sheets
+
+
+class ExcelBook:
+    """
+    工作簿只打开一次，每个工作表只解析一次（保留单元格原始值）；usecols/dtype/na_values/skiprows/nrows 等投影在已解析的
+    DataFrame 上完成，dtype 作用于单元格原始值，结果与 read_excel 一致
+
+    Examples
+    --------
+    >>> with ExcelBook('test.xlsx') as book:
+    ...     first = book.read(0, usecols=['caseid', 'data'])
+    ...     typed = book.read('read', dtype={'caseid': int, 'excepted': str})
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = path
+        self._file = pandas.ExcelFile(path)
+        # {工作表: 单元格原始值（object 列）}、{工作表: 推断类型后}
+        self._raw: dict[str, pandas.DataFrame] = {}
+        self._sheets: dict[str, pandas.DataFrame] = {}
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return self._file.sheet_names
+
+    def _name(self, sheet: str | int) -> str:
+        return self.sheet_names[sheet] if isinstance(sheet, int) else sheet
+
+    def raw(self, sheet: str | int = 0) -> pandas.DataFrame:
+        """整张工作表的单元格原始值，列均为 object（已缓存，勿原地修改）"""
+        name = self._name(sheet)
+        if name not in self._raw:
+            self._raw[name] = self._file.parse(name, dtype=object)
+        return self._raw[name]
+
+    def sheet(self, sheet: str | int = 0) -> pandas.DataFrame:
+        """整张工作表，类型推断同 read_excel（已缓存，勿原地修改）"""
+        name = self._name(sheet)
+        if name not in self._sheets:
+            self._sheets[name] = self.raw(name).infer_objects()
+        return self._sheets[name]
+
+    def read(self, sheet: str | int | list[str | int] = 0, usecols: Sequence[str | int] | None = None,
+             dtype: dict[str, Any] | None = None, na_values: Sequence[Any] | None = None, skiprows: int = 0,
+             nrows: int | None = None) -> pandas.DataFrame | dict[str | int, pandas.DataFrame]:
+        """
+        对应 pandas.read_excel 的同名参数，sheet 为列表时返回 {sheet: DataFrame}，均为副本，修改不影响缓存
+
+        dtype 作用于单元格原始值，如含空单元格的数字列指定 str 得到 '1'（而非先推断为 float64 再转换得到 '1.0'）；
+        na_values 替换为 NaN 后重新推断类型，如数字与 '/' 混合的列为 float64。与 read_excel 的区别：
+
+        1. usecols 只支持列名或下标的列表，不支持 'A:C' 形式的字符串与可调用对象
+        2. skiprows 只支持 int，为表头之后跳过的数据行数；read_excel 的 int skiprows 从文件第一行算起，含表头
+        3. na_values 按单元格值精确匹配（数字与字符串不互相匹配），不支持 {列名: 值} 形式
+
+        Parameters
+        ----------
+        usecols: 列名或 0 起始下标
+        dtype: {列名: dtype}
+        na_values: 识别为 NaN 的值，在默认值（空单元格、'NA'、'N/A' 等）之外
+        skiprows: 跳过表头之后的行数
+        nrows: 读取的行数
+        """
+        if isinstance(sheet, list):
+            return {item: self.read(item, usecols, dtype, na_values, skiprows, nrows) for item in sheet}
+        cached = frame = self.raw(sheet) if dtype else self.sheet(sheet)
+        if usecols is not None:
+            frame = frame.iloc[:, list(usecols)] if all(isinstance(c, int) for c in usecols) else frame[list(usecols)]
+        frame = frame.iloc[skiprows:None if nrows is None else skiprows + nrows]
+        if na_values:
+            frame = frame.mask(frame.isin(list(na_values)))
+        if dtype:
+            frame = frame.astype({column: kind for column, kind in dtype.items() if column in frame})
+        if dtype or na_values:
+            # 未指定 dtype 的 object 列按值推断，同 read_excel
+            frame = frame.infer_objects()
+        if frame is cached:
+            frame = frame.copy()
+        return frame.reset_index(drop=True) if skiprows else frame
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> 'ExcelBook':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_frames(source: str | os.PathLike, sheet: str | int | None = None, usecols: Sequence[str | int] | None = None,
+                dtype: dict[str, Any] | None = None, chunk_size: int = 65536) -> Iterator[pandas.DataFrame]:
+    """
+    分块读取为 DataFrame：.csv 用 read_csv(chunksize)，Excel 用只读模式流式解析
+
+    分类列应声明 pandas.CategoricalDtype(categories)，各块类别一致，拼接后仍为分类；只写 'category' 时各块类别不同，拼接后退化为 object
+
+    Parameters
+    ----------
+    source: 文件路径
+    sheet: 工作表名称或下标（Excel）
+    usecols: 列投影
+    dtype: {列名: dtype}
+    chunk_size: 每块行数
+    """
+    if Path(source).suffix.lower() == '.csv':
+        yield from pandas.read_csv(source, usecols=usecols, dtype=dtype, chunksize=chunk_size)
+        return
+    for chunk in sheets.iter_chunks(source, sheet, usecols, chunk_size):
+        frame = pandas.DataFrame(chunk)
+        yield frame.astype({column: kind for column, kind in (dtype or {}).items() if column in frame})
+
+
+def read_chunked(source: str | os.PathLike, sheet: str | int | None = None,
+                 usecols: Sequence[str | int] | None = None, dtype: dict[str, Any] | None = None,
+                 chunk_size: int = 65536) -> pandas.DataFrame:
+    """分块读取并拼接，参数同 iter_frames"""
+    frames = list(iter_frames(source, sheet, usecols, dtype, chunk_size))
+    return pandas.concat(frames, ignore_index=True) if frames else pandas.DataFrame(columns=usecols)
+
+
+# region 列式缓存
+
+def _save_npy(frame: pandas.DataFrame, directory: Path) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    columns = []
+    for i, (name, series) in enumerate(frame.items()):
+        meta = {'name': name, 'file': f'{i}.npy'}
+        if isinstance(series.dtype, pandas.CategoricalDtype):
+            meta |= {'kind': 'category', 'categories': series.cat.categories.tolist(),
+                     'ordered': bool(series.cat.ordered)}
+            values = series.cat.codes.to_numpy()
+        elif series.dtype.kind in 'biufcmM':
+            meta['kind'] = 'numpy'
+            values = series.to_numpy()
+        elif series.map(lambda value: isinstance(value, str), na_action='ignore').all():
+            # 字符串列存为定长 Unicode 数组，空值另存掩码
+            meta['kind'] = 'str'
+            values = series.fillna('').to_numpy(dtype=str)
+            if series.isna().any():
+                meta['mask'] = f'{i}.mask.npy'
+                np.save(directory / meta['mask'], series.isna().to_numpy())
+        else:
+            meta['kind'] = 'object'
+            values = series.to_numpy(dtype=object)
+        np.save(directory / meta['file'], values, allow_pickle=meta['kind'] == 'object')
+        columns.append(meta)
+    (directory / 'meta.json').write_text(json.dumps({'columns': columns}, ensure_ascii=False), encoding='utf-8')
+
+
+def _load_npy(directory: Path, mmap: bool) -> pandas.DataFrame:
+    meta = json.loads((directory / 'meta.json').read_text(encoding='utf-8'))
+    data = {}
+    for column in meta['columns']:
+        kind = column['kind']
+        values = np.load(directory / column['file'], mmap_mode='r' if mmap and kind == 'numpy' else None,
+                         allow_pickle=kind == 'object')
+        if kind == 'category':
+            series = pandas.Series(pandas.Categorical.from_codes(
+                values, dtype=pandas.CategoricalDtype(column['categories'], column['ordered'])))
+        elif kind == 'str':
+            series = pandas.Series(values, dtype=str)
+            if 'mask' in column:
+                series = series.mask(np.load(directory / column['mask']))
+        else:
+            # 数值列直接使用内存映射，不复制
+            series = pandas.Series(values, copy=False)
+        data[column['name']] = series
+    return pandas.DataFrame(data)
+
+
+def save_columnar(frame: pandas.DataFrame, path: str | os.PathLike) -> Path:
+    """
+    保存为列式缓存，格式由后缀决定
+
+    1. .feather / .parquet：需要 pyarrow
+    2. 其他：目录，每列一个 .npy，重新加载时数值列内存映射
+    """
+    path = Path(path)
+    if path.suffix == '.feather':
+        frame.reset_index(drop=True).to_feather(path)
+    elif path.suffix == '.parquet':
+        frame.to_parquet(path, index=False)
+    else:
+        _save_npy(frame, path)
+    return path
+
+
+def load_columnar(path: str | os.PathLike, mmap: bool = True) -> pandas.DataFrame:
+    path = Path(path)
+    if path.suffix == '.feather':
+        return pandas.read_feather(path)
+    if path.suffix == '.parquet':
+        return pandas.read_parquet(path)
+    return _load_npy(path, mmap)
+
+
+def cached(source: str | os.PathLike, cache: str | os.PathLike,
+           reader: Callable[[], pandas.DataFrame]) -> pandas.DataFrame:
+    """
+    缓存比源文件新时直接加载缓存，否则调用 reader 读取并写入缓存
+
+    Examples
+    --------
+    >>> frame = cached('big.xlsx', 'big.cache', lambda: read_chunked('big.xlsx', dtype={'id': 'int32'}))
+    """
+    cache = Path(cache)
+    marker = cache if cache.suffix in ('.feather', '.parquet') else cache / 'meta.json'
+    if marker.exists() and marker.stat().st_mtime >= os.stat(source).st_mtime:
+        return load_columnar(cache)
+    frame = reader()
+    save_columnar(frame, cache)
+    return frame
+
+# endregion
@@ -0,0 +1,841 @@
+"""
+网络测试辅助：共享连接池客户端、磁盘响应缓存、HTTP/2 客户端、本地替身服务器
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import ssl
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Iterable, Any, IO
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3 import Retry
+
+from util import Timer
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status: int
+    headers: dict[str, str]
+    # 响应体 sha256，对应 objects 目录下的文件
+    digest: str
+    size: int
+    stored_at: float
+    accessed: float
+    # 响应 Vary 所列请求头在存入时的取值，再次请求的取值不同视为未命中
+    vary: dict[str, str] = field(default_factory=dict)
+    # 响应 Cache-Control 的 max-age（no-cache 为 0），None 为使用缓存的 ttl
+    max_age: float | None = None
+
+
+def _cache_control(value: str) -> dict[str, str | None]:
+    """解析 Cache-Control：{指令(小写): 参数}，如 'max-age=60, no-cache' -> {'max-age': '60', 'no-cache': None}"""
+    directives = {}
+    for part in value.split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else None
+    return directives
+
+
+class ResponseCache:
+    """
+    磁盘 HTTP 响应缓存
+
+    1. 内容寻址：响应体按 sha256 存于 objects/，相同内容只存一份；index/ 下每个请求一个 JSON 元数据
+    2. 新鲜度：存入后 ttl 秒（响应 Cache-Control 有 max-age 时取 max-age）内直接命中；
+       过期或请求带 Cache-Control: no-cache 时携带 If-None-Match/If-Modified-Since 重新验证，304 则续期
+    3. 区分：缓存键含影响内容协商的请求头（User-Agent/Accept*），并按响应 Vary 校验存入时的请求头取值；
+       响应 Cache-Control 为 no-store/private 或 Vary: * 时不缓存
+    4. 容量：响应体总大小超过 max_size 时，按最近访问时间淘汰
+    5. 离线回放：offline=True 时只读缓存（不论是否过期），未命中抛出 ConnectionError
+    """
+
+    def __init__(self, directory: str | Path, ttl: float = 24 * 3600, max_size: int = 512 * 1024 * 1024,
+                 max_entry_size: int = 64 * 1024 * 1024, offline: bool = False):
+        """
+        Parameters
+        ----------
+        directory: 缓存目录
+        ttl: 新鲜期(秒)
+        max_size: 响应体总大小上限(字节)
+        max_entry_size: 单个响应体大小上限(字节)，超过不缓存
+        offline: 离线回放模式
+        """
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+        self.offline = offline
+        (self.directory / 'index').mkdir(parents=True, exist_ok=True)
+        (self.directory / 'objects').mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index: dict[str, CacheEntry] = {}
+        for path in (self.directory / 'index').glob('*.json'):
+            try:
+                self._index[path.stem] = CacheEntry(**json.loads(path.read_text(encoding='utf-8')))
+            except (ValueError, TypeError):
+                path.unlink(missing_ok=True)
+
+    # 影响响应内容的请求头，服务器未声明 Vary 时也计入缓存键
+    KEY_HEADERS = ('Authorization', 'User-Agent', 'Accept', 'Accept-Language', 'Accept-Encoding')
+
+    @classmethod
+    def key(cls, request: requests.PreparedRequest) -> str:
+        """按方法、URL 与 KEY_HEADERS 区分缓存项"""
+        headers = '\n'.join(request.headers.get(name, '') for name in cls.KEY_HEADERS)
+        return hashlib.sha256(f'{request.method} {request.url}\n{headers}'.encode()).hexdigest()
+
+    def _object(self, digest: str) -> Path:
+        return self.directory / 'objects' / digest[:2] / digest
+
+    def _save(self, key: str, entry: CacheEntry) -> None:
+        path = self.directory / 'index' / f'{key}.json'
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(asdict(entry)), encoding='utf-8')
+        os.replace(tmp, path)
+
+    def get(self, key: str, request: requests.PreparedRequest | None = None) -> tuple[CacheEntry, bytes] | None:
+        """request 不为 None 时校验 Vary 所列请求头的取值"""
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is None:
+            return None
+        if request is not None and any(request.headers.get(name, '') != value for name, value in entry.vary.items()):
+            return None
+        try:
+            body = self._object(entry.digest).read_bytes()
+        except FileNotFoundError:
+            return None
+        return entry, body
+
+    def fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.stored_at < (self.ttl if entry.max_age is None else entry.max_age)
+
+    def touch(self, key: str, revalidated: bool = False) -> None:
+        """记录访问时间；revalidated=True 表示 304 续期"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return
+            entry.accessed = time.time()
+            if revalidated:
+                entry.stored_at = entry.accessed
+            self._save(key, entry)
+
+    def put(self, key: str, response: requests.Response) -> None:
+        """存入响应；按响应 Cache-Control 与 Vary 判断是否可缓存"""
+        directives = _cache_control(response.headers.get('Cache-Control', ''))
+        vary = [name.strip() for name in response.headers.get('Vary', '').split(',') if name.strip()]
+        if 'no-store' in directives or 'private' in directives or '*' in vary:
+            return
+        if 'no-cache' in directives:
+            max_age = 0.0
+        else:
+            try:
+                max_age = float(directives['max-age'])
+            except (KeyError, TypeError, ValueError):
+                max_age = None
+        body = response.content
+        if len(body) > self.max_entry_size:
+            return
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f'.{threading.get_ident()}.tmp')
+            tmp.write_bytes(body)
+            os.replace(tmp, path)
+        now = time.time()
+        # 响应体已解码，去掉与原始传输相关的头
+        headers = {k: v for k, v in response.headers.items()
+                   if k.lower() not in ('content-encoding', 'transfer-encoding', 'content-length', 'connection')}
+        request = response.request
+        entry = CacheEntry(response.url, response.status_code, headers, digest, len(body), now, now,
+                           {name: request.headers.get(name, '') for name in vary}, max_age)
+        with self._lock:
+            self._index[key] = entry
+            self._save(key, entry)
+            self._evict()
+
+    def _evict(self) -> None:
+        sizes = {entry.digest: entry.size for entry in self._index.values()}
+        total = sum(sizes.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1].accessed):
+            if total <= self.max_size:
+                break
+            del self._index[key]
+            (self.directory / 'index' / f'{key}.json').unlink(missing_ok=True)
+            if all(other.digest != entry.digest for other in self._index.values()):
+                self._object(entry.digest).unlink(missing_ok=True)
+                total -= sizes[entry.digest]
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return sum({entry.digest: entry.size for entry in self._index.values()}.values())
+
+
+class CachingAdapter(HTTPAdapter):
+    """在 requests 传输层透明接入 ResponseCache，仅缓存不带 Range 的 GET 的 200 响应；返回的响应均带 from_cache 属性"""
+
+    def __init__(self, cache: ResponseCache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, **kwargs) -> requests.Response:
+        directives = _cache_control(request.headers.get('Cache-Control', ''))
+        if request.method != 'GET' or 'Range' in request.headers or 'no-store' in directives:
+            return self._send(request, stream=stream, **kwargs)
+        key = self.cache.key(request)
+        cached = self.cache.get(key, request)
+        # 请求 no-cache：即使新鲜也要重新验证
+        if cached and (self.cache.offline or 'no-cache' not in directives and self.cache.fresh(cached[0])):
+            self.cache.touch(key)
+            return self._build_cached(request, *cached)
+        if self.cache.offline:
+            raise requests.ConnectionError(f'离线模式，缓存未命中：{request.url}', request=request)
+        if cached:
+            entry = cached[0]
+            headers = CaseInsensitiveDict(entry.headers)
+            if 'ETag' in headers:
+                request.headers['If-None-Match'] = headers['ETag']
+            if 'Last-Modified' in headers:
+                request.headers['If-Modified-Since'] = headers['Last-Modified']
+        response = self._send(request, stream=stream, **kwargs)
+        if response.status_code == 304 and cached:
+            response.close()
+            self.cache.touch(key, revalidated=True)
+            return self._build_cached(request, *cached)
+        if response.status_code == 200:
+            length = response.headers.get('Content-Length')
+            # 流式下载长度未知或过大时不缓存，避免把整个响应读入内存
+            if not stream or (length and int(length) <= self.cache.max_entry_size):
+                self.cache.put(key, response)
+        return response
+
+    def _send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        response = super().send(request, **kwargs)
+        response.from_cache = False
+        return response
+
+    def _build_cached(self, request: requests.PreparedRequest, entry: CacheEntry, body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry.status
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = BytesIO(body)
+        response._content = body
+        response._content_consumed = True
+        response.url = entry.url
+        response.reason = 'OK'
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
+
+
+class HttpClient:
+    """
+    共享的 requests 会话：按主机复用连接池（keep-alive），统一超时与重试，可选磁盘响应缓存
+
+    1. pool_connections：缓存的主机连接池数
+    2. pool_maxsize：每个主机连接池的最大连接数，应不小于并发数
+    3. cache：ResponseCache，缓存命中的响应 from_cache 属性为 True
+    """
+    _shared: 'HttpClient | None' = None
+    _shared_lock = threading.Lock()
+    # 共享客户端的缓存目录；设置环境变量 HTTP_CACHE_OFFLINE=1 只从缓存回放
+    CACHE_DIR = Path(__file__).parent / '.http_cache'
+
+    def __init__(self, pool_connections: int = 15, pool_maxsize: int = 50, retries: Retry | int = 0,
+                 timeout: float = 10, headers: dict[str, str] | None = None, cache: ResponseCache | None = None):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        kwargs = dict(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retries)
+        adapter = CachingAdapter(cache, **kwargs) if cache else HTTPAdapter(**kwargs)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def shared(cls) -> 'HttpClient':
+        """进程内共享的客户端，带磁盘响应缓存"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cache = ResponseCache(cls.CACHE_DIR, offline=os.environ.get('HTTP_CACHE_OFFLINE') == '1')
+                cls._shared = cls(retries=Retry(total=3, backoff_factor=0.5), cache=cache)
+            return cls._shared
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    async def fetch_all(self, urls: Iterable[str], concurrency: int = 10,
+                        **kwargs) -> list[requests.Response | Exception]:
+        """
+        并发 GET，最多 concurrency 个请求同时进行
+
+        Parameters
+        ----------
+        urls: URL 列表
+        concurrency: 最大并发数
+        **kwargs: 传给 get 的参数
+
+        Returns
+        -------
+        与 urls 顺序一致的响应列表，失败的位置为异常对象
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(url: str) -> requests.Response:
+            async with semaphore:
+                return await asyncio.to_thread(self.get, url, **kwargs)
+
+        return await asyncio.gather(*(fetch(url) for url in urls), return_exceptions=True)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> 'HttpClient':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Downloader:
+    """
+    流式分段下载：按块写入磁盘，内存占用与文件大小无关
+
+    1. 服务端支持 Range 且文件大于 segment_size 时，切分为多个区间并发下载
+    2. 断点续传：进度记录在 <目标>.part.json，重新下载时跳过已完成的字节（以 ETag/大小/分段大小校验同一文件与分段）；
+       先刷新 .part 再原子替换进度文件，每下载 checkpoint_bytes 字节或间隔 checkpoint_seconds 秒记录一次，
+       进度文件损坏时重新下载
+    3. mux：边下载边交给 ffmpeg 合并音视频（POSIX 使用命名管道，输入须可顺序读取，如 DASH 分片 mp4；
+       其他平台先并发下载再合并）
+    """
+
+    def __init__(self, client: HttpClient | None = None, chunk_size: int = 1024 * 1024,
+                 segment_size: int = 8 * 1024 * 1024, workers: int = 4, checkpoint_bytes: int = 4 * 1024 * 1024,
+                 checkpoint_seconds: float = 1):
+        self.client = client or HttpClient(pool_maxsize=workers)
+        self.chunk_size = chunk_size
+        self.segment_size = segment_size
+        self.workers = workers
+        self.checkpoint_bytes = checkpoint_bytes
+        self.checkpoint_seconds = checkpoint_seconds
+
+    def probe(self, url: str, headers: dict[str, str] | None = None) -> tuple[int | None, bool, str]:
+        """(文件大小，是否支持 Range，ETag)"""
+        with self.client.get(url, headers={**(headers or {}), 'Range': 'bytes=0-0'}, stream=True) as r:
+            r.raise_for_status()
+            etag = r.headers.get('ETag', '')
+            if r.status_code == 206 and '/' in r.headers.get('Content-Range', ''):
+                total = r.headers['Content-Range'].rsplit('/', 1)[1]
+                return (int(total) if total != '*' else None), True, etag
+            length = r.headers.get('Content-Length')
+            return (int(length) if length else None), False, etag
+
+    def download(self, url: str, path: str | Path, headers: dict[str, str] | None = None) -> Path:
+        """
+        下载到文件
+
+        Parameters
+        ----------
+        url: 下载地址
+        path: 目标文件
+        headers: 请求头
+
+        Returns
+        -------
+        目标文件路径
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        path = Path(path)
+        part, meta_path = path.with_name(path.name + '.part'), path.with_name(path.name + '.part.json')
+        size, ranged, etag = self.probe(url, headers)
+        if not ranged or size is None or size <= self.segment_size:
+            part.unlink(missing_ok=True)
+            with open(part, 'wb') as f:
+                self.stream(url, f.write, headers)
+            os.replace(part, path)
+            return path
+        meta = None
+        if meta_path.exists() and part.exists():
+            try:
+                meta = json.loads(meta_path.read_text())
+            except ValueError:
+                # 进度文件损坏，重新下载
+                pass
+        # 分段由 segment_size 决定，与上次不同时各段的区间对不上，重新下载
+        if (not isinstance(meta, dict)
+                or (meta.get('size'), meta.get('etag'), meta.get('segment_size')) != (size, etag, self.segment_size)):
+            meta = {'size': size, 'etag': etag, 'segment_size': self.segment_size,
+                    'done': {str(start): 0 for start in range(0, size, self.segment_size)}}
+            with open(part, 'wb') as f:
+                f.truncate(size)
+        lock = threading.Lock()
+        saved_at = time.monotonic()
+
+        def checkpoint(f: IO[bytes], start: int, done: int) -> None:
+            """先把已写入的数据刷新到 .part，再原子替换进度文件，进度不会超前于磁盘上的数据"""
+            nonlocal saved_at
+            f.flush()
+            with lock:
+                meta['done'][str(start)] = done
+                tmp = meta_path.with_suffix('.tmp')
+                tmp.write_text(json.dumps(meta))
+                os.replace(tmp, meta_path)
+                saved_at = time.monotonic()
+
+        def fetch(start: int) -> None:
+            end = min(start + self.segment_size, size) - 1
+            done = meta['done'][str(start)]
+            offset = start + done
+            if offset > end:
+                return
+            with open(part, 'r+b') as f, self.client.get(
+                    url, headers={**(headers or {}), 'Range': f'bytes={offset}-{end}'}, stream=True) as r:
+                if r.status_code != 206:
+                    raise requests.HTTPError(f'Range 请求失败：{r.status_code}', response=r)
+                f.seek(offset)
+                pending = 0
+                for chunk in r.iter_content(self.chunk_size):
+                    f.write(chunk)
+                    done += len(chunk)
+                    pending += len(chunk)
+                    if pending >= self.checkpoint_bytes or time.monotonic() - saved_at >= self.checkpoint_seconds:
+                        checkpoint(f, start, done)
+                        pending = 0
+                if pending:
+                    checkpoint(f, start, done)
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            list(executor.map(fetch, map(int, meta['done'])))
+        os.replace(part, path)
+        meta_path.unlink(missing_ok=True)
+        return path
+
+    def stream(self, url: str, write: Callable[[bytes], Any], headers: dict[str, str] | None = None) -> int:
+        """按块顺序下载，每块交给 write；返回总字节数"""
+        total = 0
+        with self.client.get(url, headers=headers, stream=True) as r:
+            r.raise_for_status()
+            for chunk in r.iter_content(self.chunk_size):
+                write(chunk)
+                total += len(chunk)
+        return total
+
+    def mux(self, video_url: str, audio_url: str, output: str | Path, headers: dict[str, str] | None = None,
+            ffmpeg_args: Iterable[str] = ('-c', 'copy')) -> Path:
+        """
+        下载音视频并用 ffmpeg 合并，ffmpeg 在下载过程中即开始处理
+
+        Parameters
+        ----------
+        video_url: 视频流地址
+        audio_url: 音频流地址
+        output: 输出文件
+        headers: 请求头
+        ffmpeg_args: 输出参数，默认不重新编码
+
+        Returns
+        -------
+        输出文件路径
+        """
+        import subprocess
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+        try:
+            from imageio_ffmpeg import get_ffmpeg_exe
+            ffmpeg = get_ffmpeg_exe()
+        except ImportError:
+            ffmpeg = 'ffmpeg'
+        with tempfile.TemporaryDirectory() as tmpdir, ThreadPoolExecutor(2) as executor:
+            video, audio = Path(tmpdir) / 'video', Path(tmpdir) / 'audio'
+            if hasattr(os, 'mkfifo'):
+                os.mkfifo(video)
+                os.mkfifo(audio)
+
+                def feed(url: str, fifo: Path) -> None:
+                    with open(fifo, 'wb') as f:
+                        try:
+                            self.stream(url, f.write, headers)
+                        except BrokenPipeError:
+                            pass
+
+                futures = [executor.submit(feed, video_url, video), executor.submit(feed, audio_url, audio)]
+            else:
+                futures = [executor.submit(self.download, video_url, video, headers),
+                           executor.submit(self.download, audio_url, audio, headers)]
+                for future in futures:
+                    future.result()
+            process = subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-i', str(video), '-i', str(audio),
+                                      '-map', '0:v:0', '-map', '1:a:0', *ffmpeg_args, str(output)],
+                                     capture_output=True)
+            # ffmpeg 未打开的管道：以非阻塞方式打开再关闭，让阻塞在 open 上的写入线程退出
+            for fifo, future in zip((video, audio), futures):
+                if fifo.is_fifo() and not future.done():
+                    os.close(os.open(fifo, os.O_RDONLY | os.O_NONBLOCK))
+            for future in futures:
+                future.result()
+        if process.returncode:
+            raise RuntimeError(process.stderr.decode(errors='replace'))
+        return Path(output)
+
+
+class UserAgents:
+    """
+    User-Agent 池：fake-useragent 数据集只加载一次，按 os/browser/type 预建索引
+
+    1. 过滤条件组合的结果列表首次使用时构建并缓存，之后每次随机选取为 O(1)
+    2. for_host：同一主机按打乱后的顺序轮换 UA
+    """
+    _shared: 'UserAgents | None' = None
+    _shared_lock = threading.Lock()
+    FIELDS = ('os', 'browser', 'type')
+    FALLBACK = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                'Chrome/120.0.0.0 Safari/537.36')
+
+    def __init__(self, data: list[dict[str, Any]] | None = None):
+        """
+        Parameters
+        ----------
+        data: UA 记录列表，默认为 fake-useragent 自带数据集
+        """
+        if data is None:
+            from fake_useragent.utils import load
+            data = load()
+        self._index: dict[tuple[str, str], set[int]] = {}
+        self._agents = [record['useragent'] for record in data]
+        for i, record in enumerate(data):
+            for name in self.FIELDS:
+                self._index.setdefault((name, record.get(name)), set()).add(i)
+        self._filtered: dict[tuple, list[str]] = {}
+        self._hosts: dict[str, tuple[list[str], int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'UserAgents':
+        """进程内共享的 UA 池"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def filter(self, os: str | None = None, browser: str | None = None, type: str | None = None) -> list[str]:
+        """满足条件的 UA 列表，如 os='Windows'、browser='Chrome'、type='desktop'"""
+        key = (os, browser, type)
+        if key not in self._filtered:
+            ids = set(range(len(self._agents)))
+            for name, value in zip(self.FIELDS, key):
+                if value is not None:
+                    ids &= self._index.get((name, value), set())
+            self._filtered[key] = [self._agents[i] for i in sorted(ids)]
+        return self._filtered[key]
+
+    def random(self, os: str | None = None, browser: str | None = None, type: str | None = None) -> str:
+        """随机 UA，没有满足条件的记录时返回 FALLBACK"""
+        agents = self.filter(os, browser, type)
+        return random.choice(agents) if agents else self.FALLBACK
+
+    def for_host(self, url: str, **filters) -> str:
+        """按主机轮换 UA，过滤条件以该主机首次调用时为准"""
+        host = urlsplit(url).netloc or url
+        with self._lock:
+            if host not in self._hosts:
+                candidates = self.filter(**filters)
+                self._hosts[host] = (random.sample(candidates, len(candidates)) or [self.FALLBACK], 0)
+            agents, i = self._hosts[host]
+            self._hosts[host] = (agents, (i + 1) % len(agents))
+        return agents[i]
+
+
+@dataclass
+class H2Response:
+    status: int
+    headers: dict[str, str]
+    content: bytes = b''
+
+
+class H2Client:
+    """
+    基于 h2 的异步 HTTP/2 客户端：一条连接上多路复用多个请求
+
+    https 通过 ALPN 协商 h2；http 使用 h2c prior knowledge（服务端须支持，如 LocalServer）
+
+    Examples
+    --------
+    >>> async with H2Client('https://www.python.org') as client:
+    ...     responses = await client.get_many(['/', '/about/'])
+    """
+
+    def __init__(self, base_url: str, headers: dict[str, str] | None = None, max_streams: int = 100):
+        self.base = urlsplit(base_url)
+        self.headers = headers or {}
+        self.max_streams = max_streams
+        self._writer: asyncio.StreamWriter | None = None
+        self._streams: dict[int, tuple[H2Response, asyncio.Future]] = {}
+        self._reader_task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        import h2.config
+        import h2.connection
+        https = self.base.scheme == 'https'
+        port = self.base.port or (443 if https else 80)
+        ctx = None
+        if https:
+            ctx = ssl.create_default_context()
+            ctx.set_alpn_protocols(['h2'])
+        reader, self._writer = await asyncio.open_connection(self.base.hostname, port, ssl=ctx)
+        if https and self._writer.get_extra_info('ssl_object').selected_alpn_protocol() != 'h2':
+            self._writer.close()
+            raise ConnectionError(f'{self.base.hostname} 不支持 HTTP/2')
+        self._conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=True, header_encoding='utf-8'))
+        self._conn.initiate_connection()
+        self._writer.write(self._conn.data_to_send())
+        await self._writer.drain()
+        self._reader_task = asyncio.create_task(self._read_loop(reader))
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        import h2.events
+        try:
+            while data := await reader.read(65536):
+                for event in self._conn.receive_data(data):
+                    entry = self._streams.get(getattr(event, 'stream_id', None))
+                    if isinstance(event, h2.events.ResponseReceived) and entry:
+                        headers = dict(event.headers)
+                        entry[0].status = int(headers.pop(':status'))
+                        entry[0].headers = headers
+                    elif isinstance(event, h2.events.DataReceived) and entry:
+                        entry[0].content += event.data
+                        self._conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded) and entry:
+                        self._streams.pop(event.stream_id)
+                        entry[1].set_result(entry[0])
+                    elif isinstance(event, h2.events.StreamReset) and entry:
+                        self._streams.pop(event.stream_id)
+                        entry[1].set_exception(ConnectionError(f'stream {event.stream_id} reset: {event.error_code}'))
+                if outbound := self._conn.data_to_send():
+                    self._writer.write(outbound)
+        finally:
+            for _, future in self._streams.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('连接已关闭'))
+
+    async def get(self, path: str, headers: dict[str, str] | None = None) -> H2Response:
+        future = asyncio.get_running_loop().create_future()
+        async with self._lock:
+            stream_id = self._conn.get_next_available_stream_id()
+            self._streams[stream_id] = (H2Response(0, {}), future)
+            self._conn.send_headers(stream_id, [
+                (':method', 'GET'), (':path', path), (':scheme', self.base.scheme), (':authority', self.base.netloc),
+                *{**self.headers, **(headers or {})}.items(),
+            ], end_stream=True)
+            self._writer.write(self._conn.data_to_send())
+            await self._writer.drain()
+        return await future
+
+    async def get_many(self, paths: Iterable[str]) -> list[H2Response | Exception]:
+        """在同一连接上并发请求，并发流数不超过 max_streams 与服务端 MAX_CONCURRENT_STREAMS"""
+        semaphore = asyncio.Semaphore(min(self.max_streams, self._conn.remote_settings.max_concurrent_streams))
+
+        async def fetch(path: str) -> H2Response:
+            async with semaphore:
+                return await self.get(path)
+
+        return await asyncio.gather(*(fetch(path) for path in paths), return_exceptions=True)
+
+    async def close(self) -> None:
+        if self._writer:
+            self._conn.close_connection()
+            self._writer.write(self._conn.data_to_send())
+            self._writer.close()
+            self._reader_task.cancel()
+            self._writer = None
+
+    async def __aenter__(self) -> 'H2Client':
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+Route = Callable[[Request], tuple[int, dict[str, str], bytes]]
+
+
+class LocalServer:
+    """
+    本地替身 HTTP 服务器：HTTP/1.1 keep-alive 与 h2c prior knowledge，用于离线测试与吞吐基准
+
+    路由按路径前缀匹配，取最长前缀；静态内容用 add，动态内容用 route
+
+    Examples
+    --------
+    >>> with LocalServer() as server:
+    ...     server.add('/hello', b'hello')
+    ...     requests.get(server.url + '/hello').content
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.routes: dict[str, Route] = {}
+        # 已处理的请求数，各处理线程并发累加
+        self.requests = 0
+        self._requests_lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 响应头与响应体分两次写出，keep-alive 下需关闭 Nagle 算法，否则每个请求多等一次延迟 ACK
+            disable_nagle_algorithm = True
+
+            def handle(self):
+                if self.rfile.peek(24)[:24] == b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n':
+                    server._serve_h2(self.connection, self.rfile)
+                else:
+                    super().handle()
+
+            def respond(self, method: str) -> None:
+                status, headers, body = server.dispatch(Request(method, self.path, dict(self.headers.items())))
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if method != 'HEAD':
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                self.respond('GET')
+
+            def do_HEAD(self):
+                self.respond('HEAD')
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def add(self, path: str, body: bytes, status: int = 200, headers: dict[str, str] | None = None) -> None:
+        """静态路由，支持单区间 Range 请求"""
+        headers = {'Accept-Ranges': 'bytes', **(headers or {})}
+
+        def static(request: Request) -> tuple[int, dict[str, str], bytes]:
+            range_ = CaseInsensitiveDict(request.headers).get('Range', '')
+            if status != 200 or not range_.startswith('bytes='):
+                return status, headers, body
+            start, _, end = range_[6:].partition('-')
+            start, end = int(start), min(int(end) if end else len(body) - 1, len(body) - 1)
+            return 206, {**headers, 'Content-Range': f'bytes {start}-{end}/{len(body)}'}, body[start:end + 1]
+
+        self.routes[path] = static
+
+    def route(self, path: str, handler: Route) -> None:
+        """动态路由，handler(Request) → (状态码, 响应头, 响应体)"""
+        self.routes[path] = handler
+
+    def dispatch(self, request: Request) -> tuple[int, dict[str, str], bytes]:
+        with self._requests_lock:
+            self.requests += 1
+        path = request.path.split('?', 1)[0]
+        prefixes = [prefix for prefix in self.routes if path.startswith(prefix)]
+        if not prefixes:
+            return 404, {}, b'Not Found'
+        return self.routes[max(prefixes, key=len)](request)
+
+    def _serve_h2(self, sock, rfile) -> None:
+        import h2.config
+        import h2.connection
+        import h2.events
+        conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+        conn.initiate_connection()
+        sock.sendall(conn.data_to_send())
+        requests_: dict[int, Request] = {}
+        pending: dict[int, bytes] = {}
+
+        def flush(stream_id: int) -> None:
+            data = pending[stream_id]
+            while data:
+                size = min(conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size, len(data))
+                if size <= 0:
+                    break
+                conn.send_data(stream_id, data[:size])
+                data = data[size:]
+            if data:
+                pending[stream_id] = data
+            else:
+                del pending[stream_id]
+                conn.end_stream(stream_id)
+
+        while data := rfile.read1(65536):
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    headers = dict(event.headers)
+                    requests_[event.stream_id] = Request(headers.pop(':method'), headers.pop(':path'), headers)
+                elif isinstance(event, h2.events.StreamEnded) and event.stream_id in requests_:
+                    status, headers, body = self.dispatch(requests_.pop(event.stream_id))
+                    conn.send_headers(event.stream_id, [(':status', str(status)),
+                                                        ('content-length', str(len(body))), *headers.items()])
+                    pending[event.stream_id] = body
+                    flush(event.stream_id)
+                elif isinstance(event, h2.events.WindowUpdated):
+                    for stream_id in ([event.stream_id] if event.stream_id else list(pending)):
+                        if stream_id in pending:
+                            flush(stream_id)
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    sock.sendall(conn.data_to_send())
+                    return
+            sock.sendall(conn.data_to_send())
+
+    def start(self) -> 'LocalServer':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'LocalServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def throughput(func: Callable[[], Any], n: int) -> float:
+    """吞吐量(请求/秒)，func 一次调用完成全部 n 个请求"""
+    elapsed, _ = Timer.measure(func)
+    return n / elapsed
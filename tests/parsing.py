@@ -0,0 +1,330 @@
+"""
+解析辅助：JSONPath 查询缓存与批量求值、XML/HTML 流式解析、正则字段提取
+"""
+import heapq
+import json
+import re
+from functools import lru_cache
+from os import PathLike
+from typing import Any, IO, Iterable, Iterator
+
+import requests
+from jsonpath_ng import JSONPath, parse
+from jsonpath_ng.jsonpath import Child, Fields, Index, Root, Slice
+from lxml import etree
+
+# region JSONPath
+
+# 路径段：('field', 名称元组) | ('fields',)（.*） | ('index', 下标元组) | ('slice',)（[*]）
+_Segment = tuple
+
+
+@lru_cache(maxsize=1024)
+def compile_path(expr: str) -> JSONPath:
+    """编译 JSONPath 表达式，相同表达式只解析一次（jsonpath-ng 基于 PLY 的解析器构造开销大）"""
+    return parse(expr)
+
+
+def _segments(node: JSONPath) -> list[_Segment] | None:
+    """将简单路径（字段、.*、下标、[*]）展开为路径段；含其他语法时返回 None"""
+    if isinstance(node, Root):
+        return []
+    if isinstance(node, Child):
+        left, right = _segments(node.left), _segments(node.right)
+        return None if left is None or right is None else left + right
+    if isinstance(node, Fields):
+        if node.fields == ('*',):
+            return [('fields',)]
+        return None if '*' in node.fields else [('field', node.fields)]
+    if isinstance(node, Index):
+        return [('index', node.indices)]
+    if isinstance(node, Slice) and (node.start, node.end, node.step) == (None, None, None):
+        return [('slice',)]
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _compiled_segments(expr: str) -> tuple[_Segment, ...] | None:
+    segments = _segments(compile_path(expr))
+    return None if segments is None else tuple(segments)
+
+
+def _children(value: Any, segment: _Segment) -> Iterator[Any]:
+    """
+    与 jsonpath-ng 相同的语义：.* 只展开对象的值；[*] 展开数组，对象与标量视为单元素数组，null 无匹配；
+    下标作用于数组与字符串（jsonpath-ng 对数字取下标抛出 TypeError，此处视为无匹配）
+    """
+    kind = segment[0]
+    if kind == 'slice':
+        if isinstance(value, list):
+            yield from value
+        elif value is not None:
+            yield value
+    elif kind == 'fields' and isinstance(value, dict):
+        yield from value.values()
+    elif kind == 'field' and isinstance(value, dict):
+        yield from (value[name] for name in segment[1] if name in value)
+    elif kind == 'index' and isinstance(value, (list, str)):
+        yield from (value[i] for i in segment[1] if -len(value) <= i < len(value))
+
+
+def find_many(document: Any, exprs: dict[str, str]) -> dict[str, list[Any]]:
+    """
+    对同一文档批量求值多个 JSONPath
+
+    简单路径（字段、.*、下标、[*]）合并成前缀树，一次遍历文档得到全部结果；其余表达式逐个用 jsonpath-ng 求值
+
+    Parameters
+    ----------
+    document: JSON 文档（已解析）
+    exprs: {名称: JSONPath 表达式}
+
+    Returns
+    -------
+    {名称: 匹配值列表}
+    """
+    results: dict[str, list[Any]] = {name: [] for name in exprs}
+    # 前缀树节点：[{路径段: 子节点}, 终止于此的名称列表]
+    trie: list = [{}, []]
+    for name, expr in exprs.items():
+        segments = _compiled_segments(expr)
+        if segments is None:
+            results[name] = [match.value for match in compile_path(expr).find(document)]
+            continue
+        node = trie
+        for segment in segments:
+            node = node[0].setdefault(segment, [{}, []])
+        node[1].append(name)
+
+    def walk(value: Any, node: list) -> None:
+        for name in node[1]:
+            results[name].append(value)
+        for segment, child in node[0].items():
+            for item in _children(value, segment):
+                walk(item, child)
+
+    walk(document, trie)
+    return results
+
+
+def _split_stream_path(expr: str) -> tuple[list[str], tuple[_Segment, ...]]:
+    segments = _compiled_segments(expr)
+    if segments is None or ('slice',) not in segments:
+        raise ValueError(f'流式求值只支持 $.a.b[*]... 形式的简单路径：{expr}')
+    i = segments.index(('slice',))
+    prefix = segments[:i]
+    if any(segment[0] != 'field' or len(segment[1]) != 1 for segment in prefix):
+        raise ValueError(f'[*] 之前只能是单个字段：{expr}')
+    return [segment[1][0] for segment in prefix], segments[i + 1:]
+
+
+def stream_matches(fp: IO[str], expr: str, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    流式求值：逐个解析大数组的元素，不构建完整文档树
+
+    Parameters
+    ----------
+    fp: 文本文件对象
+    expr: 形如 $.a.b[*].c 的路径，[*] 所在数组被流式读取（不是数组时无匹配），其后的部分对每个元素求值
+    chunk_size: 每次读取字符数
+
+    Returns
+    -------
+    匹配值的迭代器
+    """
+    keys, rest = _split_stream_path(expr)
+    decoder = json.JSONDecoder()
+    buffer, pos = '', 0
+
+    def fill() -> bool:
+        nonlocal buffer, pos
+        chunk = fp.read(chunk_size)
+        buffer, pos = buffer[pos:] + chunk, 0
+        return bool(chunk)
+
+    def skip_ws() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return buffer[pos] if pos < len(buffer) else ''
+
+    def decode() -> Any:
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            # 数字可能被块边界截断，确认其后还有字符
+            if end == len(buffer) and fill():
+                continue
+            pos = end
+            return value
+
+    # 定位目标数组：逐层进入对象，跳过（解析后丢弃）不相关的值
+    for key in keys:
+        if skip_ws() != '{':
+            return
+        pos += 1
+        while True:
+            if skip_ws() == '}':
+                return
+            name = decode()
+            skip_ws()
+            pos += 1  # ':'
+            if name == key:
+                break
+            skip_ws()
+            decode()
+            if skip_ws() == ',':
+                pos += 1
+    if skip_ws() != '[':
+        return
+    pos += 1
+    while skip_ws() not in (']', ''):
+        item = decode()
+        yield from _walk_segments(item, rest)
+        if skip_ws() == ',':
+            pos += 1
+
+
+def _walk_segments(value: Any, segments: Iterable[_Segment]) -> Iterator[Any]:
+    segments = tuple(segments)
+    if not segments:
+        yield value
+        return
+    for item in _children(value, segments[0]):
+        yield from _walk_segments(item, segments[1:])
+
+# endregion
+
+# region XML
+
+@lru_cache(maxsize=1024)
+def _xpath(expr: str, namespaces: tuple[tuple[str, str], ...]) -> etree.XPath:
+    # smart_strings=False：结果字符串不反向引用所在元素，元素清除后可被回收
+    return etree.XPath(expr, namespaces=dict(namespaces), smart_strings=False)
+
+
+def compile_xpath(expr: str, namespaces: dict[str, str] | None = None) -> etree.XPath:
+    """编译 XPath 表达式，相同表达式只编译一次"""
+    return _xpath(expr, tuple(sorted((namespaces or {}).items())))
+
+
+def _pull_events(response: requests.Response, tag: str, html: bool, chunk_size: int) -> Iterator[etree._Element]:
+    parser = (etree.HTMLPullParser if html else etree.XMLPullParser)(events=('end',), tag=tag)
+    for chunk in response.iter_content(chunk_size):
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            yield element
+    parser.close()
+    for _, element in parser.read_events():
+        yield element
+
+
+def iter_records(source: str | PathLike | IO[bytes] | requests.Response, tag: str, fields: dict[str, str],
+                 namespaces: dict[str, str] | None = None, html: bool = False,
+                 chunk_size: int = 64 * 1024) -> Iterator[dict[str, Any]]:
+    """
+    流式解析 XML/HTML：每遇到一个 tag 元素（记录）结束，对其执行预编译的 XPath，随后清除该元素及已处理的兄弟元素，内存占用不随文档增长
+
+    Parameters
+    ----------
+    source: 文件路径、二进制文件对象，或 stream=True 的 requests 响应（边下载边解析）
+    tag: 记录元素的标签，带命名空间时为 {uri}name
+    fields: {字段名: 相对记录元素的 XPath}，如 'string(title)'、'@id'
+    namespaces: XPath 使用的命名空间前缀
+    html: 按 HTML 解析
+    chunk_size: 从响应读取的块大小
+
+    Returns
+    -------
+    {字段名: XPath 结果} 的迭代器
+    """
+    xpaths = {name: compile_xpath(expr, namespaces) for name, expr in fields.items()}
+    if isinstance(source, requests.Response):
+        elements = _pull_events(source, tag, html, chunk_size)
+    else:
+        elements = (element for _, element in etree.iterparse(source, events=('end',), tag=tag, html=html))
+    for element in elements:
+        yield {name: xpath(element) for name, xpath in xpaths.items()}
+        element.clear(keep_tail=True)
+        # 已清除的元素仍挂在父元素上，删除之前的兄弟元素
+        parent = element.getparent()
+        while parent is not None and element.getprevious() is not None:
+            del parent[0]
+
+# endregion
+
+# region 正则提取
+
+class Extractor:
+    """
+    页面字段提取器：命名正则的登记表，每个正则按 str/bytes 各编译一次，提取时每个字段各扫描一次页面
+
+    1. 有捕获组时取第一个捕获组，否则取整个匹配
+    2. 可直接扫描 bytes 响应体，省去把整个页面解码为 str（正则按 UTF-8 编码为 bytes 模式，字符类中不宜含非 ASCII 字符）
+    3. search 对每个字段各搜索一次，找到首个匹配即停止；以字面量开头的正则由 re 用快速前缀查找定位候选位置
+    4. finditer 对每个字段各扫描一遍，再按匹配位置归并，并非单次扫描
+
+    不合并成交替式 (p1)|(p2)|... 单次扫描：CPython 的 re 是回溯引擎，交替式在每个位置依次尝试各分支，
+    又失去字面量前缀查找，实测比逐个搜索慢一个数量级
+
+    Examples
+    --------
+    >>> extractor = Extractor({'audio': r'"id":30216,"baseUrl":"(.*?)"', 'video': r'"id":16,"baseUrl":"(.*?)"'})
+    >>> extractor.search(r.content)
+    {'audio': b'https://...', 'video': b'https://...'}
+    """
+
+    def __init__(self, patterns: dict[str, str] | None = None, flags: int = 0):
+        self.flags = flags
+        self.patterns: dict[str, str] = {}
+        self._compiled: dict[type, dict[str, re.Pattern]] = {}
+        for name, pattern in (patterns or {}).items():
+            self.register(name, pattern)
+
+    def register(self, name: str, pattern: str) -> 'Extractor':
+        compiled = re.compile(pattern, self.flags)
+        self.patterns[name] = pattern
+        self._compiled.setdefault(str, {})[name] = compiled
+        self._compiled.pop(bytes, None)
+        return self
+
+    def compiled(self, kind: type = str) -> dict[str, re.Pattern]:
+        """{字段名: 编译后的正则}，kind 为 str 或 bytes"""
+        if kind not in self._compiled:
+            self._compiled[kind] = {name: re.compile(pattern.encode(), self.flags)
+                                    for name, pattern in self.patterns.items()}
+        return self._compiled[kind]
+
+    @staticmethod
+    def _value(match: re.Match) -> str | bytes:
+        return match.group(1 if match.re.groups else 0)
+
+    def search(self, data: str | bytes, names: Iterable[str] | None = None) -> dict[str, str | bytes | None]:
+        """每个字段的首个匹配，未匹配为 None"""
+        compiled = self.compiled(type(data))
+        return {name: (match := compiled[name].search(data)) and self._value(match)
+                for name in (self.patterns if names is None else names)}
+
+    def finditer(self, data: str | bytes) -> Iterator[tuple[str, str | bytes]]:
+        """全部字段的全部匹配，按出现位置依次产出 (字段名, 值)；每个字段各扫描一遍，heapq.merge 按位置归并"""
+        def located(name: str, pattern: re.Pattern) -> Iterator[tuple[int, str, re.Match]]:
+            return ((match.start(), name, match) for match in pattern.finditer(data))
+
+        matches = (located(name, pattern) for name, pattern in self.compiled(type(data)).items())
+        for _, name, match in heapq.merge(*matches, key=lambda item: item[0]):
+            yield name, self._value(match)
+
+    def findall(self, data: str | bytes) -> dict[str, list[str | bytes]]:
+        results: dict[str, list[str | bytes]] = {name: [] for name in self.patterns}
+        for name, value in self.finditer(data):
+            results[name].append(value)
+        return results
+
+# endregion
@@ -0,0 +1,239 @@
+"""
+基于 tenacity 的重试引擎：同步/异步通用，重试预算（令牌桶）防止重试风暴，熔断器快速失败，统计重试指标
+"""
+import functools
+import inspect
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from tenacity import (AsyncRetrying, RetryCallState, Retrying, retry_if_exception_type, retry_if_not_exception_type,
+                      stop_after_attempt, wait_random_exponential)
+from tenacity.retry import retry_base
+from tenacity.stop import StopBaseT, stop_base
+from tenacity.wait import WaitBaseT
+
+
+class RetryBudget:
+    """
+    重试预算令牌桶：每次重试消耗一个令牌，令牌按 rate 个/秒补充，最多 capacity 个
+
+    令牌耗尽时不再重试，避免下游故障时重试放大流量
+    """
+
+    def __init__(self, capacity: float = 10, rate: float = 1):
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用被拒绝"""
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    1. closed：正常调用，连续失败 failure_threshold 次后 → open
+    2. open：直接拒绝调用，reset_timeout 秒后 → half_open
+    3. half_open：放行一次试探调用，成功 → closed，失败 → open；试探被取消或中断（非 Exception）时 release，
+       仍为 half_open，放行下一次试探
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state, self._trial = 'half_open', False
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """试探调用未得出结果（被取消或中断），交还试探名额"""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state, self._failures = 'closed', 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                self.state, self._opened_at = 'open', time.monotonic()
+
+
+@dataclass
+class RetryMetrics:
+    calls: int = 0
+    attempts: int = 0
+    retries: int = 0
+    failures: int = 0
+    # 因预算耗尽而放弃的重试
+    budget_exhausted: int = 0
+    # 被熔断器拒绝的调用
+    rejected: int = 0
+    # 累计等待秒数
+    sleep_time: float = 0.0
+
+
+class _stop_if_budget_exhausted(stop_base):
+    def __init__(self, policy: 'RetryPolicy', key: str):
+        self.policy = policy
+        self.key = key
+
+    def __call__(self, retry_state: RetryCallState) -> bool:
+        budget = self.policy.budget_for(self.key)
+        if budget is None or budget.try_acquire():
+            return False
+        self.policy._count('budget_exhausted')
+        return True
+
+
+class RetryPolicy:
+    """
+    重试策略装饰器，自动识别协程函数：协程使用 AsyncRetrying，等待时 await asyncio.sleep，不占用线程
+
+    预算与熔断器可全局共享，也可通过 key 函数按调用参数（如主机）分别维护
+
+    Examples
+    --------
+    >>> policy = RetryPolicy(stop=stop_after_attempt(3), budget=RetryBudget(10, 1),
+    ...                      breaker=lambda: CircuitBreaker(5, 30), key=lambda url: urlsplit(url).netloc)
+    >>> @policy
+    ... async def fetch(url): ...
+    """
+
+    def __init__(self, stop: StopBaseT = stop_after_attempt(3), wait: WaitBaseT = wait_random_exponential(0.5, 10),
+                 retry: retry_base = retry_if_exception_type(Exception),
+                 budget: RetryBudget | Callable[[], RetryBudget] | None = None,
+                 breaker: CircuitBreaker | Callable[[], CircuitBreaker] | None = None,
+                 key: Callable[..., str] | None = None, reraise: bool = True):
+        """
+        Parameters
+        ----------
+        stop, wait, retry: 同 tenacity.retry
+        budget: 共享的 RetryBudget；或工厂函数，按 key 各建一个
+        breaker: 共享的 CircuitBreaker；或工厂函数，按 key 各建一个
+        key: 由被装饰函数的参数计算分组键，如主机名；None 表示全局一组
+        reraise: 放弃重试时抛出原始异常，而非 RetryError
+        """
+        self.stop = stop
+        self.wait = wait
+        self.retry = retry_if_not_exception_type(CircuitOpenError) & retry
+        self.key = key
+        self.reraise = reraise
+        self._budget = budget
+        self._breaker = breaker
+        self._budgets: dict[str, RetryBudget] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self.metrics = RetryMetrics()
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            setattr(self.metrics, name, getattr(self.metrics, name) + value)
+
+    def _per_key(self, shared: Any, cache: dict, key: str) -> Any:
+        if shared is None or isinstance(shared, (RetryBudget, CircuitBreaker)):
+            return shared
+        with self._lock:
+            if key not in cache:
+                cache[key] = shared()
+            return cache[key]
+
+    def budget_for(self, key: str) -> RetryBudget | None:
+        return self._per_key(self._budget, self._budgets, key)
+
+    def breaker_for(self, key: str) -> CircuitBreaker | None:
+        return self._per_key(self._breaker, self._breakers, key)
+
+    def _before_sleep(self, retry_state: RetryCallState) -> None:
+        self._count('retries')
+        self._count('sleep_time', retry_state.upcoming_sleep)
+
+    def _retrying_kwargs(self, key: str) -> dict[str, Any]:
+        return dict(stop=self.stop | _stop_if_budget_exhausted(self, key), wait=self.wait, retry=self.retry,
+                    before_sleep=self._before_sleep, reraise=self.reraise)
+
+    def _check(self, breaker: CircuitBreaker | None) -> None:
+        self._count('attempts')
+        if breaker and not breaker.allow():
+            self._count('rejected')
+            raise CircuitOpenError('熔断器已打开')
+
+    def _record(self, breaker: CircuitBreaker | None, error: BaseException | None) -> None:
+        """记录一次尝试的结果；error 不是 Exception（CancelledError、KeyboardInterrupt 等）时只交还试探名额"""
+        if error is not None and not isinstance(error, Exception):
+            if breaker:
+                breaker.release()
+            return
+        if error is not None:
+            self._count('failures')
+        if breaker:
+            breaker.record_failure() if error is not None else breaker.record_success()
+
+    def __call__(self, func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = self.key(*args, **kwargs) if self.key else ''
+                breaker = self.breaker_for(key)
+                self._count('calls')
+                async for attempt in AsyncRetrying(**self._retrying_kwargs(key)):
+                    with attempt:
+                        self._check(breaker)
+                        try:
+                            result = await func(*args, **kwargs)
+                        except BaseException as e:
+                            self._record(breaker, e)
+                            raise
+                        self._record(breaker, None)
+                        return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = self.key(*args, **kwargs) if self.key else ''
+            breaker = self.breaker_for(key)
+            self._count('calls')
+            for attempt in Retrying(**self._retrying_kwargs(key)):
+                with attempt:
+                    self._check(breaker)
+                    try:
+                        result = func(*args, **kwargs)
+                    except BaseException as e:
+                        self._record(breaker, e)
+                        raise
+                    self._record(breaker, None)
+                    return result
+
+        return wrapper
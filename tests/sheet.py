@@ -0,0 +1,251 @@
+"""
+Excel 辅助：openpyxl 只读流式读取（行元组 / NumPy 列块、列投影），只写模式 / xlsxwriter 批量写入（样式缓存）
+"""
+import itertools
+import os
+from contextlib import closing, contextmanager
+from typing import Any, BinaryIO, Iterable, Iterator, Sequence, TYPE_CHECKING
+
+import numpy as np
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import column_index_from_string, get_column_letter, range_boundaries
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+
+if TYPE_CHECKING:
+    import pandas
+
+Source = str | os.PathLike | BinaryIO
+
+
+def _column_index(column: int | str, header: Sequence[Any] | None) -> int:
+    """列 → 0 起始下标：int 为下标，表头中的名称，或列字母"""
+    if isinstance(column, int):
+        return column
+    if header is not None and column in header:
+        return header.index(column)
+    return column_index_from_string(column) - 1
+
+
+@contextmanager
+def _worksheet(source: Source, sheet: str | int | None) -> Iterator[ReadOnlyWorksheet]:
+    with closing(load_workbook(source, read_only=True, data_only=True)) as workbook:
+        yield (workbook.active if sheet is None else
+               workbook.worksheets[sheet] if isinstance(sheet, int) else workbook[sheet])
+
+
+def _project(worksheet: ReadOnlyWorksheet, columns: Sequence[int | str] | None, header: bool, min_row: int,
+             max_row: int | None) -> tuple[list | None, Iterator[tuple]]:
+    """(表头, 投影后的行迭代器)"""
+    names = None
+    if header:
+        names = list(next(worksheet.iter_rows(min_row=min_row, max_row=min_row, values_only=True), ()))
+        min_row += 1
+    if columns is None:
+        return names, worksheet.iter_rows(min_row=min_row, max_row=max_row, values_only=True)
+    indices = [_column_index(column, names) for column in columns]
+    # 只解析投影范围内的列
+    low, high = min(indices), max(indices)
+    offsets = [i - low for i in indices]
+    rows = worksheet.iter_rows(min_row=min_row, max_row=max_row, min_col=low + 1, max_col=high + 1, values_only=True)
+    return (names and [names[i] for i in indices]), (tuple(row[i] for i in offsets) for row in rows)
+
+
+def iter_rows(source: Source, sheet: str | int | None = None, columns: Sequence[int | str] | None = None,
+              header: bool = False, min_row: int = 1, max_row: int | None = None) -> Iterator[tuple]:
+    """
+    只读模式流式读取行值（read_only=True + values_only=True）：逐行解析 XML，不创建单元格对象、不保留整张表
+
+    工作表的 dimension 信息缺失或有误时，openpyxl 只读模式可能截断行，此类文件需用完整模式读取
+
+    Parameters
+    ----------
+    source: 文件路径或二进制文件对象
+    sheet: 工作表名称或下标，None 为活动工作表
+    columns: 列投影，元素为 0 起始下标、列字母，header=True 时也可为表头名称；None 为全部列
+    header: 第一行（min_row）为表头，不产出
+    min_row, max_row: 行范围，从 1 开始
+
+    Returns
+    -------
+    行值元组的迭代器
+    """
+    with _worksheet(source, sheet) as worksheet:
+        yield from _project(worksheet, columns, header, min_row, max_row)[1]
+
+
+def _column_array(column: tuple, dtype: Any) -> np.ndarray:
+    array = np.array(column, dtype=dtype)
+    # NumPy 推断出字符串类型时，混在其中的数字等也被转换为字符串
+    if dtype is None and array.dtype.kind in 'US' and not all(isinstance(value, str) for value in column):
+        return np.array(column, dtype=object)
+    return array
+
+
+def iter_chunks(source: Source, sheet: str | int | None = None, columns: Sequence[int | str] | None = None,
+                chunk_size: int = 65536, dtypes: dict[str, Any] | None = None,
+                min_row: int = 1, max_row: int | None = None) -> Iterator[dict[str, np.ndarray]]:
+    """
+    流式读取为 NumPy 列块：第一行（min_row）为表头，每 chunk_size 行转置为 {列名: 一维数组}
+
+    Parameters
+    ----------
+    columns: 列投影，同 iter_rows(header=True)
+    chunk_size: 每块行数
+    dtypes: {列名: dtype}，未指定的列由 NumPy 推断；含空单元格（None）或文字与其他类型混合的列为 object，
+        不把数字转换为字符串
+
+    Returns
+    -------
+    {列名: 数组} 的迭代器
+    """
+    dtypes = dtypes or {}
+    with _worksheet(source, sheet) as worksheet:
+        names, rows = _project(worksheet, columns, True, min_row, max_row)
+        for batch in itertools.batched(rows, chunk_size):
+            yield {name: _column_array(column, dtypes.get(name)) for name, column in zip(names, zip(*batch))}
+
+
+class SheetWriter:
+    """
+    批量写入 xlsx：openpyxl 只写模式（write_only=True）或 xlsxwriter，行数据流式写出，不在内存中保留单元格
+
+    样式用 style(...) 登记一次，得到共享的样式对象，整行复用，不为每个单元格新建 Font
+
+    1. 列宽、行高须在写入行之前设置
+    2. engine='xlsxwriter' 通常更快，constant_memory 模式下同样逐行刷出
+
+    Examples
+    --------
+    >>> with SheetWriter('report.xlsx', engine='xlsxwriter') as writer:
+    ...     writer.add_sheet('data', widths={'A': 12}, row_height=20)
+    ...     writer.append_frame(df, style=writer.style(size=14, italic=True))
+    """
+
+    def __init__(self, target: Source, engine: str = 'openpyxl'):
+        """
+        Parameters
+        ----------
+        target: 文件路径或二进制文件对象
+        engine: openpyxl 或 xlsxwriter
+        """
+        self.target = target
+        self.engine = engine
+        self._styles: dict[tuple, Any] = {}
+        self._sheet = None
+        self._row = 0
+        if engine == 'openpyxl':
+            self._workbook = Workbook(write_only=True)
+        elif engine == 'xlsxwriter':
+            import xlsxwriter
+            # 日期时间的默认格式同 openpyxl，否则读回为序列数
+            self._workbook = xlsxwriter.Workbook(target, {'constant_memory': True,
+                                                          'default_date_format': 'yyyy-mm-dd h:mm:ss'})
+        else:
+            raise ValueError(f'不支持的引擎：{engine}')
+
+    def add_sheet(self, title: str, widths: dict[str | int, float] | None = None,
+                  row_height: float | None = None) -> 'SheetWriter':
+        """
+        新建工作表，之后的写入都作用于它
+
+        Parameters
+        ----------
+        widths: {列字母或 0 起始下标: 列宽}
+        row_height: 所有行的行高
+        """
+        self._row = 0
+        if self.engine == 'openpyxl':
+            self._sheet = self._workbook.create_sheet(title)
+            for column, width in (widths or {}).items():
+                letter = get_column_letter(column + 1) if isinstance(column, int) else column
+                self._sheet.column_dimensions[letter].width = width
+            if row_height is not None:
+                self._sheet.sheet_format.defaultRowHeight = row_height
+                self._sheet.sheet_format.customHeight = True
+        else:
+            self._sheet = self._workbook.add_worksheet(title)
+            for column, width in (widths or {}).items():
+                index = column if isinstance(column, int) else column_index_from_string(column) - 1
+                self._sheet.set_column(index, index, width)
+            if row_height is not None:
+                self._sheet.set_default_row(row_height)
+        return self
+
+    def style(self, size: float | None = None, bold: bool = False, italic: bool = False, name: str | None = None,
+              color: str | None = None, number_format: str | None = None) -> Any:
+        """登记样式，相同参数返回同一个样式对象"""
+        key = (size, bold, italic, name, color, number_format)
+        if key not in self._styles:
+            if self.engine == 'openpyxl':
+                self._styles[key] = (Font(size=size, bold=bold, italic=italic, name=name, color=color),
+                                     number_format)
+            else:
+                properties = {'font_size': size, 'bold': bold, 'italic': italic, 'font_name': name,
+                              'font_color': color and f'#{color[-6:]}', 'num_format': number_format}
+                self._styles[key] = self._workbook.add_format({k: v for k, v in properties.items() if v})
+        return self._styles[key]
+
+    def _cell(self, value: Any, style: Any) -> WriteOnlyCell:
+        cell = WriteOnlyCell(self._sheet, value)
+        font, number_format = style
+        cell.font = font
+        if number_format:
+            cell.number_format = number_format
+        return cell
+
+    def append(self, row: Sequence[Any], style: Any = None) -> None:
+        """写出一行；NaN 写为空单元格（xlsxwriter 的 write_number 不接受 NaN，openpyxl 写为空）"""
+        if self.engine == 'openpyxl':
+            self._sheet.append(row if style is None else [self._cell(value, style) for value in row])
+        else:
+            row = [None if isinstance(value, float) and value != value else value for value in row]
+            self._sheet.write_row(self._row, 0, row, style)
+        self._row += 1
+
+    def append_rows(self, rows: Iterable[Sequence[Any]], style: Any = None) -> None:
+        for row in rows:
+            self.append(row, style)
+
+    def append_frame(self, frame: 'pandas.DataFrame', header: bool = True, index: bool = False,
+                     style: Any = None, header_style: Any = None) -> None:
+        """逐行写出 DataFrame，不先转换成单元格对象；缺失值（NaN、NaT、pandas.NA）写为空单元格"""
+        if frame.isna().to_numpy().any():
+            frame = frame.astype(object).where(frame.notna(), None)
+        if header:
+            self.append(([frame.index.name] if index else []) + list(frame.columns), header_style)
+        self.append_rows(frame.itertuples(index=index, name=None), style)
+
+    def merge(self, cell_range: str, value: Any = None, style: Any = None) -> None:
+        """
+        合并单元格，如 'A11:B12'，value 与 style 写入左上角单元格；之后追加的行位于合并区域之下
+
+        只写模式下按行顺序写出，合并区域应位于已写出的行之后，否则 openpyxl 引擎无法写入 value/style
+        """
+        min_col, min_row, _, max_row = range_boundaries(cell_range)
+        if self.engine == 'openpyxl':
+            if value is not None or style is not None:
+                if min_row <= self._row:
+                    raise ValueError(f'合并区域须位于已写出的行之后：{cell_range}')
+                while self._row < min_row - 1:
+                    self.append(())
+                self.append([None] * (min_col - 1) + [value if style is None else self._cell(value, style)])
+            while self._row < max_row:
+                self.append(())
+            self._sheet.merged_cells.add(cell_range)
+        else:
+            self._sheet.merge_range(cell_range, value, style)
+        self._row = max(self._row, max_row)
+
+    def close(self) -> None:
+        if self.engine == 'openpyxl':
+            self._workbook.save(self.target)
+        else:
+            self._workbook.close()
+
+    def __enter__(self) -> 'SheetWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,300 @@
+"""
+PowerPoint 辅助
+
+1. 生成：表格数据 → 幻灯片描述 → 演示文稿；版式、占位符查找缓存，同形图表复用图表 XML，进程池批量生成
+2. 读取：按放映顺序流式提取文字，不创建 python-pptx 对象
+"""
+import functools
+import itertools
+import os
+import posixpath
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence, TYPE_CHECKING
+
+from lxml import etree
+from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from pptx.opc.packuri import PackURI
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
+from pptx.parts.chart import ChartPart
+from pptx.parts.embeddedpackage import EmbeddedXlsxPart
+from pptx.slide import Slide, SlideLayout
+from pptx.table import _Cell
+from pptx.util import Cm, Length
+
+if TYPE_CHECKING:
+    import pandas
+
+Box = tuple[Length, Length, Length, Length]
+
+
+@dataclass
+class TableSpec:
+    rows: Sequence[Sequence[Any]]
+    # (left, top, width, height)
+    box: Box = (Cm(1), Cm(4), Cm(20), Cm(8))
+
+
+@dataclass
+class ChartSpec:
+    categories: Sequence[str]
+    # {系列名称: 值}
+    series: dict[str, Sequence[float | None]]
+    chart_type: XL_CHART_TYPE = XL_CHART_TYPE.BAR_CLUSTERED
+    box: Box = (Cm(1), Cm(4), Cm(20), Cm(10))
+    number_format: str = 'General'
+
+
+@dataclass
+class SlideSpec:
+    # 版式下标或名称
+    layout: int | str = 0
+    title: str | None = None
+    # {占位符 idx: 文字，或 [文字 / (文字, 层级)]}
+    placeholders: dict[int, str | Sequence[str | tuple[str, int]]] = field(default_factory=dict)
+    tables: list[TableSpec] = field(default_factory=list)
+    charts: list[ChartSpec] = field(default_factory=list)
+
+
+@functools.lru_cache(maxsize=256)
+def _chart_xml(chart_type: XL_CHART_TYPE, categories: tuple[str, ...], names: tuple[str, ...],
+               number_format: str) -> etree._Element:
+    """同形图表（类型、分类、系列名称相同）的 XML 只生成、解析一次，值为占位"""
+    data = CategoryChartData(number_format)
+    data.categories = categories
+    for name in names:
+        data.add_series(name, [0] * len(categories))
+    return parse_xml(data.xml_bytes(chart_type))
+
+
+@functools.lru_cache(maxsize=256)
+def _chart_xlsx(categories: tuple[str, ...], series: tuple[tuple[str, tuple], ...], number_format: str) -> bytes:
+    """图表内嵌工作簿（xlsxwriter 生成，是添加图表最耗时的一步），数据相同的图表共用"""
+    data = CategoryChartData(number_format)
+    data.categories = categories
+    for name, values in series:
+        data.add_series(name, values)
+    return data.xlsx_blob
+
+
+class DeckBuilder:
+    """
+    按 SlideSpec 批量添加幻灯片
+
+    1. 版式按下标或名称查找一次后缓存；每张幻灯片的占位符一次遍历建立 {idx: shape}，代替逐个 placeholders[idx]
+    2. 图表复用同形图表的 XML，只写入数值；部件名自行编号，不再每次扫描整个包
+
+    Examples
+    --------
+    >>> builder = DeckBuilder()
+    >>> builder.add(SlideSpec(title='销量', charts=[ChartSpec(['1月', '2月'], {'销量': [1, 2]})]))
+    >>> builder.save('report.pptx')
+    """
+
+    def __init__(self, template: str | os.PathLike | None = None, embed_data: bool = True):
+        """
+        Parameters
+        ----------
+        template: 模板演示文稿，None 为默认模板
+        embed_data: 图表是否内嵌工作簿；False 时图表照常显示，但在 PowerPoint 中不可编辑数据
+        """
+        self.presentation = Presentation(template and str(template))
+        self.embed_data = embed_data
+        self._layouts: dict[int | str, SlideLayout] = {}
+        self._package = self.presentation.part.package
+        numbers: dict[str, list[int]] = {ChartPart.partname_template: [0], EmbeddedXlsxPart.partname_template: [0]}
+        for part in self._package.iter_parts():
+            for template_ in numbers:
+                if part.partname.startswith(template_.split('%d')[0]):
+                    numbers[template_].append(part.partname.idx or 0)
+        self._counters = {template_: itertools.count(max(used) + 1) for template_, used in numbers.items()}
+
+    def layout(self, key: int | str) -> SlideLayout:
+        if key not in self._layouts:
+            layouts = self.presentation.slide_layouts
+            layout = layouts[key] if isinstance(key, int) else layouts.get_by_name(key)
+            if layout is None:
+                raise KeyError(f'版式不存在：{key}')
+            self._layouts[key] = layout
+        return self._layouts[key]
+
+    def _partname(self, template: str) -> PackURI:
+        return PackURI(template % next(self._counters[template]))
+
+    def add(self, spec: SlideSpec) -> Slide:
+        slide = self.presentation.slides.add_slide(self.layout(spec.layout))
+        placeholders = {shape.placeholder_format.idx: shape for shape in slide.placeholders}
+        if spec.title is not None:
+            # 标题占位符 idx 为 0
+            placeholders[0].text_frame.text = spec.title
+        for idx, content in spec.placeholders.items():
+            text_frame = placeholders[idx].text_frame
+            if isinstance(content, str):
+                text_frame.text = content
+                continue
+            for i, item in enumerate(content):
+                text, level = (item, 0) if isinstance(item, str) else item
+                paragraph = text_frame.paragraphs[0] if i == 0 else text_frame.add_paragraph()
+                paragraph.text = text
+                paragraph.level = level
+        for table in spec.tables:
+            self.add_table(slide, table)
+        for chart in spec.charts:
+            self.add_chart(slide, chart)
+        return slide
+
+    @staticmethod
+    def add_table(slide: Slide, spec: TableSpec) -> None:
+        rows, cols = len(spec.rows), max(map(len, spec.rows), default=0)
+        table = slide.shapes.add_table(rows, cols, *spec.box).table
+        # 逐行遍历 XML 元素，不经过 table.cell(r, c) 的重复查找
+        for tr, row in zip(table._tbl.tr_lst, spec.rows):
+            for tc, value in zip(tr.tc_lst, row):
+                if value is not None:
+                    _Cell(tc, table).text = str(value)
+
+    def add_chart(self, slide: Slide, spec: ChartSpec) -> None:
+        categories = tuple(map(str, spec.categories))
+        # NaN（如来自 DataFrame 的空值）视为空
+        series = tuple((name, tuple(None if value is None or value != value else value for value in values))
+                       for name, values in spec.series.items())
+        element = deepcopy(_chart_xml(spec.chart_type, categories, tuple(spec.series), spec.number_format))
+        for ser, (_, values) in zip(element.iter(qn('c:ser')), series):
+            cache = ser.find(f"{qn('c:val')}/{qn('c:numRef')}/{qn('c:numCache')}")
+            for pt, value in zip(cache.findall(qn('c:pt')), values):
+                if value is None:
+                    cache.remove(pt)
+                else:
+                    pt.find(qn('c:v')).text = str(value)
+        chart_part = ChartPart(self._partname(ChartPart.partname_template), CT.DML_CHART, self._package, element)
+        if self.embed_data:
+            blob = _chart_xlsx(categories, series, spec.number_format)
+            chart_part.chart_workbook.xlsx_part = EmbeddedXlsxPart(
+                self._partname(EmbeddedXlsxPart.partname_template), EmbeddedXlsxPart.content_type, self._package,
+                blob)
+        rId = slide.part.relate_to(chart_part, RT.CHART)
+        slide.shapes._add_chart_graphicFrame(rId, *spec.box)
+
+    def extend(self, specs: Iterable[SlideSpec]) -> 'DeckBuilder':
+        for spec in specs:
+            self.add(spec)
+        return self
+
+    def save(self, target: str | os.PathLike | BytesIO) -> None:
+        self.presentation.save(target)
+
+
+def specs_from_frame(frame: 'pandas.DataFrame', title: str, placeholders: dict[int, str] | None = None,
+                     layout: int | str = 1) -> list[SlideSpec]:
+    """
+    每行一张幻灯片
+
+    Parameters
+    ----------
+    frame: 数据
+    title: 标题列
+    placeholders: {占位符 idx: 列名}
+    layout: 版式
+
+    Examples
+    --------
+    >>> specs_from_frame(df, title='name', placeholders={1: 'summary'})
+    """
+    placeholders = placeholders or {}
+    columns = [title, *placeholders.values()]
+    return [SlideSpec(layout, str(row[0]), dict(zip(placeholders, map(str, row[1:]))))
+            for row in frame[columns].itertuples(index=False, name=None)]
+
+
+def _build_batch(template: str | None, embed_data: bool,
+                 batch: list[tuple[str | os.PathLike, list[SlideSpec]]]) -> list[Path | Exception]:
+    results = []
+    for target, specs in batch:
+        try:
+            DeckBuilder(template, embed_data).extend(specs).save(target)
+            results.append(Path(target))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def build_decks(jobs: Iterable[tuple[str | os.PathLike, list[SlideSpec]]], template: str | os.PathLike | None = None,
+                embed_data: bool = True, workers: int | None = None,
+                chunksize: int = 4) -> Iterator[tuple[str | os.PathLike, Path | Exception]]:
+    """
+    批量生成演示文稿，按提交顺序产出 (输出路径, 输出路径或异常)；同一进程内的图表 XML、内嵌工作簿缓存跨文稿复用
+
+    Parameters
+    ----------
+    jobs: [(输出路径, [SlideSpec])]
+    template: 模板演示文稿
+    embed_data: 同 DeckBuilder
+    workers: 进程数，None 为 CPU 数，0 为在当前进程生成
+    chunksize: 每次发送给子进程的任务数
+    """
+    template = template and str(template)
+    if workers == 0:
+        for job in jobs:
+            yield job[0], _build_batch(template, embed_data, [job])[0]
+        return
+    jobs = list(jobs)
+    with ProcessPoolExecutor(workers) as executor:
+        batches = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+        futures = [executor.submit(_build_batch, template, embed_data, batch) for batch in batches]
+        for batch, future in zip(batches, futures):
+            yield from zip((job[0] for job in batch), future.result())
+
+
+# region 流式提取文字
+
+P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+R = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+
+
+def _slide_names(archive: zipfile.ZipFile) -> list[str]:
+    """按放映顺序的幻灯片部件名"""
+    rels = etree.fromstring(archive.read('_rels/.rels'))
+    presentation = next(rel.get('Target') for rel in rels if rel.get('Type').endswith('/officeDocument')).lstrip('/')
+    directory, name = posixpath.split(presentation)
+    targets = {rel.get('Id'): rel.get('Target')
+               for rel in etree.fromstring(archive.read(posixpath.join(directory, '_rels', f'{name}.rels')))}
+    ids = etree.fromstring(archive.read(presentation)).iterfind(f'{P}sldIdLst/{P}sldId')
+    return [posixpath.normpath(posixpath.join(directory, targets[sld.get(f'{R}id')])) for sld in ids]
+
+
+def iter_text(source: str | os.PathLike) -> Iterator[tuple[int, str, str]]:
+    """
+    流式提取文字：逐张幻灯片 iterparse，产出 (幻灯片下标, 形状名称, 段落文字)
+
+    包含文本框、占位符、表格单元格、组合内的形状；段落文字同 _Paragraph.text（换行符为 \\v）
+
+    Examples
+    --------
+    >>> for index, shape, text in iter_text('big.pptx'):
+    ...     print(index, shape, text)
+    """
+    with zipfile.ZipFile(source) as archive:
+        for index, name in enumerate(_slide_names(archive)):
+            shape = ''
+            with archive.open(name) as f:
+                for event, element in etree.iterparse(f, events=('start', 'end'), tag=(f'{P}cNvPr', f'{A}p')):
+                    if element.tag == f'{P}cNvPr':
+                        if event == 'start':
+                            shape = element.get('name', '')
+                        continue
+                    if event == 'end':
+                        yield index, shape, ''.join(
+                            (child.findtext(f'{A}t') or '') if child.tag != f'{A}br' else '\v'
+                            for child in element if child.tag in (f'{A}r', f'{A}fld', f'{A}br'))
+                        element.clear()
+
+# endregion
@@ -1,6 +1,6 @@
 import numpy as np
 
-from util import Timer, Paths
+from util import Benchmark, Timer, Paths
 
 
 # region NumPy 模块结构：https://numpy.org/doc/stable/reference/module_structure.html
@@ -230,10 +230,11 @@ class TestArrayObjects:
             import random
 
             arr = [random.random() for _ in range(1000000)]
-            t1, _ = Timer.measure(sum, arr)
-
             np_arr = np.array(arr)
-            t2, _ = Timer.measure(np.sum, np_arr)
+            # 取多轮中位数，避免单次计时的噪声
+            bench = Benchmark(rounds=5)
+            t1 = bench.run('sum', sum, arr).median
+            t2 = bench.run('np.sum', np.sum, np_arr).median
 
             assert t1 > t2 * 3
 
@@ -8,13 +8,13 @@ import os
 import random
 import re
 import tempfile
-import time
 
 import pandas
+import pytest
 import requests
-from fake_useragent import UserAgent
 from tenacity import retry, stop_after_attempt
 
+from net import HttpClient, UserAgents
 from util import Paths
 
 
@@ -35,6 +35,7 @@ class TestRequests:
         assert r.json() == json.loads(r.text) == {'authenticated': True, 'user': 'user'}
 
     def test_advance(self):
+        from parsing import Extractor
         from requests.adapters import HTTPAdapter
         from urllib3 import Retry
         # 会话
@@ -49,13 +50,183 @@ class TestRequests:
             session.mount('https://', adapter)
             r = session.get(
                 'https://2025.ip138.com/',
-                headers={'User-Agent': UserAgent().random},
+                headers={'User-Agent': UserAgents.shared().for_host('https://2025.ip138.com/')},
                 # 代理：https://free.kuaidaili.com/free/dps/
                 # proxies={"https": "180.121.147.240:20756"},
                 timeout=2,
                 allow_redirects=True
             )
-            print(re.search(r'<title[^>]*>.*?(\d+(?:\.\d+)*)', r.text).group(1).strip())
+            print(Extractor({'ip': r'<title[^>]*>.*?(\d+(?:\.\d+)*)'}).search(r.content)['ip'].decode().strip())
+
+    def test_extractor(self):
+        """正则字段提取：直接扫描 bytes 响应体 vs 解码为 str 后扫描"""
+        from parsing import Extractor
+        from util import Timer
+        patterns = {'title': r'<title>(.*?)</title>', 'audio': r'"id":30216,"baseUrl":"(.*?)"',
+                    'video': r'"id":16,"baseUrl":"(.*?)"', 'bvid': r'"bvid":"(BV\w+)"', 'missing': r'"nothing":(\d+)'}
+        page = (b'<html><head><title>demo</title></head><body>' + '<p>中文填充</p>'.encode() * 200_000
+                + b'<script>{"bvid":"BV1D4411L7Qd","dash":[{"id":16,"baseUrl":"https://v/16.m4s"},'
+                  b'{"id":30216,"baseUrl":"https://a/30216.m4s"}]}</script></body></html>')
+        extractor = Extractor(patterns)
+        assert extractor.search(page) == {'title': b'demo', 'audio': b'https://a/30216.m4s',
+                                          'video': b'https://v/16.m4s', 'bvid': b'BV1D4411L7Qd', 'missing': None}
+        assert extractor.search(page.decode(), ['title', 'bvid']) == {'title': 'demo', 'bvid': 'BV1D4411L7Qd'}
+        assert list(extractor.finditer(b'<title>a</title>"bvid":"BV1"<title>b</title>')) == [
+            ('title', b'a'), ('bvid', b'BV1'), ('title', b'b')]
+        decoded, _ = Timer.measure(lambda: {name: re.search(p, page.decode()) for name, p in patterns.items()})
+        raw, _ = Timer.measure(extractor.search, page)
+        print(f'\n解码后扫描：{decoded:.4f}s，直接扫描 bytes：{raw:.4f}s')
+
+    def test_client(self):
+        """
+        共享连接池客户端：对比吞吐量（本地替身服务器，离线）
+
+        1. requests.get：每次新建连接
+        2. HttpClient.get：按主机复用 keep-alive 连接
+        3. HttpClient.fetch_all：asyncio 并发
+        """
+        import asyncio
+        from net import LocalServer, throughput
+        n = 200
+        with LocalServer() as server, HttpClient() as client:
+            server.add('/', b'ok')
+            urls = [f'{server.url}/'] * n
+            rps_bare = throughput(lambda: [requests.get(url) for url in urls], n)
+            rps_pool = throughput(lambda: [client.get(url) for url in urls], n)
+            rps_async = throughput(lambda: asyncio.run(client.fetch_all(urls, concurrency=10)), n)
+            print(f'requests/sec：bare {rps_bare:.0f}，pooled {rps_pool:.0f}，async {rps_async:.0f}')
+            assert server.requests == 3 * n
+
+    def test_cache(self, tmp_path):
+        """磁盘响应缓存：新鲜期内直接命中，过期后条件请求重新验证，离线回放"""
+        from net import LocalServer, ResponseCache
+        etag = '"v1"'
+
+        def page(request):
+            if request.headers.get('If-None-Match') == etag:
+                return 304, {'ETag': etag}, b''
+            return 200, {'ETag': etag, 'Content-Type': 'text/plain; charset=utf-8'}, '缓存'.encode()
+
+        def agent(request):
+            return 200, {'Vary': 'User-Agent'}, request.headers.get('User-Agent', '').encode()
+
+        with LocalServer() as server:
+            server.route('/page', page)
+            server.route('/agent', agent)
+            server.add('/private', b'private', headers={'Cache-Control': 'private'})
+            server.add('/max-age', b'max-age', headers={'Cache-Control': 'max-age=0'})
+            url = f'{server.url}/page'
+            cache = ResponseCache(tmp_path, ttl=60)
+            with HttpClient(cache=cache) as client:
+                r = client.get(url)
+                assert r.from_cache is False and r.text == '缓存' and server.requests == 1
+                r = client.get(url)
+                assert r.from_cache and r.text == '缓存' and server.requests == 1
+                # 请求 no-cache：新鲜期内也重新验证
+                r = client.get(url, headers={'Cache-Control': 'no-cache'})
+                assert r.from_cache and server.requests == 2
+                # 不同 User-Agent 各自缓存
+                assert client.get(f'{server.url}/agent', headers={'User-Agent': 'a'}).text == 'a'
+                assert client.get(f'{server.url}/agent', headers={'User-Agent': 'b'}).text == 'b'
+                assert client.get(f'{server.url}/agent', headers={'User-Agent': 'a'}).from_cache
+                assert server.requests == 4
+                # 响应 private 不缓存，max-age=0 立即过期
+                for path in ('/private', '/max-age', '/private', '/max-age'):
+                    assert client.get(f'{server.url}{path}').from_cache is False
+                assert server.requests == 8
+                # 过期：发出条件请求，304 后仍返回缓存内容
+                cache.ttl = 0
+                r = client.get(url)
+                assert r.from_cache and r.status_code == 200 and server.requests == 9
+            # 离线回放：不访问网络
+            with HttpClient(cache=ResponseCache(tmp_path, offline=True)) as client:
+                assert client.get(url).text == '缓存' and server.requests == 9
+                with pytest.raises(requests.ConnectionError):
+                    client.get(f'{server.url}/missing')
+
+    def test_download(self, tmp_path):
+        """分段并发下载与断点续传"""
+        import json
+        from net import Downloader, LocalServer
+        body = os.urandom(1_000_000)
+        with LocalServer() as server:
+            server.add('/file', body, headers={'ETag': '"f"'})
+            downloader = Downloader(chunk_size=16 * 1024, segment_size=300_000, workers=4)
+            assert downloader.probe(f'{server.url}/file') == (len(body), True, '"f"')
+            assert downloader.download(f'{server.url}/file', tmp_path / 'a').read_bytes() == body
+            # 模拟中断：第一段已完成，其余未开始
+            target = tmp_path / 'b'
+            (tmp_path / 'b.part').write_bytes(body[:300_000] + bytes(700_000))
+            (tmp_path / 'b.part.json').write_text(json.dumps(
+                {'size': len(body), 'etag': '"f"', 'segment_size': 300_000,
+                 'done': {'0': 300_000, '300000': 0, '600000': 0, '900000': 0}}))
+            requests_ = server.requests
+            assert downloader.download(f'{server.url}/file', target).read_bytes() == body
+            # probe + 3 个未完成的区间
+            assert server.requests - requests_ == 4
+            assert not (tmp_path / 'b.part.json').exists()
+            # 进度文件损坏：重新下载全部 4 个区间
+            (tmp_path / 'c.part').write_bytes(bytes(len(body)))
+            (tmp_path / 'c.part.json').write_text('{"size": 1000000, "etag": "\\"f\\"", "do')
+            requests_ = server.requests
+            assert downloader.download(f'{server.url}/file', tmp_path / 'c').read_bytes() == body
+            assert server.requests - requests_ == 5
+            # 分段大小改变：各段区间与进度不符，重新下载
+            (tmp_path / 'd.part').write_bytes(body[:300_000] + bytes(700_000))
+            (tmp_path / 'd.part.json').write_text(json.dumps(
+                {'size': len(body), 'etag': '"f"', 'segment_size': 600_000, 'done': {'0': 300_000, '600000': 0}}))
+            requests_ = server.requests
+            assert downloader.download(f'{server.url}/file', tmp_path / 'd').read_bytes() == body
+            assert server.requests - requests_ == 5
+
+    def test_mux(self, tmp_path):
+        """边下载边用 ffmpeg 合并音视频"""
+        import subprocess
+        from net import Downloader, LocalServer
+        ffmpeg = pytest.importorskip('imageio_ffmpeg').get_ffmpeg_exe()
+        fragmented = ['-movflags', 'frag_keyframe+empty_moov']
+        subprocess.run([ffmpeg, '-loglevel', 'error', '-f', 'lavfi', '-i', 'testsrc=duration=1:size=160x120:rate=10',
+                        '-c:v', 'mpeg4', *fragmented, str(tmp_path / 'v.mp4')], check=True)
+        subprocess.run([ffmpeg, '-loglevel', 'error', '-f', 'lavfi', '-i', 'sine=duration=1',
+                        '-c:a', 'aac', *fragmented, str(tmp_path / 'a.mp4')], check=True)
+        with LocalServer() as server:
+            server.add('/v', (tmp_path / 'v.mp4').read_bytes())
+            server.add('/a', (tmp_path / 'a.mp4').read_bytes())
+            output = Downloader(chunk_size=4096).mux(f'{server.url}/v', f'{server.url}/a', tmp_path / 'out.mp4')
+        assert output.stat().st_size > 0
+
+    def test_user_agents(self):
+        """UA 池：过滤结果缓存，按主机轮换"""
+        from net import UserAgents
+        data = [
+            {'useragent': 'win-chrome', 'os': 'Windows', 'browser': 'Chrome', 'type': 'desktop'},
+            {'useragent': 'win-edge', 'os': 'Windows', 'browser': 'Edge', 'type': 'desktop'},
+            {'useragent': 'ios-safari', 'os': 'iOS', 'browser': 'Mobile Safari', 'type': 'mobile'},
+        ]
+        agents = UserAgents(data)
+        assert agents.filter(os='Windows') == ['win-chrome', 'win-edge']
+        assert agents.filter(os='Windows') is agents.filter(os='Windows')
+        assert agents.random(type='mobile') == 'ios-safari'
+        assert agents.random(os='Linux') == UserAgents.FALLBACK
+        # 同一主机依次轮换所有候选 UA
+        assert {agents.for_host('https://a.com/x', os='Windows') for _ in range(2)} == {'win-chrome', 'win-edge'}
+        assert 'Windows' in UserAgents.shared().random(os='Windows')
+
+    def test_h2(self):
+        """HTTP/2：一条连接上多路复用多个请求"""
+        import asyncio
+        from net import H2Client, LocalServer
+        body = b'x' * 200_000
+
+        async def main():
+            async with H2Client(server.url) as client:
+                return await client.get_many(['/'] * 20)
+
+        with LocalServer() as server:
+            server.add('/', body, headers={'content-type': 'text/plain'})
+            responses = asyncio.run(main())
+        assert all(r.status == 200 and r.content == body and r.headers['content-type'] == 'text/plain'
+                   for r in responses)
 
 
 def test_user_agent():
@@ -64,18 +235,22 @@ def test_user_agent():
     """
     from fake_useragent import UserAgent
     url = 'https://www.baidu.com'
-    r = requests.get(url)
+    http = HttpClient.shared()
+    r = http.get(url)
     # 1. 自定义随机 User-Agent
     user_agents = [
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36',
         'Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1',
         'Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Mobile Safari/537.36'
     ]
-    r2 = requests.get(url, headers={'User-Agent': random.choice(user_agents)})
+    r2 = http.get(url, headers={'User-Agent': random.choice(user_agents)})
     assert len(r.content) < len(r2.content)
     # 2. 使用 fake_useragent 随机 User-Agent
-    r3 = requests.get(url, headers={'User-Agent': UserAgent().random})
+    r3 = http.get(url, headers={'User-Agent': UserAgent().random})
     assert len(r.content) < len(r3.content)
+    # 3. 数据集只加载一次、按 os/browser/type 预建索引的 UA 池
+    r4 = http.get(url, headers={'User-Agent': UserAgents.shared().random(os='Windows', browser='Chrome')})
+    assert len(r.content) < len(r4.content)
 
 
 class TestSelenium:
@@ -84,44 +259,89 @@ class TestSelenium:
     """
 
     def test_selenium(self):
-        from selenium import webdriver
-        from selenium.webdriver.chrome.service import Service
         from selenium.webdriver.common.by import By
         from selenium.webdriver.support.ui import WebDriverWait
         from selenium.webdriver.support import expected_conditions as ec
-        options = webdriver.ChromeOptions()
-        # 不显示图形界面
-        # options.add_argument('headless')
-        service = Service(executable_path=str(Paths.fixture('chromedriver.exe')))
-        driver = webdriver.Chrome(options=options, service=service)
-        driver.get('https://www.baidu.com')
-
-        print(driver.current_url)
-        print(driver.title)
-        # print(webdriver.page_source)
-        # 截图
-        with tempfile.NamedTemporaryFile() as fp:
-            driver.save_screenshot(fp.name)
-        # region 搜索 selenium
-        chat_textarea = driver.find_element(By.ID, 'chat-textarea')
-        chat_textarea.send_keys('selenium')
-        chat_submit_button = driver.find_element(By.ID, 'chat-submit-button')
-        chat_submit_button.click()
-        # 等待直到，某元素可见
-        WebDriverWait(driver, 10).until(ec.visibility_of_element_located((By.ID, 'page')))
-        # endregion
-        # 通过执行 js 滚动到底部
-        driver.execute_script('window.scrollTo(0, document.documentElement.scrollHeight);')
-        time.sleep(1)
-        # 通过执行 js 打开一个窗口
-        driver.execute_script('window.open("https://www.sogou.com")')
-        # 所有窗口句柄
-        handles = driver.window_handles
-        # 切换窗口
-        driver.switch_to.window(handles[1])
-        time.sleep(1)
-        # 关闭浏览器并关闭 ChromeDriver
-        driver.quit()
+        from browser import DriverPool, chrome, page_loaded, scrolled_to_bottom, wait_for
+        # 会话池：复用已启动的浏览器，归还时重置状态；headless=False 显示图形界面
+        pool = DriverPool(size=1, factory=lambda: chrome(headless=False,
+                                                         executable_path=str(Paths.fixture('chromedriver.exe'))))
+        with pool, pool.driver() as driver:
+            driver.get('https://www.baidu.com')
+
+            print(driver.current_url)
+            print(driver.title)
+            # print(webdriver.page_source)
+            # 截图
+            with tempfile.NamedTemporaryFile() as fp:
+                driver.save_screenshot(fp.name)
+            # region 搜索 selenium
+            chat_textarea = driver.find_element(By.ID, 'chat-textarea')
+            chat_textarea.send_keys('selenium')
+            chat_submit_button = driver.find_element(By.ID, 'chat-submit-button')
+            chat_submit_button.click()
+            # 等待直到，某元素可见
+            WebDriverWait(driver, 10).until(ec.visibility_of_element_located((By.ID, 'page')))
+            # endregion
+            # 通过执行 js 滚动到底部，等待滚动完成
+            driver.execute_script('window.scrollTo(0, document.documentElement.scrollHeight);')
+            wait_for(driver, scrolled_to_bottom)
+            # 通过执行 js 打开一个窗口，等待窗口出现
+            driver.execute_script('window.open("https://www.sogou.com")')
+            wait_for(driver, ec.number_of_windows_to_be(2))
+            # 所有窗口句柄
+            handles = driver.window_handles
+            # 切换窗口，等待页面加载完成
+            driver.switch_to.window(handles[1])
+            wait_for(driver, page_loaded)
+        # 退出 with 时关闭浏览器并关闭 ChromeDriver
+
+    def test_driver_pool(self):
+        """会话池：本地静态页面，会话复用且归还时重置"""
+        import shutil
+        pytest.importorskip('selenium')
+        if not any(map(shutil.which, ('google-chrome', 'chrome', 'chromium', 'chromium-browser'))):
+            pytest.skip('未找到 Chrome')
+        if not shutil.which('chromedriver'):
+            pytest.skip('未找到 ChromeDriver')
+        from browser import DriverPool, page_loaded, wait_for
+        from net import LocalServer
+        with LocalServer() as server, DriverPool(size=1) as pool:
+            server.add('/', b'<html><body>page</body></html>', headers={'Content-Type': 'text/html'})
+            with pool.driver() as driver:
+                driver.get(f'{server.url}/')
+                wait_for(driver, page_loaded)
+                driver.add_cookie({'name': 'k', 'value': 'v'})
+                session_id = driver.session_id
+            with pool.driver() as driver:
+                assert driver.session_id == session_id
+                driver.get(f'{server.url}/')
+                assert driver.get_cookies() == []
+
+    def test_driver_pool_close(self):
+        """会话池：close 同时退出借出中的会话，之后归还的会话直接丢弃"""
+        pytest.importorskip('selenium')
+        from browser import DriverPool
+
+        class FakeDriver:
+            quit_count = 0
+
+            def quit(self):
+                self.quit_count += 1
+
+        pool = DriverPool(size=2, factory=FakeDriver)
+        # 假会话无需重置
+        pool.reset = lambda driver: None
+        with pool.driver() as idle:
+            pass
+        with pool.driver() as borrowed:
+            assert borrowed is idle
+            with pool.driver() as other:
+                pool.close()
+                assert (idle.quit_count, other.quit_count) == (1, 1)
+        # 归还已退出的会话：不重置、不入池、不重复退出
+        assert (idle.quit_count, other.quit_count) == (1, 1)
+        assert pool._created == 0 and pool._idle.empty()
 
 
 class TestTenacity:
@@ -224,6 +444,57 @@ class TestTenacity:
         )(self.do_something)
         do_something()
 
+    def test_retry_policy(self):
+        """
+        重试引擎：同步/异步通用，重试预算、熔断器、指标
+
+        协程等待时 await asyncio.sleep，不占用线程
+        """
+        import asyncio
+        from tenacity import wait_none
+        from retrying import CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy
+        calls = []
+
+        def flaky(host):
+            calls.append(host)
+            raise ConnectionError(host)
+
+        # 预算只有 2 个令牌：第一次调用重试 2 次后，后续调用不再重试
+        policy = RetryPolicy(stop=stop_after_attempt(5), wait=wait_none(), budget=RetryBudget(capacity=2, rate=0))
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                policy(flaky)('a.com')
+        assert len(calls) == 5 and policy.metrics.budget_exhausted == 3 and policy.metrics.retries == 2
+
+        # 按主机熔断：连续失败 2 次后打开，之后直接拒绝
+        policy = RetryPolicy(stop=stop_after_attempt(3), wait=wait_none(),
+                             breaker=lambda: CircuitBreaker(failure_threshold=2, reset_timeout=60), key=lambda host: host)
+
+        @policy
+        async def fetch(host):
+            calls.append(host)
+            raise ConnectionError(host)
+
+        calls.clear()
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(fetch('b.com'))
+        assert calls == ['b.com', 'b.com'] and policy.breaker_for('b.com').state == 'open'
+        assert policy.breaker_for('c.com').state == 'closed'
+        assert policy.metrics.rejected == 1 and policy.metrics.attempts == 3
+
+        # half_open 的试探调用被中断：交还试探名额，熔断器不会卡在 half_open
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        policy = RetryPolicy(stop=stop_after_attempt(1), breaker=breaker)
+
+        @policy
+        def interrupted():
+            raise KeyboardInterrupt
+
+        breaker.record_failure()
+        with pytest.raises(KeyboardInterrupt):
+            interrupted()
+        assert breaker.state == 'half_open' and breaker.allow() and policy.metrics.failures == 0
+
     def test_raise(self):
         from tenacity import RetryError
         # reraise=False，抛出 RetryError；reraise=True，抛出原始异常
@@ -240,12 +511,36 @@ def test_jsonpath_ng():
     """
     `jsonpath-ng <https://pypi.org/project/jsonpath-ng/>`_
     """
-    from jsonpath_ng import parse
-    r = requests.get('https://reqres.in/api/users', headers={'x-api-key': 'reqres-free-v1'})
-    titles = [match.value for match in parse('$.data[*].first_name').find(r.json())]
+    from parsing import compile_path
+    r = HttpClient.shared().get('https://reqres.in/api/users', headers={'x-api-key': 'reqres-free-v1'})
+    titles = [match.value for match in compile_path('$.data[*].first_name').find(r.json())]
     print(titles[:5])
 
 
+def test_jsonpath_batch():
+    """编译缓存 + 单次遍历批量求值 + 大数组流式求值"""
+    import io
+    from parsing import compile_path, find_many, stream_matches
+    assert compile_path('$.data[*].id') is compile_path('$.data[*].id')
+    doc = {'page': 1, 'data': [{'id': i, 'first_name': f'name{i}', 'tags': ['a', 'b']} for i in range(100)]}
+    exprs = {'names': '$.data[*].first_name', 'first': '$.data[0].id', 'tag': '$.data[*].tags[1]',
+             'page': '$.page', 'ids': '$..id'}
+    results = find_many(doc, exprs)
+    for name, expr in exprs.items():
+        assert results[name] == [match.value for match in compile_path(expr).find(doc)]
+    names = stream_matches(io.StringIO(json.dumps(doc)), '$.data[*].first_name', chunk_size=16)
+    assert list(names) == results['names']
+    with pytest.raises(ValueError):
+        next(stream_matches(io.StringIO('{}'), '$..id'))
+    # [*] 与 .* 的区别：[*] 把对象、标量视为单元素数组，.* 只展开对象
+    doc = {'a': {'x': 1, 'y': [2, 3]}, 'b': [4, {'z': 5}], 'c': 6, 'd': None, 's': 'str'}
+    exprs = {expr: expr for expr in ('$.a[*]', '$.a.*', '$.b[*]', '$.b.*', '$.c[*]', '$.c.*', '$.d[*]',
+                                     '$.b[*].*', '$.a.*[*]', '$.a.y[-1]', '$.a[0]', '$.s[0]', '$.*')}
+    results = find_many(doc, exprs)
+    for expr in exprs:
+        assert results[expr] == [match.value for match in compile_path(expr).find(doc)], expr
+
+
 def test_lxml():
     """
     `lxml <https://pypi.org/project/lxml/>`_：
@@ -255,38 +550,61 @@ def test_lxml():
     3. 支持 XPath、RelaxNG、XML Schema、XSLT、C14N 等功能
     """
     from lxml import etree
-    r = requests.get('https://www.w3schools.com/xml/books.xml')
+    r = HttpClient.shared().get('https://www.w3schools.com/xml/books.xml')
     root = etree.XML(r.content)
     assert (root.xpath('/bookstore/book[2]/author/text()'), 'J K. Rowling')
     assert (root.xpath('/bookstore/book[2]/title/@lang/text()'), 'Harry Potter')
 
 
+def test_lxml_iterparse():
+    """iterparse 流式解析：边下载边解析，每条记录处理完即清除"""
+    import io
+    from net import LocalServer
+    from parsing import iter_records
+    books = b''.join(b'<book id="%d"><title lang="en">Title %d</title><price>%d.5</price></book>' % (i, i, i)
+                     for i in range(5000))
+    fields = {'id': 'string(@id)', 'title': 'string(title)', 'price': 'number(price)',
+              'previous': 'count(preceding-sibling::book)'}
+    with LocalServer() as server:
+        server.add('/books.xml', b'<?xml version="1.0"?><bookstore>' + books + b'</bookstore>')
+        with HttpClient().get(f'{server.url}/books.xml', stream=True) as r:
+            records = list(iter_records(r, 'book', fields, chunk_size=4096))
+    assert len(records) == 5000
+    assert records[42] == {'id': '42', 'title': 'Title 42', 'price': 42.5, 'previous': 1}
+    # 已处理的兄弟元素被删除，只剩紧邻的上一条（已清空）
+    assert all(record['previous'] <= 1 for record in records)
+    titles = iter_records(io.BytesIO(b'<html><body><p>a</p><p>b</body></html>'), 'p', {'text': 'string()'}, html=True)
+    assert [record['text'] for record in titles] == ['a', 'b']
+
+
 def test_moviepy():
     """
     `moviepy <https://pypi.org/project/moviepy/>`_：用于视频编辑：剪切、连接、插入标题、视频合成（也称为非线性编辑）、视频处理和创建自定义效果
     """
     import tempfile
+    from concurrent.futures import ThreadPoolExecutor
     from moviepy.audio.io.AudioFileClip import AudioFileClip
     from moviepy.video.io.VideoFileClip import VideoFileClip
-    ua = UserAgent()
-
-    def get_windows_ua():
-        return next((ua.random for _ in range(10) if 'Windows' in ua.random),
-                    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-
+    from net import Downloader
+    from parsing import Extractor
     url = 'https://www.bilibili.com/video/BV1D4411L7Qd/'
-    headers = {'User-Agent': get_windows_ua(), 'Referer': url}
-    r = requests.get(url, headers=headers)
-    audio_url = re.search(r'"id":30216,"baseUrl":"(.*?)","base_url"', r.text).group(1)
-    video_url = re.search(r'"id":16,"baseUrl":"(.*?)","base_url"', r.text).group(1)
-    audio_data = requests.get(audio_url, headers=headers).content
-    video_data = requests.get(video_url, headers=headers).content
+    headers = {'User-Agent': UserAgents.shared().random(os='Windows'), 'Referer': url}
+    http = HttpClient.shared()
+    r = http.get(url, headers=headers)
+    # 直接在 bytes 响应体上搜索两个字段（不解码为 str），每个字段各搜索一次，找到首个匹配即停止
+    streams = Extractor({'audio': r'"id":30216,"baseUrl":"(.*?)","base_url"',
+                         'video': r'"id":16,"baseUrl":"(.*?)","base_url"'}).search(r.content)
+    audio_url, video_url = streams['audio'].decode(), streams['video'].decode()
+    # 分段并发、流式写入磁盘，不把整个音视频读入内存
+    # 不需要 moviepy 剪辑时，可用 downloader.mux(video_url, audio_url, 'video.mp4', headers) 边下载边合并
+    downloader = Downloader()
     with (tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_audio,
           tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_video):
-        temp_audio.write(audio_data)
-        temp_video.write(video_data)
         temp_audio_path, temp_video_path = temp_audio.name, temp_video.name
     try:
+        with ThreadPoolExecutor(2) as executor:
+            list(executor.map(lambda args: downloader.download(*args, headers=headers),
+                              [(audio_url, temp_audio_path), (video_url, temp_video_path)]))
         with AudioFileClip(temp_audio_path) as audio, VideoFileClip(temp_video_path) as video:
             video.with_audio(audio).write_videofile(
                 'video.mp4',
@@ -305,39 +623,69 @@ def test_pymysql():
     """
     `pymysql <https://pypi.org/project/PyMySQL/>`_
     """
+    from pymysql import cursors
+    from db import ConnectionPool, insert_many, stream
+    with ConnectionPool(size=2, host='43.136.102.115', user='root', password='Cesc123!', database='epitome',
+                        charset='utf8mb4', cursorclass=cursors.DictCursor) as pool:
+        with pool.transaction() as connection:
+            insert_many(connection, 'demo', ('id', 'name'), [('1', 'ljh')])
+        with pool.connection() as connection:
+            print(list(stream(connection, 'SELECT `id`, `name` FROM `demo` WHERE `id`=%s', (1,))))
+        with pool.transaction() as connection, connection.cursor() as cursor:
+            cursor.execute('DELETE FROM `demo` WHERE id=%s', (1,))
+
+
+def test_pymysql_pool():
+    """连接池 + executemany 批量写入 + SSDictCursor 流式读取（本地 MySQL 协议替身，离线）"""
     import pymysql
     from pymysql import cursors
-    connection = pymysql.connect(host='43.136.102.115',
-                                 user='root',
-                                 password='Cesc123!',
-                                 database='epitome',
-                                 charset='utf8mb4',
-                                 cursorclass=cursors.DictCursor)
-    with connection:
-        with connection.cursor() as cursor:
-            sql = 'INSERT INTO `demo` (`id`, `name`) VALUES (%s, %s)'
-            cursor.execute(sql, ('1', 'ljh'))
-        connection.commit()
-        with connection.cursor() as cursor:
-            sql = 'SELECT `id`, `name` FROM `demo` WHERE `id`=%s'
-            cursor.execute(sql, 1)
-            result = cursor.fetchone()
-            print(result)
-        with connection.cursor() as cursor:
-            sql = 'DELETE FROM `demo` WHERE id=%s'
-            cursor.execute(sql, 1)
-        connection.commit()
+    from db import ConnectionPool, LocalMySQL, insert_many, stream
+    with LocalMySQL(password='secret') as server:
+        with ConnectionPool(size=2, max_idle=1, check_after=0, cursorclass=cursors.DictCursor,
+                            **server.connect_kwargs) as pool:
+            with pool.transaction() as connection, connection.cursor() as cursor:
+                cursor.execute('CREATE TABLE `demo` (`id` INTEGER PRIMARY KEY, `name` TEXT)')
+            queries = server.queries
+            with pool.transaction() as connection:
+                assert insert_many(connection, 'demo', ('id', 'name'), ((i, f'name{i}') for i in range(10_000))) == 10_000
+            # 1 万行分 10 批，加上 COMMIT 与归还时的 ROLLBACK
+            assert server.queries - queries == 12
+            with pool.connection() as connection:
+                rows = stream(connection, 'SELECT `id`, `name` FROM `demo` WHERE `id` >= %s ORDER BY `id`', (9_998,))
+                assert list(rows) == [{'id': 9998, 'name': 'name9998'}, {'id': 9999, 'name': 'name9999'}]
+                # 未提交的修改归还时回滚
+                with connection.cursor() as cursor:
+                    cursor.execute('DELETE FROM `demo`')
+            with pool.connection() as connection, connection.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) AS `count` FROM `demo`')
+                assert cursor.fetchone() == {'count': 10_000}
+                with pytest.raises(pymysql.IntegrityError):
+                    cursor.execute('INSERT INTO `demo` (`id`, `name`) VALUES (%s, %s)', (1, "O'Brien"))
+            # 连接被复用，只握手一次
+            assert server.connections == 1
+            with pool.connection() as first, pool.connection() as second:
+                assert first is not second
+                with pytest.raises(TimeoutError):
+                    with pool.connection(timeout=0.1):
+                        pass
+            # max_idle=1：多出的连接归还时关闭
+            assert len(pool._idle) == 1
+            # close 同时关闭借出中的连接
+            with pool.connection() as connection:
+                pool.close()
+                assert not connection.open
+            assert pool._created == 0 and not pool._idle
 
 
 class TestOpenpyxl:
     """
     `openpyxl <https://pypi.org/project/openpyxl/>`_：用于读取/写入Excel 2010 xlsx/xlsm/xltx/xltm 文件
     """
-    import openpyxl
     XLSX_PATH = Paths.fixture('test.xlsx')
 
     def test_read(self):
-        workbook = self.openpyxl.load_workbook(self.XLSX_PATH)
+        # 同一内容的工作簿每个会话只解析一次
+        workbook = Paths.load('test.xlsx')
         # 工作表列表
         assert workbook.sheetnames == [sheet.title for sheet in workbook]
         # 工作表
@@ -370,26 +718,60 @@ class TestOpenpyxl:
         from openpyxl.utils import get_column_letter, column_index_from_string
         assert (get_column_letter(100), column_index_from_string('CV')) == ('CV', 100)
 
+    def test_read_only(self):
+        """只读流式读取：行元组、列投影、NumPy 列块"""
+        import io
+        import numpy as np
+        from openpyxl import Workbook, load_workbook
+        from sheet import iter_chunks, iter_rows
+        from util import Timer
+        rows = list(iter_rows(self.XLSX_PATH))
+        assert rows == list(load_workbook(self.XLSX_PATH).active.iter_rows(values_only=True))
+        assert list(iter_rows(self.XLSX_PATH, 'write', columns=['C', 'A'], max_row=2)) == [('C1', 'A1'), ('C2', 'A2')]
+        assert next(iter_rows(self.XLSX_PATH, columns=['data', 'caseid'], header=True)) == (rows[1][2], rows[1][0])
+        # 大表：只写模式生成，列块读取
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('data')
+        worksheet.append(['id', 'name', 'price', 'note', 'code'])
+        for i in range(20_000):
+            worksheet.append([i, f'name{i}', i * 0.5, None if i % 2 else 'x', 'y' if i % 2 else i])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        elapsed, chunks = Timer.measure(lambda: list(iter_chunks(buffer, columns=['price', 'id'], chunk_size=8192)))
+        print(f'\n2 万行列块读取：{elapsed:.3f}s')
+        assert [len(chunk['id']) for chunk in chunks] == [8192, 8192, 3616]
+        ids = np.concatenate([chunk['id'] for chunk in chunks])
+        assert ids.dtype.kind == 'i' and (ids == np.arange(20_000)).all()
+        assert np.concatenate([chunk['price'] for chunk in chunks]).sum() == sum(range(20_000)) * 0.5
+        note = next(iter_chunks(buffer, columns=['note'], chunk_size=4))['note']
+        assert note.dtype == object and note.tolist() == ['x', None, 'x', None]
+        # 数字与文字混合的列为 object，数字不转换为字符串
+        code = next(iter_chunks(buffer, columns=['code'], chunk_size=4))['code']
+        assert code.dtype == object and code.tolist() == [0, 'y', 2, 'y']
+
     def test_write(self):
         from openpyxl.utils import get_column_letter
         from openpyxl.styles import Font
-        workbook = self.openpyxl.load_workbook(self.XLSX_PATH)
+        # 修改前取得深拷贝，不影响共享的解析结果
+        workbook = Paths.load('test.xlsx', copy=True)
         worksheet = workbook[workbook.sheetnames[1]]
         # 设置工作表标题
         worksheet.title = 'write'
-        for _ in range(worksheet.max_row + 1):
-            # 删除行
-            worksheet.delete_rows(1)
+        # 删除行：一次删除全部，逐行删除每次都要移动其后所有单元格
+        worksheet.delete_rows(1, worksheet.max_row)
+        # 样式对象可共享，只创建一次
+        font = Font(size=14, italic=True)
+        for col in range(1, 10):
+            # 设置列宽
+            worksheet.column_dimensions[get_column_letter(col)].width = 4.78
         for row in range(1, 10):
             # 在工作表底部追加一行值
             worksheet.append([f'{get_column_letter(col)}{row}' for col in range(1, 10)])
             # 设置行高
             worksheet.row_dimensions[row].height = 25
-            for col in range(1, 10):
-                # 设置列宽
-                if row == 1: worksheet.column_dimensions[get_column_letter(col)].width = 4.78
+            for cell in worksheet[row]:
                 # 设置单元格字体
-                worksheet[f'{get_column_letter(col)}{row}'].font = Font(size=14, italic=True)
+                cell.font = font
         row = 10
         for col in range(1, 10):
             # 设置单元格
@@ -404,21 +786,68 @@ class TestOpenpyxl:
         # 保存当前工作簿
         workbook.save(self.XLSX_PATH)
 
+    @pytest.mark.parametrize('engine', ['openpyxl', 'xlsxwriter'])
+    def test_write_only(self, engine):
+        """批量写入：只写模式 / xlsxwriter，共享样式，DataFrame 逐行写出"""
+        import io
+        from openpyxl import load_workbook
+        from openpyxl.utils import get_column_letter
+        from sheet import SheetWriter, iter_rows
+        from util import Timer
+        buffer = io.BytesIO()
+        frame = pandas.DataFrame({'id': range(20_000), 'price': [i * 0.5 for i in range(20_000)]})
+        # 缺失值：两种引擎都写为空单元格
+        missing = pandas.DataFrame({'price': [1.5, float('nan')], 'date': [pandas.NaT, pandas.Timestamp('2025-01-01')]})
+
+        def write() -> None:
+            with SheetWriter(buffer, engine) as writer:
+                italic = writer.style(size=14, italic=True)
+                assert writer.style(size=14, italic=True) is italic
+                writer.add_sheet('write', widths={get_column_letter(col): 4.78 for col in range(1, 10)}, row_height=25)
+                writer.append_rows(([f'{get_column_letter(col)}{row}' for col in range(1, 10)] for row in range(1, 11)),
+                                   style=italic)
+                writer.merge('A11:B12', 'A11')
+                writer.add_sheet('frame')
+                writer.append_frame(frame, header_style=writer.style(bold=True),
+                                    style=writer.style(number_format='0.00'))
+                writer.add_sheet('missing')
+                writer.append_frame(missing)
+                writer.append([float('nan'), 'x'])
+
+        elapsed, _ = Timer.measure(write)
+        print(f'\n{engine}：{elapsed:.3f}s')
+        buffer.seek(0)
+        workbook = load_workbook(buffer)
+        worksheet = workbook['write']
+        assert (worksheet['I10'].value, worksheet['I10'].font.size, worksheet['I10'].font.italic) == ('I10', 14, True)
+        # xlsxwriter 按 Excel 的方式在列宽上加了边距
+        assert worksheet.column_dimensions['A'].customWidth and worksheet.column_dimensions['A'].width >= 4.78
+        assert worksheet.sheet_format.defaultRowHeight == 25
+        assert 'A11:B12' in worksheet.merged_cells and worksheet['A11'].value == 'A11'
+        rows = list(iter_rows(buffer, 'frame', header=True))
+        assert len(rows) == 20_000 and rows[-1] == (19_999, 9999.5)
+        assert workbook['frame']['B2'].number_format == '0.00'
+        assert list(workbook['missing'].iter_rows(min_row=2, values_only=True)) == [
+            (1.5, None), (None, pandas.Timestamp('2025-01-01')), (None, 'x')]
+
 
 class TestPythonDocx:
     """
     `python-docx <https://pypi.org/project/python-docx/>`_：用于读取、创建和更新 Microsoft Word 2007+（.docx）文件
     """
-    from docx import Document
     DOCX_PATH = str(Paths.fixture('test.docx'))
 
     def test_read(self):
         from docx.enum.style import WD_STYLE_TYPE
-        doc = type(self).Document(self.DOCX_PATH)
-        # 遍历段落
-        for paragraph in doc.paragraphs:
+        from word import DocxIndex
+        doc = Paths.load('test.docx')
+        # 遍历段落：paragraph.style 每次都经样式部件查找，索引一次遍历得到所有段落的样式与标题级别
+        index = DocxIndex(self.DOCX_PATH)
+        for i in range(len(index)):
             # 所有标题
-            if re.match(r'^Heading \d+$', paragraph.style.name): pass
+            if re.match(r'^Heading \d+$', index.style_name(i) or ''): pass
+        # 大纲
+        for heading in index.outline: pass
         # 遍历样式
         for style in doc.styles:
             if style.type == WD_STYLE_TYPE.PARAGRAPH:
@@ -427,25 +856,46 @@ class TestPythonDocx:
                 # 所有正文
                 if style.name == 'Normal': pass
 
+    def test_index(self):
+        """段落/样式索引：与 python-docx 逐段落读取的结果一致，按文件哈希缓存"""
+        from pathlib import Path
+        from word import DocxIndex, build_index
+        doc = Paths.load('test.docx')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            index = DocxIndex(self.DOCX_PATH, cache=tmpdir)
+            # 首次访问时才建立
+            assert not os.listdir(tmpdir)
+            assert [index.style_name(i) for i in range(len(index))] == [p.style.name for p in doc.paragraphs]
+            assert [(h.level, h.text, h.paragraph) for h in index.outline] == \
+                   [(int(p.style.name[-1]), p.text, i) for i, p in enumerate(doc.paragraphs)
+                    if p.style.name.startswith('Heading')]
+            text = '\n'.join(p.text for p in doc.paragraphs)
+            assert [text[offset:].split('\n')[0] for offset in index.offsets] == [p.text for p in doc.paragraphs]
+            # 表格位于哪个段落之前
+            body = [e.tag.rsplit('}', 1)[1] for e in doc.element.body]
+            assert index.tables == [body[:i].count('p') for i, tag in enumerate(body) if tag == 'tbl']
+            cache, = os.listdir(tmpdir)
+            assert json.loads(Path(tmpdir, cache).read_text(encoding='utf-8')) == build_index(self.DOCX_PATH)
+            # 再次打开直接读取缓存
+            Path(tmpdir, cache).write_text(json.dumps(build_index(self.DOCX_PATH) | {'outline': []}))
+            assert DocxIndex(self.DOCX_PATH, cache=tmpdir).outline == []
+
     def test_write(self):
-        from io import BytesIO
         from docx.enum.section import WD_ORIENTATION
         from docx.enum.text import WD_BREAK
         from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
         from docx.shared import Inches
         from docx.shared import Pt
-        doc = type(self).Document(self.DOCX_PATH)
+        from word import add_picture, fill_table
+        doc = Paths.load('test.docx', copy=True)
         section = doc.sections[0]
         # 页面宽高
         assert round(section.page_width.cm, 1) == 21.0
         assert round(section.page_height.cm, 1) == 29.7
         # 页面方向
         assert section.orientation == WD_ORIENTATION.PORTRAIT
-        body = doc.element.body
-        # 清空文档（段落、表格、浮动文本框；图片、分页符都是在段落内）
-        for e in list(body):
-            if not e.tag.endswith('}sectPr'):
-                body.remove(e)
+        # 清空文档（段落、表格、浮动文本框；图片、分页符都是在段落内），保留 sectPr
+        doc.element.body.clear_content()
         # region 添加内容
         # 添加标题（应用了 Heading \d 样式的段落）
         doc.add_heading('一级标题', 1)
@@ -465,17 +915,15 @@ class TestPythonDocx:
         doc.paragraphs[3].insert_paragraph_before('插入')
         doc.paragraphs[3].alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
         # 添加图片（在段落内）
-        img_bio = BytesIO(requests.get('https://i.imgs.ovh/2025/04/18/j9kHY.jpeg').content)
-        doc.add_picture(img_bio, width=Inches(1.25))
-        # 相当于
-        doc.add_paragraph().add_run().add_picture(img_bio, width=Inches(1.25))
+        img = HttpClient.shared().get('https://i.imgs.ovh/2025/04/18/j9kHY.jpeg').content
+        # 相当于 doc.add_paragraph().add_run().add_picture(BytesIO(img), width=Inches(1.25))，同一图片只解析、存储一次
+        add_picture(doc, img, width=Inches(1.25))
+        add_picture(doc, img, width=Inches(1.25))
         # 水平居中
         # 添加表格
         rows = cols = 3
-        doc.add_table(rows, cols)
-        for i in range(rows):
-            for j in range(cols):
-                doc.tables[0].cell(i, j).paragraphs[0].add_run(str(i * cols + j + 1))
+        # 以空行为原型整批生成行 XML，代替逐个 doc.tables[0].cell(i, j)（每次都重新扫描表格）
+        fill_table(doc.add_table(1, cols), ([i * cols + j + 1 for j in range(cols)] for i in range(rows)))
         # 添加分页符（在段落内）
         doc.add_page_break()
         # 相当于
@@ -483,6 +931,50 @@ class TestPythonDocx:
         # endregion
         doc.save(self.DOCX_PATH)
 
+    def test_template(self):
+        """模板只解析一次，每份文档深拷贝正文树；占位符替换，表格整批填充，图片按哈希去重，进程池批量生成"""
+        import zipfile
+        from io import BytesIO
+        import docx
+        from PIL import Image
+        from word import DocxTemplate, add_picture, fill_table, render_many
+        with tempfile.TemporaryDirectory() as tmpdir:
+            template_path = f'{tmpdir}/template.docx'
+            doc = Paths.load('test.docx', copy=True)
+            p = doc.add_paragraph('尊敬的 {{')
+            # 占位符被拆分到多个 run
+            p.add_run('name').bold = True
+            p.add_run('}}，金额 {{amount}}')
+            doc.save(template_path)
+            buffer = BytesIO()
+            Image.new('RGB', (20, 10), 'red').save(buffer, 'PNG')
+            template = DocxTemplate(template_path)
+            # 末行少一个单元格，以空单元格补齐
+            rows = [(i, i * 2, None) for i in range(4)] + [(4, 8)]
+            for _ in range(2):
+                template.render(f'{tmpdir}/out.docx', fields={'name': '<张三>', 'amount': 100}, tables={0: rows},
+                                build=lambda d: [add_picture(d, buffer.getvalue()) for _ in range(2)])
+            out = docx.Document(f'{tmpdir}/out.docx')
+            assert out.paragraphs[-3].text == '尊敬的 <张三>，金额 100'
+            # 原型行（最后一行）被数据行取代
+            assert [[cell.text for cell in row.cells] for row in out.tables[0].rows][-5:] == \
+                   [[str(i), str(i * 2), ''] for i in range(5)]
+            assert len(out.tables[0].rows) == 2 + 5
+            with pytest.raises(ValueError):
+                fill_table(out.tables[0], [(1, 2, 3, 4)])
+            # 两次生成、每次两张，包内只有一份
+            assert sum(name.endswith('.png') for name in zipfile.ZipFile(f'{tmpdir}/out.docx').namelist()) == 1
+            assert len(out.inline_shapes) == len(doc.inline_shapes) + 2
+            # 模板未被修改
+            assert docx.Document(template_path).paragraphs[-1].text == '尊敬的 {{name}}，金额 {{amount}}'
+            template.render(buffer := BytesIO())
+            assert len(docx.Document(buffer).inline_shapes) == len(doc.inline_shapes)
+            jobs = [(f'{tmpdir}/{i}.docx', {'fields': {'name': i}}) for i in range(5)] + [(f'{tmpdir}/x/y.docx', {})]
+            results = list(render_many(template_path, jobs, workers=2, chunksize=2))
+            assert [target for target, _ in results] == [target for target, _ in jobs]
+            assert isinstance(results[-1][1], FileNotFoundError)
+            assert docx.Document(results[3][1]).paragraphs[-1].text == '尊敬的 3，金额 {{amount}}'
+
 
 def test_pandas():
     """
@@ -496,35 +988,35 @@ def test_pandas():
     4. 分组：groupby()
     5. 复杂多级：apply()
     """
+    from frame import ExcelBook
     excel_path = Paths.fixture('test.xlsx')
-    # 读取工作表，以下三行均表示读取第一个工作表
-    dataframe = pandas.read_excel(excel_path)
-    dataframe = pandas.read_excel(excel_path, sheet_name='read')
-    dataframe = pandas.read_excel(excel_path, sheet_name=0)
-    # 读取多个工作表
-    dataframes = pandas.read_excel(excel_path, sheet_name=['read', 2])
-    # 读取特定列
-    dataframe = pandas.read_excel(excel_path, usecols=['caseid', 'data'])
-    dataframe = pandas.read_excel(excel_path, usecols=[0, 2])
-    # 其它
-    dataframe = pandas.read_excel(excel_path,
-                                  # 跳过n行再读取n行
-                                  skiprows=0, nrows=9,
-                                  # 指定某列数据类型
-                                  dtype={'caseid': int, 'excepted': str, 'data': str},
-                                  # 将某些值识别为 NaN
-                                  na_values=['无', '/', ''],
-                                  # 自动解释日期列
-                                  # parse_dates=['date'],
-                                  # 指定日期格式
-                                  # date_format='%Y-%m-%d'
-                                  )
+    # pandas.read_excel 每次调用都重新打开、解析工作簿；ExcelBook 只打开一次，每个工作表只解析一次，以下投影复用解析结果
+    with ExcelBook(excel_path) as book:
+        # 读取工作表，以下三行均表示读取第一个工作表
+        dataframe = book.read()
+        dataframe = book.read('read')
+        dataframe = book.read(0)
+        # 读取多个工作表
+        dataframes = book.read(['read', 2])
+        # 读取特定列
+        dataframe = book.read(usecols=['caseid', 'data'])
+        dataframe = book.read(usecols=[0, 2])
+        # 其它
+        dataframe = book.read(
+            # 跳过n行再读取n行
+            skiprows=0, nrows=9,
+            # 指定某列数据类型
+            dtype={'caseid': int, 'excepted': str, 'data': str},
+            # 将某些值识别为 NaN
+            na_values=['无', '/', ''],
+        )
+    # 日期列：pandas.read_excel(excel_path, parse_dates=['date'], date_format='%Y-%m-%d')
     print(dataframe.info())
     # 删除重复数据
     dataframe.drop_duplicates()
-    # 遍历数据
-    for row in dataframe.itertuples():
-        print(f'Index: {row.Index}, caseid: {row.caseid}, excepted: {row.excepted}, data: {row.data}')
+    # 遍历数据：整列拼接字符串，代替 itertuples 逐行格式化
+    print('\n'.join('Index: ' + dataframe.index.astype(str) + ', caseid: ' + dataframe['caseid'].astype(str)
+                    + ', excepted: ' + dataframe['excepted'] + ', data: ' + dataframe['data']))
     # 两种索引方式读取数据
     assert dataframe.iloc[0, 0] == dataframe.loc[0, 'caseid'] == 1
     with tempfile.TemporaryDirectory() as tmpdir:
@@ -534,37 +1026,182 @@ def test_pandas():
         dataframe.to_excel(f'{tmpdir}/test2.xlsx')
 
 
+def test_pandas_ingest():
+    """一次打开多投影、分块读取（声明 dtype 与分类）、列式缓存"""
+    from frame import ExcelBook, cached, iter_frames, load_columnar, read_chunked, save_columnar
+    excel_path = Paths.fixture('test.xlsx')
+    with ExcelBook(excel_path) as book:
+        pandas.testing.assert_frame_equal(book.read(usecols=[0, 2]), pandas.read_excel(excel_path, usecols=[0, 2]))
+        kwargs = dict(nrows=3, dtype={'caseid': 'int32', 'data': str}, usecols=['caseid', 'data'])
+        # ExcelBook 的 skiprows 为表头之后跳过的行数
+        expected = pandas.read_excel(excel_path, skiprows=range(1, 3), **kwargs)
+        pandas.testing.assert_frame_equal(book.read(skiprows=2, **kwargs), expected)
+        assert list(book.read(['read', 2])) == ['read', 2]
+        # 返回副本，修改不影响缓存
+        frame = book.read()
+        frame.loc[0, 'caseid'] = -1
+        assert frame.loc[0, 'caseid'] == -1 and book.read().loc[0, 'caseid'] == 1
+    size = 10_000
+    source = pandas.DataFrame({'id': range(size), 'city': [('广州', '深圳', None)[i % 3] for i in range(size)],
+                               'level': [('low', 'high')[i % 2] for i in range(size)],
+                               'price': [i * 0.5 for i in range(size)]})
+    level = pandas.CategoricalDtype(['low', 'high'], ordered=True)
+    dtype = {'id': 'int32', 'level': level, 'price': 'float32'}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # na_values 替换后重新推断类型：数字与 '/' 混合的列为 float64；dtype 作用于原始值：含空单元格的数字列为 '1'，同 read_excel
+        pandas.DataFrame({'a': [1, '/', 3], 'b': ['x', '/', 'y'], 'c': [1, None, 3]}).to_excel(f'{tmpdir}/mixed.xlsx',
+                                                                                               index=False)
+        with ExcelBook(f'{tmpdir}/mixed.xlsx') as book:
+            for kwargs in (dict(na_values=['/']), dict(dtype={'c': str}), dict(na_values=['/'], dtype={'a': str})):
+                pandas.testing.assert_frame_equal(book.read(**kwargs),
+                                                  pandas.read_excel(f'{tmpdir}/mixed.xlsx', **kwargs))
+        source.to_excel(f'{tmpdir}/big.xlsx', index=False)
+        source.to_csv(f'{tmpdir}/big.csv', index=False)
+        for path in (f'{tmpdir}/big.xlsx', f'{tmpdir}/big.csv'):
+            chunks = list(iter_frames(path, usecols=['id', 'level', 'price'], dtype=dtype, chunk_size=4096))
+            assert [len(chunk) for chunk in chunks] == [4096, 4096, 1808]
+            frame = pandas.concat(chunks, ignore_index=True)
+            assert frame.dtypes.to_dict() == {'id': 'int32', 'level': level, 'price': 'float32'}
+            # dtype 中不在 usecols 内的列被忽略
+            assert next(iter_frames(path, usecols=['id'], dtype=dtype)).dtypes.to_dict() == {'id': 'int32'}
+        frame = read_chunked(f'{tmpdir}/big.xlsx', dtype=dtype)
+        # .npy 目录缓存：数值列内存映射，分类列存编码，字符串列的空值另存掩码
+        save_columnar(frame, f'{tmpdir}/big.cache')
+        pandas.testing.assert_frame_equal(load_columnar(f'{tmpdir}/big.cache'), frame)
+        calls = []
+        reader = lambda: calls.append(1) or read_chunked(f'{tmpdir}/big.xlsx', dtype=dtype)
+        for _ in range(2):
+            pandas.testing.assert_frame_equal(cached(f'{tmpdir}/big.xlsx', f'{tmpdir}/cache', reader), frame)
+        assert len(calls) == 1
+
+
+def test_pandas_vectorized():
+    """向量化变换 vs itertuples / apply 逐行循环"""
+    import numpy as np
+    from transform import aggregate, broadcast, case, dedupe, hash_key, strings
+    from util import Timer
+    size = 100_000
+    rng = np.random.default_rng(0)
+    frame = pandas.DataFrame({'city': rng.choice(['gz', 'sz', 'bj'], size), 'price': rng.integers(0, 200, size),
+                              'name': rng.choice([' apple ', 'Banana', 'cherry', None], size)})
+
+    def level(price: int) -> str:
+        return 'high' if price >= 100 else 'mid' if price >= 10 else 'low'
+
+    def loop() -> list[str]:
+        return [level(row.price) for row in frame.itertuples()]
+
+    def apply() -> pandas.Series:
+        return frame['price'].apply(level)
+
+    def vectorized() -> pandas.Series:
+        price = frame['price']
+        return case(frame, [(price >= 100, 'high'), (price >= 10, 'mid')], default='low')
+
+    (loop_time, expected), (apply_time, applied), (vector_time, result) = (
+        Timer.measure(func) for func in (loop, apply, vectorized))
+    assert result.tolist() == applied.tolist() == expected
+    print(f'\nitertuples：{loop_time:.4f}s，apply：{apply_time:.4f}s，向量化：{vector_time:.4f}s')
+    assert vector_time < loop_time
+    # 条件也可写成表达式
+    assert case(frame, [('price >= 100', 'high'), ('price >= 10', 'mid')], default='low').equals(result)
+    # 分组聚合与组内回填
+    totals = aggregate(frame, 'city', total=('price', 'sum'), count=('price', 'size'))
+    assert totals.set_index('city')['total'].to_dict() == frame.groupby('city')['price'].sum().to_dict()
+    share = frame['price'] / broadcast(frame, 'city', 'price', 'sum')
+    assert np.isclose(share.groupby(frame['city']).sum(), 1).all()
+    # 哈希键去重
+    assert len(np.unique(hash_key(frame, ['city', 'name']))) == len(frame[['city', 'name']].drop_duplicates())
+    pandas.testing.assert_frame_equal(dedupe(frame, ['city', 'name']), frame.drop_duplicates(['city', 'name']))
+    # numpy.strings：空值保持为空
+    names = strings(strings(frame['name'], 'strip'), 'upper')
+    pandas.testing.assert_series_equal(names, frame['name'].str.strip().str.upper())
+    assert strings(frame['name'], 'startswith', 'B').sum() == (frame['name'] == 'Banana').sum()
+
+
 def test_pdfplumber():
     """
     `pdfplumber <https://pypi.org/project/pdfplumber/>`_：获取 PDF 每个 char、rectangle、line 的信息
     """
     import pdfplumber
-    with pdfplumber.open(Paths.fixture('test.pdf')) as pdf:
+    with pdfplumber.open(Paths.fixture('test.pdf'), password='123456') as pdf:
         for page in pdf.pages:
-            print(page.extract_text)
+            print(page.extract_text())
             for table in page.extract_tables():
                 print(table)
 
 
+def test_pdf_extract():
+    """按页分片并行提取：进程池 vs 单进程，逐页缓存，pypdfium2 文本后端"""
+    from pypdf import PdfReader, PdfWriter
+    from pdfs import PageCache, extract
+    from util import Timer
+    reader = PdfReader(Paths.fixture('test.pdf'), password='123456')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # 复制页面，构造 24 页的 PDF
+        writer = PdfWriter()
+        for _ in range(8):
+            for page in reader.pages:
+                writer.add_page(page)
+        path = f'{tmpdir}/big.pdf'
+        writer.write(path)
+        sequential, expected = Timer.measure(lambda: list(extract(path, workers=0)))
+        parallel, results = Timer.measure(lambda: list(extract(path, workers=4, shard_size=3)))
+        assert results == expected and [page.index for page in results] == list(range(24))
+        assert all(page.tables for page in results)
+        fast, texts = Timer.measure(lambda: list(extract(path, backend='pdfium', tables=False)))
+        assert '服务API对接文档' in texts[0].text and not texts[0].tables
+        print(f'\n单进程：{sequential:.3f}s，4 进程：{parallel:.3f}s，pdfium 文本：{fast:.3f}s')
+        cache = PageCache(f'{tmpdir}/cache')
+        assert list(extract(path, [5, 1], cache=cache, workers=0)) == [expected[5], expected[1]]
+        cached, results = Timer.measure(lambda: list(extract(path, [1, 5], cache=cache)))
+        assert results == [expected[1], expected[5]] and cached < sequential / 4
+
+
 def test_pypdf():
     """
     `pypdf <https://pypi.org/project/pypdf/>`_：拆分、合并、裁剪和转换 PDF 文件
     """
     from pypdf import PdfReader, PdfWriter
+    from pdfs import stamp
     pwd = '123456'
-    reader = PdfReader(Paths.fixture('test.pdf'))
-    # 取消密码
-    reader.decrypt(pwd)
-    # watermark_page = PdfReader('watermark.pdf').get_page(0)
-    with tempfile.TemporaryFile() as fp:
-        writer = PdfWriter()
-        # 设置密码
-        writer.encrypt(pwd)
-        for i, page in enumerate(reader.pages):
-            # 给每一页合并水印
-            # page.merge_page(watermark_page)
-            writer.add_page(page)
-        writer.write(fp)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # 取第 3 页作为水印
+        reader = PdfReader(Paths.fixture('test.pdf'), password=pwd)
+        watermark = PdfWriter()
+        watermark.add_page(reader.pages[2])
+        watermark.write(f'{tmpdir}/watermark.pdf')
+        # 取消密码，给每一页合并水印，再设置密码
+        stamp(Paths.fixture('test.pdf'), f'{tmpdir}/stamped.pdf', f'{tmpdir}/watermark.pdf', password=pwd, encrypt=pwd)
+        stamped = PdfReader(f'{tmpdir}/stamped.pdf', password=pwd)
+        assert '调用说明' in stamped.pages[0].extract_text()
+
+
+def test_pdf_pipeline():
+    """多文件并行加水印（水印页每个进程只解析一次），增量写出，拆分与合并"""
+    import os
+    from pypdf import PdfReader, PdfWriter
+    from pdfs import merge, split, stamp_many
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reader = PdfReader(Paths.fixture('test.pdf'), password='123456')
+        for name, pages in (('watermark', reader.pages[2:]), ('plain', reader.pages)):
+            writer = PdfWriter()
+            for page in pages:
+                writer.add_page(page)
+            writer.write(f'{tmpdir}/{name}.pdf')
+        jobs = [(f'{tmpdir}/plain.pdf', f'{tmpdir}/stamped{i}.pdf') for i in range(6)] + [('missing.pdf', 'x.pdf')]
+        results = list(stamp_many(jobs, workers=2, watermark=f'{tmpdir}/watermark.pdf', over=False))
+        assert [source for source, _ in results] == [source for source, _ in jobs]
+        assert isinstance(results[-1][1], FileNotFoundError)
+        stamped = PdfReader(results[0][1])
+        assert all('调用说明' in page.extract_text() for page in stamped.pages)
+        # 增量更新：原文件字节原样保留在输出开头
+        with open(f'{tmpdir}/plain.pdf', 'rb') as f, open(results[0][1], 'rb') as g:
+            assert g.read(os.path.getsize(f'{tmpdir}/plain.pdf')) == f.read()
+        parts = split(results[0][1], f'{tmpdir}/parts', pages_per_file=2)
+        assert [len(PdfReader(part).pages) for part in parts] == [2, 1]
+        merged = PdfReader(merge([parts[1], parts[0]], f'{tmpdir}/merged.pdf'))
+        assert [page.extract_text() for page in merged.pages] == [stamped.pages[i].extract_text() for i in (2, 0, 1)]
 
 
 class TestPPTX:
@@ -576,7 +1213,7 @@ class TestPPTX:
 
     def test_read(self):
         # 读取演示文稿
-        p = type(self).Presentation(self.PPTX_PATH)
+        p = Paths.load('test.pptx')
         # 遍历幻灯片
         for slide in p.slides:
             # 遍历 shapes
@@ -586,6 +1223,10 @@ class TestPPTX:
                         print(paragraph.text)
                 if shape.is_placeholder:
                     print(f'名称：{shape.name}，索引：{shape.placeholder_format.idx}，类型：{shape.placeholder_format.type}')
+        # 流式提取文字：逐张幻灯片解析 XML，不创建 shape 对象，适合大文件、批量文件
+        from slides import iter_text
+        for index, shape, text in iter_text(self.PPTX_PATH):
+            print(index, shape, text)
 
     def test_write(self):
         from pptx.chart.data import ChartData
@@ -638,3 +1279,88 @@ class TestPPTX:
         chart.plots[0].data_labels.number_format = '#,#'
         chart.plots[0].data_labels.position = XL_DATA_LABEL_POSITION.INSIDE_END
         p.save(self.PPTX_PATH)
+
+    def test_deck(self):
+        """表格数据批量生成幻灯片：版式、占位符查找缓存，同形图表复用 XML，进程池并行生成多个文稿"""
+        from pptx.util import Cm
+        from slides import ChartSpec, DeckBuilder, SlideSpec, TableSpec, build_decks, iter_text, specs_from_frame
+        frame = pandas.DataFrame({'city': ['北京', '上海', '广州'], 'summary': ['a', 'b', 'c'],
+                                  'sales': [5676, 4563, 7656], 'amount': [3246, 2436, None]})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            specs = specs_from_frame(frame, title='city', placeholders={1: 'summary'})
+            specs.append(SlideSpec(5, '汇总', tables=[TableSpec([list(frame.columns), *frame.to_numpy().tolist()])],
+                                   charts=[ChartSpec(frame['city'], {'销量': frame['sales'].tolist(),
+                                                                     '金额': frame['amount'].tolist()},
+                                                     box=(Cm(1), Cm(10), Cm(12), Cm(6)))]))
+            # 同形图表：只有数值不同
+            specs += [SlideSpec(6, charts=[ChartSpec(frame['city'], {'销量': [i, i + 1, i + 2], '金额': [1, 2, 3]})])
+                      for i in range(3)]
+            jobs = [(f'{tmpdir}/{i}.pptx', specs) for i in range(4)] + [(f'{tmpdir}/x/y.pptx', specs)]
+            results = list(build_decks(jobs, workers=2, chunksize=2))
+            assert [target for target, _ in results] == [target for target, _ in jobs]
+            assert isinstance(results[-1][1], FileNotFoundError)
+            p = type(self).Presentation(results[0][1])
+            assert len(p.slides) == 7
+            assert [p.slides[i].shapes.title.text for i in range(3)] == ['北京', '上海', '广州']
+            assert p.slides[1].placeholders[1].text == 'b'
+            charts = [shape.chart for slide in p.slides for shape in slide.shapes if shape.has_chart]
+            assert [list(chart.plots[0].categories) for chart in charts] == [['北京', '上海', '广州']] * 4
+            assert [list(series.values) for series in charts[0].series] == [[5676, 4563, 7656], [3246, 2436, None]]
+            assert [list(chart.series[0].values) for chart in charts[1:]] == [[0, 1, 2], [1, 2, 3], [2, 3, 4]]
+            # 每个图表仍有各自的部件与内嵌工作簿
+            assert len({chart.part.partname for chart in charts}) == 4
+            assert all(chart.part.chart_workbook.xlsx_part is not None for chart in charts)
+            table = next(shape.table for shape in p.slides[3].shapes if shape.has_table)
+            assert [cell.text for cell in table.rows[1].cells] == ['北京', 'a', '5676', '3246.0']
+            # 流式提取与逐个 shape 读取结果一致
+            builder = DeckBuilder(embed_data=False).extend(specs)
+            builder.save(f'{tmpdir}/plain.pptx')
+            expected = [(i, shape.name, paragraph.text) for i, slide in enumerate(builder.presentation.slides)
+                        for shape in slide.shapes if shape.has_text_frame for paragraph in shape.text_frame.paragraphs]
+            assert [item for item in iter_text(f'{tmpdir}/plain.pptx') if not item[1].startswith('Table')] == expected
+            assert (3, 'Table 2', '上海') in list(iter_text(f'{tmpdir}/plain.pptx'))
+
+
+def test_documents():
+    """统一的文字提取：按文件头识别格式，流式迭代，进程池批量提取（单文件超时），内容哈希缓存，分格式吞吐量"""
+    import shutil
+    from documents import ExtractionService, detect, iter_text
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # 扩展名与内容不符时仍按文件头识别
+        for name, target in (('test.docx', 'a.bin'), ('test.pptx', 'b.docx'), ('test.pdf', 'c'), ('test.xlsx', 'd.xlsx'),
+                             ('test.txt', 'e.pdf'), ('test.docx', 'f.docx')):
+            shutil.copy(Paths.fixture(name), f'{tmpdir}/{target}')
+        paths = [f'{tmpdir}/{name}' for name in ('a.bin', 'b.docx', 'c', 'd.xlsx', 'e.pdf', 'f.docx', 'missing')]
+        assert [detect(path) for path in paths[:-1]] == ['docx', 'pptx', 'pdf', 'xlsx', None, 'docx']
+        assert next(iter_text(paths[0])) == ('0', '一级标题')
+        assert ('read!1', 'caseid\texcepted\tdata') in iter_text(paths[3])
+        assert '调用说明' in dict(iter_text(paths[2], password='123456'))['2']
+        service = ExtractionService(cache=f'{tmpdir}/cache', workers=2, password='123456')
+        results = {result.path: result for result in service.run(iter(paths))}
+        assert results[paths[0]].segments == list(iter_text(paths[0])) == results[paths[5]].segments
+        assert isinstance(results[paths[4]].error, ValueError) and isinstance(results[paths[6]].error, OSError)
+        assert service.metrics['docx'].files == 2 and service.metrics['pdf'].chars > 1000
+        assert service.metrics['unknown'].errors == 2
+        # 内容相同的文件命中缓存（与路径无关）
+        hits = service.metrics['docx'].cache_hits
+        again = list(service.run(paths[:4]))
+        assert all(result.cached for result in again)
+        assert [result.segments for result in again] == [results[path].segments for path in paths[:4]]
+        assert service.metrics['docx'].cache_hits == hits + 1
+        # 缓存项损坏（如写入中途中断）：视为未命中，重新提取并覆盖
+        with open(f'{tmpdir}/cache/{results[paths[3]].digest}.json', 'w') as f:
+            f.write('{"kind": "xlsx", "segm')
+        result, = service.run(paths[3:4])
+        assert not result.cached and result.segments == results[paths[3]].segments
+        assert next(service.run(paths[3:4])).cached
+        # 单文件超时：只终止处理该文件的工作进程，服务继续运行
+        service = ExtractionService(workers=2, timeout=0.001, password='123456')
+        assert all(isinstance(result.error, TimeoutError) for result in service.run(paths[:4]))
+        assert sum(metrics.timeouts for metrics in service.metrics.values()) == 4
+        # 超时文件的等待时间单独记录，不计入吞吐量
+        assert all(metrics.seconds == 0 and metrics.timeout_seconds > 0 for metrics in service.metrics.values())
+        service.timeout = 60
+        assert all(result.error is None for result in service.run(paths[:4]))
+        for kind, metrics in service.metrics.items():
+            print(f'\n{kind}：{metrics.files} 个文件，{metrics.files_per_second:.1f} 个/秒，'
+                  f'{metrics.megabytes_per_second:.2f} MB/秒')
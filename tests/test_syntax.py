@@ -574,6 +574,61 @@ class TestFileAndDirectoryAccess:
         # 删除一个完整的目录树
         shutil.rmtree(copy_dir, ignore_errors=True)
 
+    def test_sync(self):
+        """
+        并行增量同步：os.scandir 遍历，线程池按大小调度复制，跳过未变化的文件，复制的同时写入归档
+
+        相当于 copytree(ignore=...) + make_archive()，但只读取一次源文件，第二次同步只复制变化的文件
+        """
+        import hashlib
+        import zipfile
+        from pathlib import Path
+        from filesync import sync
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source, target = f'{tmpdir}/source', f'{tmpdir}/target'
+            for i in range(30):
+                os.makedirs(f'{source}/d{i % 3}/sub', exist_ok=True)
+                with open(f'{source}/d{i % 3}/{i}.txt', 'wb') as f:
+                    f.write(os.urandom(random.randint(0, 4096)))
+            with open(f'{source}/big.bin', 'wb') as f:
+                f.write(os.urandom(3 * 1024 * 1024))
+            with open(f'{source}/skip.py', 'w') as f:
+                f.write('pass')
+            ignore = shutil.ignore_patterns('*.py')
+            result = sync(source, target, ignore=ignore, archive=f'{tmpdir}/copy.zip', verify=True, batch_bytes=16384)
+            assert len(result.copied) == 31 and not result.skipped and not result.errors
+            assert not os.path.exists(f'{target}/skip.py') and os.path.isdir(f'{target}/d0/sub')
+            with zipfile.ZipFile(f'{tmpdir}/copy.zip') as z:
+                assert z.testzip() is None
+                assert z.read('d1/1.txt') == Path(f'{source}/d1/1.txt').read_bytes()
+                # 与 make_archive 的条目一致（目录、文件）
+                shutil.make_archive(f'{tmpdir}/expected', 'zip', target)
+                assert sorted(z.namelist()) == sorted(zipfile.ZipFile(f'{tmpdir}/expected.zip').namelist())
+            # 增量：修改一个文件、删除一个文件与一个目录
+            with open(f'{source}/d2/2.txt', 'wb') as f:
+                f.write(b'changed')
+            os.remove(f'{source}/d0/0.txt')
+            os.rmdir(f'{source}/d1/sub')
+            result = sync(source, target, ignore=ignore, compare='hash', delete=True)
+            assert result.copied == ['d2/2.txt'] and result.deleted == ['d0/0.txt', 'd1/sub']
+            assert len(result.skipped) == 29 and not os.path.exists(f'{target}/d1/sub')
+            assert result.digests['d2/2.txt'] == hashlib.sha256(b'changed').hexdigest()
+            # compare='mtime' 且不校验时不记录哈希
+            result = sync(source, target, ignore=ignore, archive=f'{tmpdir}/copy.zip')
+            assert not result.copied and not result.digests
+            # 类型改变：源中文件与目录互换，不删除时记入 errors，删除时替换目标
+            os.remove(f'{source}/d1/1.txt')
+            os.makedirs(f'{source}/d1/1.txt')
+            shutil.rmtree(f'{source}/d2/sub')
+            Path(f'{source}/d2/sub').write_bytes(b'file')
+            result = sync(source, target, ignore=ignore)
+            assert set(result.errors) == {'d1/1.txt', 'd2/sub'} and os.path.isfile(f'{target}/d1/1.txt')
+            result = sync(source, target, ignore=ignore, delete=True)
+            assert not result.errors and result.copied == ['d2/sub'] and os.path.isdir(f'{target}/d1/1.txt')
+            assert Path(f'{target}/d2/sub').read_bytes() == b'file'
+            with pytest.raises(ValueError):
+                sync(source, target, compare='size')
+
 
 # endregion
 # region 数据压缩和归档：https://docs.python.org/zh-cn/3/library/archiving.html
@@ -846,6 +901,42 @@ class TestConcurrentExecution:
         3. Future：将可调用对象封装为异步执行
         """
 
+    def test_crawler(self):
+        """
+        爬虫引擎：对比上述五种执行模型的抓取速度（本地替身服务器，离线）
+        """
+        from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+        from crawler import Crawler, ProcessPerTaskExecutor, ThreadPerTaskExecutor, TimerExecutor
+        from net import LocalServer, throughput
+        n = 60
+        with LocalServer() as server:
+            # 页面 i 链接到 i+1 与 2i+1
+            for i in range(n):
+                server.add(f'/{i}', ''.join(f'<a href="/{j}">{j}</a>' for j in (i + 1, 2 * i + 1) if j < n).encode())
+            urls = {f'{server.url}/{i}' for i in range(n)}
+            models = {
+                'Thread': ThreadPerTaskExecutor(),
+                'Process': ProcessPerTaskExecutor(),
+                'ThreadPoolExecutor': ThreadPoolExecutor(max_workers=8),
+                'ProcessPoolExecutor': ProcessPoolExecutor(max_workers=4),
+                'Timer': TimerExecutor(),
+            }
+            for method, executor in models.items():
+                with executor:
+                    pages = []
+                    crawler = Crawler(executor, max_in_flight=8)
+                    pages_per_sec = throughput(lambda: pages.extend(crawler.run([f'{server.url}/0'])), n)
+                logger.info(f'{method}: {pages_per_sec:.0f} pages/sec')
+                # 去重：每个页面只抓取一次
+                assert sorted(page.url for page in pages) == sorted(urls)
+            # 礼貌限速 + 页数上限
+            assert len(Crawler(max_in_flight=4, per_host=1, delay=0.01, max_pages=10).run([f'{server.url}/0'])) == 10
+            # 达到页数上限后立即结束，不逐个取出（并等待限速）队列中剩余的 URL
+            server.add('/hub', ''.join(f'<a href="/{i}">{i}</a>' for i in range(n)).encode())
+            start = time.perf_counter()
+            assert len(Crawler(max_in_flight=4, per_host=1, delay=0.2, max_pages=3).run([f'{server.url}/hub'])) == 3
+            assert time.perf_counter() - start < 2
+
 
 # endregion
 # region 网络和进程间通信：https://docs.python.org/zh-cn/3/library/ipc.html
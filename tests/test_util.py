@@ -0,0 +1,89 @@
+"""
+测试辅助工具：util.py
+"""
+import time
+
+import numpy as np
+import pytest
+
+from util import Benchmark, BenchStats, FixtureRegistry, MemoryStats, Paths, Timer
+
+
+class TestTimer:
+    def test_measure(self):
+        elapsed, result = Timer.measure(sum, range(10))
+        assert result == 45 and elapsed >= 0
+
+    def test_measure_memory(self):
+        _, result, memory = Timer.measure_memory(lambda n: [0] * n, 1_000_000, top=3)
+        assert isinstance(memory, MemoryStats)
+        # 列表存活，净分配与峰值均不少于 8MB
+        assert memory.delta >= 8_000_000 and memory.peak >= memory.delta
+        assert len(memory.top) <= 3 and memory.top[0][1] >= 8_000_000
+        del result
+        # 临时分配只体现在峰值
+        _, _, memory = Timer.measure_memory(lambda n: len([0] * n), 1_000_000)
+        assert memory.peak >= 8_000_000 and memory.delta < 1_000_000
+
+
+class TestBenchmark:
+    def test_run(self):
+        bench = Benchmark(warmup=1, rounds=8, min_round_time=0.001)
+        stats = bench.run('sum', sum, range(1000))
+        assert bench.results['sum'] is stats
+        assert stats.iterations >= 1 and len(stats.samples) == 8
+        assert stats.min <= stats.median <= stats.p95 <= stats.p99 <= stats.max
+
+    def test_outliers(self):
+        from util import _reject_outliers
+        assert _reject_outliers([1.0, 1.0, 1.0, 1.1, 1.2, 100.0]) == [1.0, 1.0, 1.0, 1.1, 1.2]
+
+    def test_save_compare(self, tmp_path):
+        bench = Benchmark(rounds=3, min_round_time=0.001)
+        bench.run('sleep', time.sleep, 0)
+        bench.save(tmp_path / 'baseline.json')
+        baseline = Benchmark.load(tmp_path / 'baseline.json')
+        assert isinstance(baseline['sleep'], BenchStats)
+        # 中位数慢一倍，超过 10% 阈值
+        slower = {'sleep': BenchStats(**{**baseline['sleep'].__dict__, 'median': baseline['sleep'].median * 2})}
+        assert Benchmark.compare(slower, baseline, threshold=0.1) == {'sleep': 2.0}
+        assert Benchmark.compare(baseline, baseline) == {}
+
+
+class TestFixtureRegistry:
+    def test_load_cached(self):
+        registry = FixtureRegistry(Paths.fixture(''))
+        workbook = registry.load('test.xlsx')
+        assert registry.load('test.xlsx') is workbook
+        assert (registry.hits, registry.misses) == (1, 1)
+        # 私有副本与共享结果互不影响
+        private = registry.load('test.xlsx', copy=True)
+        assert private is not workbook and private.sheetnames == workbook.sheetnames
+
+    def test_read_only(self, tmp_path):
+        np.save(tmp_path / 'a.npy', np.arange(3))
+        registry = FixtureRegistry(tmp_path)
+        with pytest.raises(ValueError):
+            registry.load('a.npy')[0] = 1
+        arr = registry.load('a.npy', copy=True)
+        arr[0] = 1
+        assert registry.load('a.npy')[0] == 0
+        assert bytes(registry.read_bytes('a.npy')) == (tmp_path / 'a.npy').read_bytes()
+
+    def test_invalidate(self, tmp_path):
+        path = tmp_path / 'a.json'
+        path.write_text('[1]')
+        registry = FixtureRegistry(tmp_path)
+        assert registry.load('a.json') == [1]
+        path.write_text('[1, 2]')
+        assert registry.load('a.json') == [1, 2]
+
+    def test_budget(self, tmp_path):
+        for name in 'abc':
+            (tmp_path / f'{name}.txt').write_text(name * 100)
+        registry = FixtureRegistry(tmp_path, budget=500)
+        for name in 'abc':
+            registry.load(f'{name}.txt')
+        # 每项占 200 字节，预算只够两项，最久未用的 a 被淘汰
+        registry.load('a.txt')
+        assert registry.misses == 4
@@ -0,0 +1,90 @@
+"""
+向量化变换：以整列运算代替 itertuples/apply 逐行循环
+
+1. 条件列：case（numpy.select）
+2. 分组：aggregate（groupby.agg）、broadcast（groupby.transform，组统计量回填到每行，无需 merge）
+3. 去重：hash_key + dedupe，多列合成一个 64 位哈希键
+4. 字符串：strings，基于 numpy.strings 与 StringDType
+"""
+from typing import Any, Callable, Sequence
+
+import numpy as np
+import pandas
+
+Condition = str | pandas.Series | np.ndarray | Callable[[pandas.DataFrame], Any]
+
+
+def _mask(frame: pandas.DataFrame, condition: Condition) -> np.ndarray:
+    if isinstance(condition, str):
+        condition = frame.eval(condition)
+    elif callable(condition):
+        condition = condition(frame)
+    return np.asarray(condition, dtype=bool)
+
+
+def case(frame: pandas.DataFrame, rules: Sequence[tuple[Condition, Any]], default: Any = None) -> pandas.Series:
+    """
+    条件列：按顺序取第一个成立的条件对应的值
+
+    Parameters
+    ----------
+    frame: 数据
+    rules: [(条件, 值)]；条件为 DataFrame.eval 表达式、布尔数组或 frame → 布尔数组的函数，值为标量或等长数组
+    default: 所有条件都不成立时的值
+
+    Examples
+    --------
+    >>> case(df, [('price >= 100', 'high'), ('price >= 10', 'mid')], default='low')
+    """
+    conditions = [_mask(frame, condition) for condition, _ in rules]
+    values = [value for _, value in rules]
+    if all(isinstance(value, str) for value in (*values, default) if value is not None):
+        # 字符串标签：先选出标签下标，再取值，避免 numpy.select 生成定长 Unicode 数组后逐个转换
+        labels = np.array([*values, default], dtype=object)
+        return pandas.Series(labels[np.select(conditions, np.arange(len(values)), len(values))], index=frame.index)
+    return pandas.Series(np.select(conditions, [np.asarray(value) for value in values], default), index=frame.index)
+
+
+def aggregate(frame: pandas.DataFrame, by: str | list[str], **named: tuple[str, str | Callable]) -> pandas.DataFrame:
+    """
+    分组聚合，named 同 DataFrame.groupby().agg 的命名聚合：结果列名=(列名, 函数)
+
+    分类分组键只保留出现过的类别；优先使用 'sum'、'mean' 等内置函数名，走 Cython 实现
+    """
+    return frame.groupby(by, observed=True, sort=False).agg(**named).reset_index()
+
+
+def broadcast(frame: pandas.DataFrame, by: str | list[str], column: str, func: str | Callable) -> pandas.Series:
+    """组统计量回填到每一行，如 price / broadcast(df, 'city', 'price', 'mean')"""
+    return frame.groupby(by, observed=True, sort=False)[column].transform(func)
+
+
+def hash_key(frame: pandas.DataFrame, columns: Sequence[str] | None = None) -> np.ndarray:
+    """多列合成 uint64 哈希键（逐列向量化哈希后组合），可用于去重、连接与分片"""
+    return pandas.util.hash_pandas_object(frame if columns is None else frame[list(columns)], index=False).to_numpy()
+
+
+def dedupe(frame: pandas.DataFrame, columns: Sequence[str] | None = None, keep: str = 'first') -> pandas.DataFrame:
+    """
+    按哈希键去重：只比较一列 uint64，不逐行构造元组
+
+    64 位哈希在百万行级数据上碰撞概率约 1e-8，需要严格去重时用 drop_duplicates
+    """
+    return frame[~pandas.Series(hash_key(frame, columns)).duplicated(keep).to_numpy()]
+
+
+def strings(series: pandas.Series, op: str, *args) -> pandas.Series:
+    """
+    numpy.strings 向量化字符串操作，空值保持为空
+
+    Examples
+    --------
+    >>> strings(df['name'], 'upper')
+    >>> strings(df['name'], 'startswith', 'A')
+    """
+    missing = series.isna().to_numpy()
+    values = series.fillna('').to_numpy(dtype=np.dtypes.StringDType())
+    result = getattr(np.strings, op)(values, *args)
+    result = pandas.Series(result, index=series.index, name=series.name,
+                           dtype=str if result.dtype.kind == 'T' else None)
+    return result.mask(missing) if missing.any() else result
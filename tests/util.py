@@ -1,13 +1,27 @@
+import gc
+import hashlib
+import json
+import linecache
+import math
+import os
+import statistics
+import sys
+import threading
 import time
+import tracemalloc
+from collections import OrderedDict
+from copy import deepcopy
+from dataclasses import asdict, dataclass, field
+from io import BytesIO
 from pathlib import Path
-from typing import Callable, Any
+from typing import BinaryIO, Callable, Any
 
 from _pytest import fixtures
 
 
 class Timer:
     @staticmethod
-    def measure(func: Callable, *args, **kwargs) -> tuple[Any, float]:
+    def measure(func: Callable, *args, **kwargs) -> tuple[float, Any]:
         """
         测量函数执行时间
 
@@ -25,10 +39,437 @@ class Timer:
         end = time.perf_counter()
         return end - start, result
 
+    @staticmethod
+    def measure_memory(func: Callable, *args, top: int = 10, **kwargs) -> tuple[float, Any, 'MemoryStats']:
+        """
+        测量函数执行时间及内存分配
+
+        tracemalloc 会拖慢被测函数，执行时间仅供参考，准确计时用 measure
+
+        Parameters
+        ----------
+        func: 要测量的函数
+        top: 记录分配最多的源代码行数
+        *args, **kwargs: 函数参数
+
+        Returns
+        -------
+        元组 (执行时间(秒)，函数结果，MemoryStats)
+        """
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            rss_before, _ = _rss()
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            elapsed, result = Timer.measure(func, *args, **kwargs)
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            rss_after, rss_peak = _rss()
+        finally:
+            if started:
+                tracemalloc.stop()
+        # 排除 tracemalloc 自身的分配
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, linecache.__file__)]
+        diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+        top_lines = [(f'{d.traceback[0].filename}:{d.traceback[0].lineno}', d.size_diff, d.count_diff)
+                     for d in diff[:top] if d.size_diff > 0]
+        return elapsed, result, MemoryStats(
+            peak=peak - base,
+            delta=current - base,
+            rss_before=rss_before,
+            rss_after=rss_after,
+            rss_peak=rss_peak,
+            top=top_lines,
+        )
+
+
+@dataclass
+class MemoryStats:
+    """单次调用的内存统计，单位字节；RSS 无法获取时为 None"""
+    # 调用期间 tracemalloc 追踪到的峰值分配
+    peak: int
+    # 调用前后的净分配
+    delta: int
+    rss_before: int | None
+    rss_after: int | None
+    # 进程生命周期内的峰值 RSS
+    rss_peak: int | None
+    # 分配最多的源代码行 [(文件:行号, 净分配字节, 净分配块数)]
+    top: list[tuple[str, int, int]] = field(default_factory=list)
+
+
+def _rss() -> tuple[int | None, int | None]:
+    """当前进程 (RSS, 峰值 RSS)，优先使用可选依赖 psutil"""
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return info.rss, getattr(info, 'peak_wset', None) or _peak_rss()
+    except ImportError:
+        pass
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.WorkingSetSize, counters.PeakWorkingSetSize
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE'), _peak_rss()
+    except OSError:
+        return None, _peak_rss()
+
+
+def _peak_rss() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为 KB
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@dataclass
+class BenchStats:
+    """单个基准的统计结果，时间均为单次调用耗时(秒)"""
+    name: str
+    rounds: int
+    iterations: int
+    min: float
+    max: float
+    mean: float
+    median: float
+    stddev: float
+    p95: float
+    p99: float
+    outliers: int = 0
+    samples: list[float] = field(default_factory=list, repr=False)
+
+
+def _percentile(data: list[float], q: float) -> float:
+    """线性插值百分位数，data 须已排序"""
+    if len(data) == 1:
+        return data[0]
+    k = (len(data) - 1) * q / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+
+def _reject_outliers(data: list[float], k: float = 1.5) -> list[float]:
+    """Tukey 围栏：剔除 [Q1 - k*IQR, Q3 + k*IQR] 之外的样本，data 须已排序"""
+    if len(data) < 4:
+        return data
+    q1, q3 = _percentile(data, 25), _percentile(data, 75)
+    lo, hi = q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+    return [x for x in data if lo <= x <= hi]
+
+
+class Benchmark:
+    """
+    基于 Timer 的统计基准测试：预热 → 校准每轮迭代次数 → 多轮计时 → 剔除离群值 → 统计
+
+    计时区间内关闭 GC；结果可保存为 JSON，并与基线比较以发现性能回退
+
+    Examples
+    --------
+    >>> bench = Benchmark(rounds=10)
+    >>> stats = bench.run('sum', sum, range(1000))
+    >>> bench.save('bench.json')
+    >>> Benchmark.compare(bench.results, Benchmark.load('baseline.json'), threshold=0.1)
+    """
+
+    def __init__(self, warmup: int = 1, rounds: int = 20, min_round_time: float = 0.01,
+                 max_iterations: int = 1_000_000, outlier_k: float | None = 1.5):
+        """
+        Parameters
+        ----------
+        warmup: 预热轮数，不计入统计
+        rounds: 计时轮数
+        min_round_time: 每轮最短耗时(秒)，据此校准每轮迭代次数
+        max_iterations: 每轮最大迭代次数
+        outlier_k: Tukey 围栏系数，None 表示不剔除离群值
+        """
+        self.warmup = warmup
+        self.rounds = rounds
+        self.min_round_time = min_round_time
+        self.max_iterations = max_iterations
+        self.outlier_k = outlier_k
+        self.results: dict[str, BenchStats] = {}
+
+    @staticmethod
+    def _loop(func: Callable, args: tuple, kwargs: dict, iterations: int) -> None:
+        for _ in range(iterations):
+            func(*args, **kwargs)
+
+    def _timed(self, func: Callable, args: tuple, kwargs: dict, iterations: int) -> float:
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            elapsed, _ = Timer.measure(self._loop, func, args, kwargs, iterations)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return elapsed
+
+    def calibrate(self, func: Callable, *args, **kwargs) -> int:
+        """迭代次数倍增，直到一轮耗时不少于 min_round_time"""
+        iterations = 1
+        while iterations < self.max_iterations:
+            if self._timed(func, args, kwargs, iterations) >= self.min_round_time:
+                break
+            iterations *= 2
+        return min(iterations, self.max_iterations)
+
+    def run(self, name: str, func: Callable, *args, **kwargs) -> BenchStats:
+        """
+        对函数做基准测试，结果同时记录在 self.results[name]
+
+        Parameters
+        ----------
+        name: 基准名称
+        func: 要测量的函数
+        *args, **kwargs: 函数参数
+
+        Returns
+        -------
+        BenchStats
+        """
+        for _ in range(self.warmup):
+            func(*args, **kwargs)
+        iterations = self.calibrate(func, *args, **kwargs)
+        samples = sorted(self._timed(func, args, kwargs, iterations) / iterations for _ in range(self.rounds))
+        kept = samples if self.outlier_k is None else _reject_outliers(samples, self.outlier_k)
+        stats = BenchStats(
+            name=name,
+            rounds=self.rounds,
+            iterations=iterations,
+            min=kept[0],
+            max=kept[-1],
+            mean=statistics.fmean(kept),
+            median=statistics.median(kept),
+            stddev=statistics.stdev(kept) if len(kept) > 1 else 0.0,
+            p95=_percentile(kept, 95),
+            p99=_percentile(kept, 99),
+            outliers=len(samples) - len(kept),
+            samples=samples,
+        )
+        self.results[name] = stats
+        return stats
+
+    def save(self, path: str | Path) -> None:
+        """将结果保存为 JSON"""
+        data = {name: asdict(stats) for name, stats in self.results.items()}
+        Path(path).write_text(json.dumps(data, indent=2), encoding='utf-8')
+
+    @staticmethod
+    def load(path: str | Path) -> dict[str, BenchStats]:
+        """从 JSON 读取结果"""
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+        return {name: BenchStats(**stats) for name, stats in data.items()}
+
+    @staticmethod
+    def compare(current: dict[str, BenchStats], baseline: dict[str, BenchStats],
+                threshold: float = 0.1) -> dict[str, float]:
+        """
+        按中位数与基线比较
+
+        Parameters
+        ----------
+        current: 本次结果
+        baseline: 基线结果
+        threshold: 允许的相对变慢比例，如 0.1 表示慢 10% 以内不算回退
+
+        Returns
+        -------
+        回退的基准 {名称: 当前中位数/基线中位数}
+        """
+        regressions = {}
+        for name, stats in current.items():
+            if name in baseline and baseline[name].median > 0:
+                ratio = stats.median / baseline[name].median
+                if ratio > 1 + threshold:
+                    regressions[name] = ratio
+        return regressions
+
+
+def _load_none(fp: BinaryIO) -> None:
+    return None
+
+
+def _load_npy(fp: BinaryIO) -> Any:
+    import numpy as np
+    arr = np.load(fp)
+    arr.flags.writeable = False
+    return arr
+
+
+def _load_npz(fp: BinaryIO) -> Any:
+    import numpy as np
+    with np.load(fp) as npz:
+        arrays = {key: npz[key] for key in npz.files}
+    for arr in arrays.values():
+        arr.flags.writeable = False
+    return arrays
+
+
+def _load_xlsx(fp: BinaryIO) -> Any:
+    from openpyxl import load_workbook
+    return load_workbook(fp)
+
+
+def _load_docx(fp: BinaryIO) -> Any:
+    from docx import Document
+    return Document(fp)
+
+
+def _load_pptx(fp: BinaryIO) -> Any:
+    from pptx import Presentation
+    return Presentation(fp)
+
+
+def _load_pdf(fp: BinaryIO) -> Any:
+    from pypdf import PdfReader
+    return PdfReader(fp)
+
+
+class FixtureRegistry:
+    """
+    夹具解析缓存：每个文件每个会话只从磁盘读取、解析一次
+
+    1. 内容哈希索引：stat (mtime, size) 不变时复用 sha256；文件内容变化时，旧的解析结果自然失效
+    2. LRU 字节预算：以文件大小的两倍（原始字节 + 解析结果）近似内存占用，超出预算时淘汰最久未用的项
+    3. 共享解析结果视为只读（NumPy 数组设为不可写）；需要修改时用 copy=True 取得私有副本：
+       DEEPCOPY 中的类型深拷贝，其余（Office/PDF 对象深拷贝不可靠）从缓存的原始字节重新解析
+    """
+    LOADERS: dict[str, Callable[[BinaryIO], Any]] = {
+        '.npy': _load_npy,
+        '.npz': _load_npz,
+        '.json': lambda fp: json.load(fp),
+        '.txt': lambda fp: fp.read().decode('utf-8'),
+        '.xlsx': _load_xlsx,
+        '.docx': _load_docx,
+        '.pptx': _load_pptx,
+        '.pdf': _load_pdf,
+    }
+    DEEPCOPY = {'.npy', '.npz', '.json', '.txt'}
+
+    def __init__(self, root: Path, budget: int = 256 * 1024 * 1024):
+        """
+        Parameters
+        ----------
+        root: 夹具目录
+        budget: 缓存预算(字节)
+        """
+        self.root = root
+        self.budget = budget
+        self._digests: dict[Path, tuple[int, int, str]] = {}
+        self._cache: OrderedDict[tuple[str, Callable], tuple[bytes, Any]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def digest(self, filename: str) -> str:
+        """文件内容的 sha256，stat 未变化时直接返回索引中的值"""
+        path = self.root / filename
+        st = path.stat()
+        cached = self._digests.get(path)
+        if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while chunk := f.read(1 << 20):
+                h.update(chunk)
+        self._digests[path] = (st.st_mtime_ns, st.st_size, h.hexdigest())
+        return h.hexdigest()
+
+    def read_bytes(self, filename: str) -> memoryview:
+        """夹具原始字节的只读视图"""
+        return memoryview(self._get(filename, _load_none)[0])
+
+    def load(self, filename: str, copy: bool = False, loader: Callable[[BinaryIO], Any] | None = None) -> Any:
+        """
+        获取解析后的夹具
+
+        Parameters
+        ----------
+        filename: 夹具文件名
+        copy: False 返回共享的解析结果（只读使用）；True 返回可修改的私有副本
+        loader: 自定义解析函数，接收二进制文件对象，默认按扩展名从 LOADERS 选择
+
+        Returns
+        -------
+        解析结果
+        """
+        suffix = Path(filename).suffix.lower()
+        loader = loader or self.LOADERS[suffix]
+        raw, obj = self._get(filename, loader)
+        if not copy:
+            return obj
+        return deepcopy(obj) if suffix in self.DEEPCOPY else loader(BytesIO(raw))
+
+    def _get(self, filename: str, loader: Callable[[BinaryIO], Any]) -> tuple[bytes, Any]:
+        key = (self.digest(filename), loader)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+        raw = (self.root / filename).read_bytes()
+        entry = (raw, loader(BytesIO(raw)))
+        with self._lock:
+            self.misses += 1
+            if key not in self._cache:
+                self._cache[key] = entry
+                self._size += 2 * len(raw)
+                self._evict()
+            return self._cache[key]
+
+    def _evict(self) -> None:
+        # 至少保留最新一项
+        while self._size > self.budget and len(self._cache) > 1:
+            _, (raw, _) = self._cache.popitem(last=False)
+            self._size -= 2 * len(raw)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._digests.clear()
+            self._size = 0
+
 
 class Paths:
     _FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+    _REGISTRY = FixtureRegistry(_FIXTURES_DIR)
 
     @staticmethod
     def fixture(filename: str) -> Path:
         return Paths._FIXTURES_DIR / filename
+
+    @staticmethod
+    def load(filename: str, copy: bool = False) -> Any:
+        """
+        解析夹具，同一内容每个会话只解析一次
+
+        Parameters
+        ----------
+        filename: 夹具文件名
+        copy: False 返回共享的解析结果（只读使用）；True 返回可修改的私有副本
+
+        Returns
+        -------
+        解析结果，如 .xlsx → Workbook，.docx → Document，.pptx → Presentation，.pdf → PdfReader，.npy → ndarray
+        """
+        return Paths._REGISTRY.load(filename, copy)
@@ -0,0 +1,433 @@
+"""
+Word 辅助
+
+1. 生成：模板只解析一次、每份文档深拷贝正文 XML 树，表格整批生成行 XML，图片按哈希去重，进程池批量生成
+2. 读取：一次遍历正文 XML 建立标题大纲、样式、段落偏移、表格位置索引，按文件哈希缓存
+"""
+import functools
+import hashlib
+import itertools
+import json
+import os
+import posixpath
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from dataclasses import asdict, dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Sequence
+from xml.sax.saxutils import escape
+
+import docx
+from docx.document import Document
+from docx.image.image import Image
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.oxml.shape import CT_Inline
+from docx.shared import Length
+from docx.styles import BabelFish
+from docx.table import Table
+from docx.text.run import Run
+from lxml import etree
+
+PLACEHOLDER = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+
+def _xml(element: etree._Element | None) -> str:
+    return '' if element is None else etree.tostring(element, encoding='unicode')
+
+
+def fill_table(table: Table, rows: Iterable[Sequence[Any]], prototype: int = -1, keep_prototype: bool = False) -> Table:
+    """
+    整批填充表格：以原型行的单元格、段落、文字格式为模板，拼接所有行的 XML 后一次解析、追加
+
+    不经过 table.cell(i, j)（每次调用都重新扫描表格 XML 计算合并单元格），也不逐个创建 Run 对象
+
+    Parameters
+    ----------
+    table: 表格
+    rows: 行数据，值为 None 时单元格留空；少于原型行单元格数的行以空单元格补齐，多于时抛出 ValueError
+    prototype: 原型行下标，通常是表头下方预留的一行样例
+    keep_prototype: 是否保留原型行
+
+    Examples
+    --------
+    >>> fill_table(doc.tables[0], df.itertuples(index=False))
+    """
+    tbl = table._tbl
+    tr = tbl.tr_lst[prototype]
+    # 每个单元格序列化为文字之前的前缀，之后为固定的后缀
+    cells = []
+    for tc in tr.tc_lst:
+        p = tc.find(qn('w:p'))
+        r = p.find(qn('w:r')) if p is not None else None
+        prefix = (f'<w:tc>{_xml(tc.tcPr)}<w:p>{_xml(p.pPr if p is not None else None)}'
+                  f'<w:r>{_xml(r.rPr if r is not None else None)}<w:t xml:space="preserve">')
+        cells.append(prefix)
+    row_start = f'<w:tr>{_xml(tr.trPr)}'
+    suffix = '</w:t></w:r></w:p></w:tc>'
+
+    def row_xml(row: Sequence[Any]) -> str:
+        if len(row) > len(cells):
+            raise ValueError(f'行的单元格数 {len(row)} 多于原型行的 {len(cells)}')
+        values = itertools.chain(row, itertools.repeat(None, len(cells) - len(row)))
+        return row_start + ''.join(prefix + escape('' if value is None else str(value)) + suffix
+                                   for prefix, value in zip(cells, values)) + '</w:tr>'
+
+    body = ''.join(map(row_xml, rows))
+    # 原型行中的命名空间声明由外层统一提供
+    wrapper = parse_xml(f'<w:tbl {nsdecls("w")}>{body}</w:tbl>')
+    anchor = tr
+    for new in list(wrapper):
+        anchor.addnext(new)
+        anchor = new
+    if not keep_prototype:
+        tbl.remove(tr)
+    return table
+
+
+def replace_text(element: etree._Element, fields: dict[str, Any]) -> int:
+    """
+    替换 {{name}} 占位符，返回替换的段落数
+
+    先在各 w:t 内替换；占位符被拆分到多个 run（如中途改过格式）时，整段文字合并到第一个 run
+    """
+    def sub(text: str) -> str:
+        return PLACEHOLDER.sub(lambda m: str(fields[m[1]]) if m[1] in fields else m[0], text)
+
+    count = 0
+    for p in element.iter(qn('w:p')):
+        ts = [t for t in p.iter(qn('w:t')) if t.text]
+        before = ''.join(t.text for t in ts)
+        if '{' not in before:
+            continue
+        for t in ts:
+            if '{{' in t.text:
+                t.text = sub(t.text)
+        text = ''.join(t.text for t in ts)
+        if (replaced := sub(text)) != text:
+            ts[0].text = replaced
+            for t in ts[1:]:
+                t.text = ''
+        count += replaced != before
+    return count
+
+
+@functools.lru_cache(maxsize=64)
+def _image(source: str | bytes) -> Image:
+    """同一图片（路径或内容）每个进程只读取、解析一次"""
+    return Image.from_blob(Path(source).read_bytes()) if isinstance(source, str) else Image.from_blob(source)
+
+
+def add_picture(document: Document, image: str | os.PathLike | bytes, width: Length | None = None,
+                height: Length | None = None, run: Run | None = None) -> Run:
+    """
+    添加图片：同一内容在包内只存一份（按 SHA1 去重），跨文档复用已解析的图片
+
+    Parameters
+    ----------
+    document: 文档
+    image: 图片路径或内容
+    width, height: 尺寸，只给一个时按比例缩放
+    run: 图片所在的 run，None 为在文末新段落中添加
+    """
+    image = _image(image if isinstance(image, bytes) else str(image))
+    part = document.part
+    image_parts = part.package.image_parts
+    image_part = image_parts._get_by_sha1(image.sha1) or image_parts._add_image_part(image)
+    rId = part.relate_to(image_part, RT.IMAGE)
+    inline = CT_Inline.new_pic_inline(part.next_id, rId, image.filename, *image.scaled_dimensions(width, height))
+    run = run or document.add_paragraph().add_run()
+    run._r.add_drawing(inline)
+    return run
+
+
+class DocxTemplate:
+    """
+    模板只解析一次；每次生成深拷贝正文 XML 树，填充后写出，再恢复模板
+
+    只处理正文（word/document.xml），页眉页脚、文档属性保持模板内容；同一实例不可在多个线程中同时生成
+
+    Examples
+    --------
+    >>> template = DocxTemplate('contract.docx')
+    >>> template.render('out.docx', fields={'name': '张三'}, tables={0: rows})
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = path
+        self._document = docx.Document(str(path))
+        self._part = self._document.part
+        self._element = self._part._element
+
+    def render(self, target: str | os.PathLike | BytesIO, fields: dict[str, Any] | None = None,
+               tables: dict[int, Iterable[Sequence[Any]]] | None = None,
+               build: Callable[[Document], Any] | None = None) -> str | os.PathLike | BytesIO:
+        """
+        Parameters
+        ----------
+        target: 输出路径或二进制文件对象
+        fields: {占位符名称: 值}，替换正文中的 {{name}}
+        tables: {表格下标: 行数据}，以最后一行为原型整批填充，见 fill_table
+        build: 接收 Document 的函数，用于追加其他内容；进程池中须为模块级函数
+
+        Returns
+        -------
+        target
+        """
+        part = self._part
+        rels = part.rels
+        saved = dict(rels), dict(rels._target_parts_by_rId)
+        part._element = deepcopy(self._element)
+        # 正文树已替换，丢弃绑定在旧树上的缓存
+        part.__dict__.pop('inline_shapes', None)
+        try:
+            document = part.document
+            if fields:
+                replace_text(part._element.body, fields)
+            for index, rows in (tables or {}).items():
+                fill_table(document.tables[index], rows)
+            if build:
+                build(document)
+            document.save(target)
+        finally:
+            part._element = self._element
+            part.__dict__.pop('inline_shapes', None)
+            rels.clear()
+            rels.update(saved[0])
+            rels._target_parts_by_rId.clear()
+            rels._target_parts_by_rId.update(saved[1])
+        return target
+
+
+@functools.lru_cache(maxsize=4)
+def _template(path: str) -> DocxTemplate:
+    """每个进程只解析一次模板"""
+    return DocxTemplate(path)
+
+
+def _render_job(template: str, job: tuple[str | os.PathLike, dict[str, Any]]) -> Path:
+    target, kwargs = job
+    _template(template).render(target, **kwargs)
+    return Path(target)
+
+
+def _render_batch(template: str, batch: list[tuple[str | os.PathLike, dict[str, Any]]]) -> list[Path | Exception]:
+    results = []
+    for job in batch:
+        try:
+            results.append(_render_job(template, job))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def render_many(template: str | os.PathLike, jobs: Iterable[tuple[str | os.PathLike, dict[str, Any]]],
+                workers: int | None = None, chunksize: int = 16) -> Iterator[tuple[str | os.PathLike, Path | Exception]]:
+    """
+    批量生成文档，按提交顺序产出 (输出路径, 输出路径或异常)
+
+    Parameters
+    ----------
+    template: 模板路径
+    jobs: [(输出路径, render 的关键字参数)]
+    workers: 进程数，None 为 CPU 数，0 为在当前进程生成
+    chunksize: 每次发送给子进程的任务数，减少进程间通信次数
+
+    Examples
+    --------
+    >>> jobs = ((f'out/{row.id}.docx', {'fields': row._asdict()}) for row in df.itertuples())
+    >>> failed = [target for target, result in render_many('contract.docx', jobs) if isinstance(result, Exception)]
+    """
+    template = str(template)
+    if workers == 0:
+        for job in jobs:
+            yield job[0], _render_batch(template, [job])[0]
+        return
+    jobs = list(jobs)
+    with ProcessPoolExecutor(workers) as executor:
+        batches = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+        futures = [executor.submit(_render_batch, template, batch) for batch in batches]
+        for batch, future in zip(batches, futures):
+            yield from zip((job[0] for job in batch), future.result())
+
+
+# region 读取索引
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+HEADING = re.compile(r'^heading (\d)$', re.I)
+
+
+@dataclass
+class Heading:
+    level: int
+    text: str
+    # 段落下标，同 Document.paragraphs
+    paragraph: int
+
+
+def _part_names(archive: zipfile.ZipFile) -> tuple[str, str | None]:
+    """(主文档部件, 样式部件)，按关系解析，不假定 word/document.xml"""
+    rels = etree.fromstring(archive.read('_rels/.rels'))
+    document = next(rel.get('Target') for rel in rels if rel.get('Type').endswith('/officeDocument')).lstrip('/')
+    directory, name = posixpath.split(document)
+    try:
+        rels = etree.fromstring(archive.read(posixpath.join(directory, '_rels', f'{name}.rels')))
+    except KeyError:
+        return document, None
+    styles = next((rel.get('Target') for rel in rels if rel.get('Type').endswith('/styles')), None)
+    return document, styles and posixpath.normpath(posixpath.join(directory, styles))
+
+
+def _styles(xml: bytes | None) -> tuple[dict[str, str], dict[str, int], str | None]:
+    """({样式 ID: 名称}, {样式 ID: 大纲级别}, 默认段落样式 ID)，大纲级别沿 basedOn 继承"""
+    if xml is None:
+        return {}, {}, None
+    names, based_on, levels, default = {}, {}, {}, None
+    for style in etree.fromstring(xml).iter(f'{W}style'):
+        style_id = style.get(f'{W}styleId')
+        name = style.find(f'{W}name')
+        names[style_id] = BabelFish.internal2ui(name.get(f'{W}val')) if name is not None else style_id
+        if style.get(f'{W}type') == 'paragraph' and style.get(f'{W}default') in ('1', 'true', 'on'):
+            default = style_id
+        if (parent := style.find(f'{W}basedOn')) is not None:
+            based_on[style_id] = parent.get(f'{W}val')
+        if (outline := style.find(f'{W}pPr/{W}outlineLvl')) is not None:
+            levels[style_id] = int(outline.get(f'{W}val')) + 1
+        elif match := HEADING.match(names[style_id]):
+            levels[style_id] = int(match[1])
+
+    def level(style_id: str, depth: int = 0) -> int | None:
+        if style_id in levels or depth > 16:
+            return levels.get(style_id)
+        return based_on.get(style_id) and level(based_on[style_id], depth + 1)
+
+    # 正文级别为 10（outlineLvl=9），不算标题
+    return names, {s: n for s in names if (n := level(s)) and n <= 9}, default
+
+
+def _paragraph_text(p: etree._Element) -> str:
+    """同 Paragraph.text：run 内的文字、制表符、换行符"""
+    parts = []
+    for r in p.iter(f'{W}r'):
+        for child in r:
+            if child.tag == f'{W}t':
+                parts.append(child.text or '')
+            elif child.tag == f'{W}tab':
+                parts.append('\t')
+            elif child.tag == f'{W}cr' or (child.tag == f'{W}br'
+                                           and child.get(f'{W}type', 'textWrapping') == 'textWrapping'):
+                # 分页符、分栏符不计入文字
+                parts.append('\n')
+    return ''.join(parts)
+
+
+def build_index(path: str | os.PathLike) -> dict[str, Any]:
+    """一次遍历正文 XML（iterparse，处理完的段落即释放）建立索引，不创建 python-docx 对象"""
+    with zipfile.ZipFile(path) as archive:
+        document, styles = _part_names(archive)
+        names, levels, default = _styles(archive.read(styles) if styles else None)
+        paragraph_styles, offsets, tables, outline = [], [], [], []
+        offset = 0
+        with archive.open(document) as f:
+            for _, element in etree.iterparse(f, tag=(f'{W}p', f'{W}tbl')):
+                if element.getparent().tag != f'{W}body':
+                    continue
+                if element.tag == f'{W}tbl':
+                    # 表格位于第几个段落之前
+                    tables.append(len(offsets))
+                else:
+                    style = element.find(f'{W}pPr/{W}pStyle')
+                    style_id = style.get(f'{W}val') if style is not None else default
+                    outline_level = element.find(f'{W}pPr/{W}outlineLvl')
+                    level = (int(outline_level.get(f'{W}val')) + 1 if outline_level is not None
+                             else levels.get(style_id))
+                    text = _paragraph_text(element)
+                    if level and level <= 9:
+                        outline.append(asdict(Heading(level, text, len(offsets))))
+                    paragraph_styles.append(style_id)
+                    offsets.append(offset)
+                    # 段落之间以换行分隔
+                    offset += len(text) + 1
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+    return {'styles': names, 'paragraph_styles': paragraph_styles, 'offsets': offsets, 'tables': tables,
+            'outline': outline}
+
+
+class DocxIndex:
+    """
+    docx 读取索引：标题大纲、样式 ID → 名称、段落在纯文本中的偏移、表格位置
+
+    首次访问时才建立（一次遍历正文 XML），可按文件 SHA256 缓存到磁盘，同一内容不再解析
+
+    Examples
+    --------
+    >>> index = DocxIndex('contract.docx', cache='.docx-index')
+    >>> [(h.level, h.text) for h in index.outline]
+    >>> index.style_name(3)
+    'Heading 1'
+    """
+
+    def __init__(self, path: str | os.PathLike, cache: str | os.PathLike | None = None):
+        """
+        Parameters
+        ----------
+        path: docx 路径
+        cache: 缓存目录，目录内为 <sha256>.json
+        """
+        self.path = path
+        self.cache = cache and Path(cache)
+
+    @functools.cached_property
+    def _data(self) -> dict[str, Any]:
+        if not self.cache:
+            return build_index(self.path)
+        with open(self.path, 'rb') as f:
+            path = self.cache / f'{hashlib.file_digest(f, "sha256").hexdigest()}.json'
+        if path.exists():
+            return json.loads(path.read_text(encoding='utf-8'))
+        data = build_index(self.path)
+        self.cache.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+        return data
+
+    @functools.cached_property
+    def outline(self) -> list[Heading]:
+        return [Heading(**heading) for heading in self._data['outline']]
+
+    @property
+    def styles(self) -> dict[str, str]:
+        """{样式 ID: 名称}，名称同 python-docx（如 Heading 1）"""
+        return self._data['styles']
+
+    @property
+    def paragraph_styles(self) -> list[str | None]:
+        """各段落的样式 ID"""
+        return self._data['paragraph_styles']
+
+    @property
+    def offsets(self) -> list[int]:
+        """各段落在纯文本（段落之间以换行分隔）中的起始位置"""
+        return self._data['offsets']
+
+    @property
+    def tables(self) -> list[int]:
+        """各表格之前的段落数，即表格位于 paragraphs[i] 之前"""
+        return self._data['tables']
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def style_name(self, paragraph: int) -> str | None:
+        style_id = self.paragraph_styles[paragraph]
+        return self.styles.get(style_id, style_id)
+
+    def headings(self, level: int | None = None) -> list[Heading]:
+        return [heading for heading in self.outline if level is None or heading.level == level]
+
+# endregion